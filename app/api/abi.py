@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TRC20合约调用的ABI编码/解码
+
+覆盖 address、uint256、bool、bytes、string 参数和 Transfer 事件日志。TRON地址在ABI中
+按20字节（去掉0x41前缀）编码；函数选择器和base58/hex地址转换结果都会缓存，
+批量解码 constant_result 和日志时不需要重复计算。
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from Crypto.Hash import keccak
+    KECCAK_AVAILABLE = True
+except ImportError:
+    KECCAK_AVAILABLE = False
+
+ADDRESS_PREFIX = b'\x41'
+WORD_SIZE = 32
+WORD_HEX = 64
+UINT256_MAX = (1 << 256) - 1
+ZERO_WORD = '0' * WORD_HEX
+
+# Transfer(address,address,uint256) 事件签名
+TRANSFER_TOPIC = 'ddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+# 常用函数选择器，没有keccak实现时也能使用
+_selectors: Dict[str, str] = {
+    'balanceOf(address)': '70a08231',
+    'transfer(address,uint256)': 'a9059cbb',
+    'transferFrom(address,address,uint256)': '23b872dd',
+    'approve(address,uint256)': '095ea7b3',
+    'allowance(address,address)': 'dd62ed3e',
+    'decimals()': '313ce567',
+    'symbol()': '95d89b41',
+    'name()': '06fdde03',
+    'totalSupply()': '18160ddd',
+    'tryAggregate(bool,(address,bytes)[])': 'bce38bd7',
+    'getEthBalance(address)': '4d2301cc'
+}
+
+TRANSFER_SELECTOR = _selectors['transfer(address,uint256)']
+TRANSFER_FROM_SELECTOR = _selectors['transferFrom(address,address,uint256)']
+
+_BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_BASE58_INDEX = {char: index for index, char in enumerate(_BASE58_ALPHABET)}
+
+
+# ==================== 函数选择器 ====================
+
+def selector(signature: str) -> str:
+    """函数签名的4字节选择器（hex），结果缓存"""
+    value = _selectors.get(signature)
+    if value is None:
+        if not KECCAK_AVAILABLE:
+            raise RuntimeError('缺少pycryptodome依赖，无法计算函数选择器')
+        value = keccak.new(digest_bits=256, data=signature.encode()).hexdigest()[:8]
+        _selectors[signature] = value
+    return value
+
+
+# ==================== 地址转换 ====================
+
+def _checksum(payload: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+
+
+@lru_cache(maxsize=65536)
+def to_hex_address(address: str) -> str:
+    """base58或hex地址转换为小写41开头的hex地址"""
+    if not isinstance(address, str) or not address:
+        raise ValueError('地址格式错误')
+    if len(address) == 34 and address[0] == 'T':
+        value = 0
+        try:
+            for char in address:
+                value = value * 58 + _BASE58_INDEX[char]
+        except KeyError:
+            raise ValueError(f'地址格式错误：{address}')
+        raw = value.to_bytes(25, 'big')
+        if raw[:1] != ADDRESS_PREFIX or _checksum(raw[:21]) != raw[21:]:
+            raise ValueError(f'地址格式错误：{address}')
+        return raw[:21].hex()
+
+    hex_address = address.lower()
+    if hex_address.startswith('0x'):
+        hex_address = '41' + hex_address[2:]
+    if len(hex_address) != 42 or not hex_address.startswith('41'):
+        raise ValueError(f'地址格式错误：{address}')
+    try:
+        bytes.fromhex(hex_address)
+    except ValueError:
+        raise ValueError(f'地址格式错误：{address}')
+    return hex_address
+
+
+@lru_cache(maxsize=65536)
+def to_base58_address(hex_address: str) -> str:
+    """41开头的hex地址（或20字节hex）转换为base58地址"""
+    raw = bytes.fromhex(hex_address[-40:])
+    if len(raw) != 20:
+        raise ValueError(f'地址格式错误：{hex_address}')
+    payload = ADDRESS_PREFIX + raw
+    value = int.from_bytes(payload + _checksum(payload), 'big')
+    chars = []
+    while value:
+        value, remainder = divmod(value, 58)
+        chars.append(_BASE58_ALPHABET[remainder])
+    # 0x41前缀保证没有前导零字节
+    return ''.join(reversed(chars))
+
+
+def is_address(address: str) -> bool:
+    """是否为有效的base58或hex地址"""
+    try:
+        to_hex_address(address)
+        return True
+    except ValueError:
+        return False
+
+
+def address_bytes(address: str) -> bytes:
+    """base58或hex地址转换为21字节地址"""
+    return bytes.fromhex(to_hex_address(address))
+
+
+# ==================== 编码 ====================
+
+def encode_address(address: str) -> str:
+    """address参数：20字节地址左补零到32字节"""
+    return '000000000000000000000000' + to_hex_address(address)[2:]
+
+
+def encode_uint256(value: int) -> str:
+    value = int(value)
+    if not 0 <= value <= UINT256_MAX:
+        raise ValueError('数值超出uint256范围')
+    return '%064x' % value
+
+
+def encode_bool(value: bool) -> str:
+    return encode_uint256(1 if value else 0)
+
+
+def _encode_dynamic(data: bytes) -> str:
+    """长度 + 右补零到32字节整数倍的数据"""
+    padded = -len(data) % WORD_SIZE
+    return encode_uint256(len(data)) + data.hex() + '00' * padded
+
+
+def encode_bytes(value: bytes) -> str:
+    return _encode_dynamic(bytes(value))
+
+
+def encode_string(value: str) -> str:
+    return _encode_dynamic(value.encode('utf-8'))
+
+
+_STATIC_ENCODERS = {
+    'address': encode_address,
+    'uint256': encode_uint256,
+    'bool': encode_bool
+}
+_DYNAMIC_ENCODERS = {
+    'bytes': encode_bytes,
+    'string': encode_string
+}
+
+
+def encode_params(types: Sequence[str], values: Sequence[Any]) -> str:
+    """
+    按ABI规则编码参数列表（不含函数选择器），用于triggersmartcontract的parameter
+
+    Args:
+        types: 参数类型，支持 address、uint256、bool、bytes、string
+        values: 参数值
+    """
+    if len(types) != len(values):
+        raise ValueError('参数类型和参数值数量不一致')
+
+    heads = []
+    tails = []
+    offset = WORD_SIZE * len(types)
+    for abi_type, value in zip(types, values):
+        encoder = _STATIC_ENCODERS.get(abi_type)
+        if encoder is not None:
+            heads.append(encoder(value))
+            continue
+        encoder = _DYNAMIC_ENCODERS.get(abi_type)
+        if encoder is None:
+            raise ValueError(f'不支持的ABI类型：{abi_type}')
+        tail = encoder(value)
+        heads.append(encode_uint256(offset))
+        tails.append(tail)
+        offset += len(tail) // 2
+    return ''.join(heads) + ''.join(tails)
+
+
+def encode_call(signature: str, types: Sequence[str], values: Sequence[Any]) -> str:
+    """函数选择器 + 参数编码（交易data字段）"""
+    return selector(signature) + encode_params(types, values)
+
+
+@lru_cache(maxsize=65536)
+def balance_of_parameter(address: str) -> str:
+    """balanceOf(address) 的参数编码"""
+    return encode_address(address)
+
+
+def trc20_transfer_data(to: str, amount: int) -> bytes:
+    """TRC20 transfer(address,uint256) 调用数据，to为base58或hex地址"""
+    return bytes.fromhex(TRANSFER_SELECTOR + encode_address(to) + encode_uint256(amount))
+
+
+def encode_multicall(calls: Sequence[Tuple[str, str]], require_success: bool = False) -> str:
+    """
+    Multicall tryAggregate(bool,(address,bytes)[]) 的参数编码
+
+    Args:
+        calls: (合约地址, 调用数据hex) 列表
+        require_success (bool): 任一子调用失败时是否整体回滚
+    """
+    elements = [encode_address(target) + encode_uint256(WORD_SIZE * 2) + _encode_dynamic(bytes.fromhex(data))
+                for target, data in calls]
+    offsets = []
+    offset = WORD_SIZE * len(elements)
+    for element in elements:
+        offsets.append(encode_uint256(offset))
+        offset += len(element) // 2
+    return (encode_bool(require_success) + encode_uint256(WORD_SIZE * 2) + encode_uint256(len(elements)) +
+            ''.join(offsets) + ''.join(elements))
+
+
+# ==================== 解码 ====================
+
+def _word(data: str, index: int) -> str:
+    word = data[index * WORD_HEX:(index + 1) * WORD_HEX]
+    if len(word) != WORD_HEX:
+        raise ValueError('ABI数据长度不足')
+    return word
+
+
+def decode_uint256(data: str) -> int:
+    """解码单个uint256返回值，空结果按0处理"""
+    return int(data[:WORD_HEX] or '0', 16)
+
+
+def decode_bool(data: str) -> bool:
+    return decode_uint256(data) != 0
+
+
+def decode_address(data: str) -> str:
+    """解码address返回值为base58地址"""
+    return to_base58_address(data[WORD_HEX - 40:WORD_HEX])
+
+
+def _decode_dynamic(data: str, offset_word: str) -> bytes:
+    start = int(offset_word, 16) * 2
+    length = int(data[start:start + WORD_HEX] or '0', 16)
+    body = data[start + WORD_HEX:start + WORD_HEX + length * 2]
+    if len(body) != length * 2:
+        raise ValueError('ABI数据长度不足')
+    return bytes.fromhex(body)
+
+
+def decode_params(types: Sequence[str], data: str) -> List[Any]:
+    """按类型解码返回值（hex字符串，不含0x）"""
+    if data.startswith('0x'):
+        data = data[2:]
+    values = []
+    for index, abi_type in enumerate(types):
+        word = _word(data, index)
+        if abi_type == 'uint256':
+            values.append(int(word, 16))
+        elif abi_type == 'address':
+            values.append(to_base58_address(word[24:]))
+        elif abi_type == 'bool':
+            values.append(int(word, 16) != 0)
+        elif abi_type == 'bytes':
+            values.append(_decode_dynamic(data, word))
+        elif abi_type == 'string':
+            values.append(_decode_dynamic(data, word).decode('utf-8', 'replace'))
+        else:
+            raise ValueError(f'不支持的ABI类型：{abi_type}')
+    return values
+
+
+def decode_string(data: str) -> str:
+    """
+    解码string返回值
+
+    部分早期代币的symbol()/name()返回bytes32，此时去掉末尾的零字节按文本处理。
+    """
+    if len(data) == WORD_HEX:
+        return bytes.fromhex(data).rstrip(b'\x00').decode('utf-8', 'replace')
+    return decode_params(['string'], data)[0]
+
+
+def decode_uint256_batch(results: Iterable[Optional[str]]) -> List[int]:
+    """批量解码uint256返回值（如批量balanceOf的constant_result[0]）"""
+    return [int(result[:WORD_HEX] or '0', 16) if result else 0 for result in results]
+
+
+def constant_result(response: Dict) -> Optional[str]:
+    """
+    取triggerconstantcontract/triggersmartcontract的第一个返回值
+
+    节点按proto3规则输出JSON，result为false时省略该字段：执行失败的响应为
+    {'result': {'code': 'CONTRACT_EXE_ERROR', 'message': ...}, 'constant_result': [...]}，
+    constant_result中是revert数据而不是返回值，因此只有 result.result 为true且没有错误码时才算成功。
+
+    Returns:
+        str: 返回值hex，调用失败（revert等）时为None
+    """
+    results = response.get('constant_result')
+    if not results:
+        return None
+    result = response.get('result') or {}
+    if result.get('result') is not True or result.get('code', 'SUCCESS') != 'SUCCESS':
+        return None
+    return results[0]
+
+
+def decode_transfer_log(log: Dict) -> Optional[Tuple[str, str, str, int]]:
+    """
+    解析一条Transfer(address,address,uint256)日志
+
+    Returns:
+        tuple: (合约hex地址, from hex地址, to hex地址, 金额)，不是Transfer事件时为None
+    """
+    topics = log.get('topics')
+    if not topics or len(topics) != 3 or topics[0] != TRANSFER_TOPIC:
+        return None
+    return ('41' + log.get('address', '')[-40:].lower(), '41' + topics[1][-40:].lower(),
+            '41' + topics[2][-40:].lower(), int(log.get('data') or '0', 16))
+
+
+def decode_transfer_logs(logs: Iterable[Dict]) -> List[Tuple[int, str, str, str, int]]:
+    """
+    批量解析Transfer日志
+
+    Returns:
+        list: (日志序号, 合约base58地址, from base58地址, to base58地址, 金额)，只包含Transfer事件
+    """
+    decoded = []
+    topic = TRANSFER_TOPIC
+    base58 = to_base58_address
+    for index, log in enumerate(logs):
+        topics = log.get('topics')
+        if not topics or len(topics) != 3 or topics[0] != topic:
+            continue
+        decoded.append((index, base58(log.get('address', '')[-40:]), base58(topics[1][-40:]),
+                        base58(topics[2][-40:]), int(log.get('data') or '0', 16)))
+    return decoded
+
+
+def decode_multicall(data: str) -> List[Tuple[bool, str]]:
+    """
+    解码Multicall tryAggregate的返回值 (bool success, bytes returnData)[]
+
+    Returns:
+        list: (是否成功, 返回数据hex)，顺序与请求一致
+    """
+    if data.startswith('0x'):
+        data = data[2:]
+    array = int(_word(data, 0), 16) * 2
+    count = int(data[array:array + WORD_HEX], 16)
+    base = array + WORD_HEX
+    results = []
+    for index in range(count):
+        position = index * WORD_HEX
+        start = base + int(data[base + position:base + position + WORD_HEX], 16) * 2
+        success = int(data[start:start + WORD_HEX] or '0', 16) != 0
+        body = start + int(data[start + WORD_HEX:start + WORD_HEX * 2], 16) * 2
+        length = int(data[body:body + WORD_HEX] or '0', 16) * 2
+        if len(data) < body + WORD_HEX + length:
+            raise ValueError('ABI数据长度不足')
+        results.append((success, data[body + WORD_HEX:body + WORD_HEX + length]))
+    return results
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量生成TRON地址
+
+密钥生成按批次分配到进程池并行执行，每个工作进程直接输出NDJSON文本块，
+主进程只负责按顺序转发，不在内存中拼装整个结果集。
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import base58
+    from coincurve import PublicKey as CurvePublicKey
+    from Crypto.Hash import keccak
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+# secp256k1曲线阶，私钥需满足 0 < key < n
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+_mnemonic = None
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_mnemonic():
+    """获取共享的英文助记词对象（词表只加载一次）"""
+    global _mnemonic
+    if _mnemonic is None:
+        from mnemonic import Mnemonic
+        _mnemonic = Mnemonic('english')
+    return _mnemonic
+
+
+def _reset_pool_after_fork():
+    # fork出的子进程不能使用父进程的进程池（其管理线程不会复制过来），需要时重新创建
+    global _pool, _pool_workers, _pool_lock
+    _pool, _pool_workers, _pool_lock = None, 0, threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def address_from_public_key(public_key: bytes) -> Tuple[str, str]:
+    """根据未压缩公钥（65字节）计算 (base58地址, hex地址)"""
+    address_bytes = b'\x41' + keccak.new(digest_bits=256, data=public_key[1:]).digest()[-20:]
+    return base58.b58encode_check(address_bytes).decode(), address_bytes.hex()
+
+
+def address_from_secret(secret: bytes) -> Dict:
+    """根据32字节私钥计算地址（只做一次椭圆曲线点乘）"""
+    address, hex_address = address_from_public_key(CurvePublicKey.from_valid_secret(secret).format(compressed=False))
+    return {
+        'privateKey': secret.hex(),
+        'address': address,
+        'hexAddress': hex_address
+    }
+
+
+def generate_keypair() -> Dict:
+    """生成一个随机私钥及其地址"""
+    while True:
+        secret = os.urandom(32)
+        if 0 < int.from_bytes(secret, 'big') < SECP256K1_N:
+            return address_from_secret(secret)
+
+
+def generate_mnemonic_keypair() -> Dict:
+    """生成助记词及其对应的私钥和地址"""
+    from app.api.hd_wallet import derive_addresses
+
+    words = get_mnemonic().generate(strength=128)
+    # 与单个生成接口一致：BIP-44路径 m/44'/195'/0'/0/0
+    first = derive_addresses(words, count=1, use_cache=False)['addresses'][0]
+    return {'mnemonic': words, 'privateKey': first['privateKey'], 'address': first['address'],
+            'hexAddress': first['hexAddress']}
+
+
+def generate_batch(size: int, with_mnemonic: bool = False) -> str:
+    """生成一批地址，返回NDJSON文本（在工作进程中执行）"""
+    generate = generate_mnemonic_keypair if with_mnemonic else generate_keypair
+    lines = [json.dumps(generate(), separators=(',', ':')) for _ in range(size)]
+    return '\n'.join(lines) + '\n'
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """获取共享进程池，避免每次请求重新启动工作进程"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn方式启动，避免在多线程的Web进程中fork
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def iter_address_batches(count: int, with_mnemonic: bool = False, workers: int = 0,
+                         chunk_size: int = 1000) -> Iterator[str]:
+    """
+    按顺序产出NDJSON文本块，共count个地址
+
+    Args:
+        count (int): 地址数量
+        with_mnemonic (bool): 是否为每个地址生成助记词
+        workers (int): 工作进程数，0表示CPU核数，1表示在当前进程生成
+        chunk_size (int): 每批地址数量
+    """
+    if not CRYPTO_AVAILABLE:
+        raise RuntimeError('缺少coincurve/pycryptodome/base58依赖，无法批量生成地址')
+
+    sizes = [min(chunk_size, count - start) for start in range(0, count, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(sizes) <= 1:
+        for size in sizes:
+            yield generate_batch(size, with_mnemonic)
+        return
+
+    # 滑动窗口提交，消费方较慢时不会在内存中堆积结果
+    executor = _get_pool(workers)
+    pending = deque()
+    remaining = iter(sizes)
+    for size in remaining:
+        pending.append(executor.submit(generate_batch, size, with_mnemonic))
+        if len(pending) >= workers * 2:
+            break
+    try:
+        while pending:
+            result = pending.popleft().result()
+            size = next(remaining, None)
+            if size is not None:
+                pending.append(executor.submit(generate_batch, size, with_mnemonic))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def main(argv=None):
+    """命令行批量生成：python -m app.api.address_factory COUNT"""
+    parser = argparse.ArgumentParser(description='批量生成TRON地址（NDJSON格式输出）')
+    parser.add_argument('count', type=int, help='生成数量')
+    parser.add_argument('--mnemonic', action='store_true', help='为每个地址生成助记词')
+    parser.add_argument('--workers', type=int, default=0, help='工作进程数，默认CPU核数')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='每批地址数量')
+    parser.add_argument('-o', '--output', default=None, help='输出文件，默认标准输出')
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    started = time.time()
+    try:
+        for block in iter_address_batches(args.count, args.mnemonic, args.workers, args.chunk_size):
+            output.write(block)
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.time() - started
+    print(f"已生成 {args.count} 个地址，耗时 {elapsed:.1f} 秒（{args.count / max(elapsed, 1e-9):.0f} 个/秒）",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
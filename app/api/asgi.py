@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ASGI服务入口
+
+链上查询类的 /v1/* 接口由AsyncTronAPI在事件循环中处理，请求参数、响应结构与Flask路由完全一致；
+其余路由（主页、文档、地址生成等）转交给Flask应用在线程池中执行。
+"""
+
+import asyncio
+import io
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import request
+
+from app.api.async_tron_api import AsyncTronAPI
+
+
+def _param(name: str, default: Any = None) -> Any:
+    """与Flask路由相同的取参方式"""
+    return request.args.get(name) or request.form.get(name, default)
+
+
+def _batch_balances(api: AsyncTronAPI):
+    payload = request.get_json(silent=True) or {}
+    addresses = payload.get('addresses')
+    if addresses is None and request.form.get('addresses'):
+        addresses = [a.strip() for a in request.form.get('addresses').split(',') if a.strip()]
+    return api.get_batch_balances(addresses, payload.get('assets'))
+
+
+def _list_param(name: str, payload: Dict) -> Optional[List[str]]:
+    """列表参数：JSON数组，或逗号分隔的查询参数"""
+    if isinstance(payload.get(name), list):
+        return payload[name]
+    value = _param(name)
+    if value:
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return None
+
+
+def _portfolio(api: AsyncTronAPI):
+    payload = request.get_json(silent=True) or {}
+    addresses = _list_param('addresses', payload) or _list_param('address', payload)
+    return api.get_portfolio(addresses, _list_param('tokens', payload))
+
+
+def _idempotency_key() -> Optional[str]:
+    return request.headers.get('Idempotency-Key') or _param('idempotencyKey')
+
+
+def _send_batch(api: AsyncTronAPI):
+    payload = request.get_json(silent=True) or {}
+    return api.send_batch(payload.get('transfers'), payload.get('key'))
+
+
+def _submit_payouts(api: AsyncTronAPI):
+    payload = request.get_json(silent=True) or {}
+    return api.submit_payouts(payload.get('payouts'), payload.get('key'))
+
+
+# 路径 -> (允许的方法, 处理函数)
+ASYNC_ROUTES: Dict[str, Tuple[Tuple[str, ...], Callable]] = {
+    '/v1/getTrxBalance': (('GET', 'POST'), lambda api: api.get_trx_balance(_param('address'))),
+    '/v1/getTrc20Balance': (('GET', 'POST'), lambda api: api.get_trc20_balance(_param('address'), _param('contract'))),
+    '/v1/getTrc10Info': (('GET', 'POST'), lambda api: api.get_trc10_info(_param('address'), _param('tokenId'))),
+    '/v1/batch/balances': (('POST',), _batch_balances),
+    '/v1/getPortfolio': (('GET', 'POST'), _portfolio),
+    '/v1/sendTrx': (('GET', 'POST'), lambda api: api.send_trx(_param('to'), _param('amount'), _param('key'),
+                                                              _param('message'), _idempotency_key())),
+    '/v1/sendTrc20': (('GET', 'POST'), lambda api: api.send_trc20(_param('to'), _param('amount'), _param('key'),
+                                                                  _idempotency_key())),
+    '/v1/sendTrc10': (('GET', 'POST'), lambda api: api.send_trc10(_param('to'), _param('amount'), _param('key'),
+                                                                  _param('tokenId', '1002992'), _idempotency_key())),
+    '/v1/batch/send': (('POST',), _send_batch),
+    '/v1/payouts': (('POST',), _submit_payouts),
+    '/v1/getPayout': (('GET', 'POST'), lambda api: api.get_payout(_param('id'), _idempotency_key())),
+    '/v1/getTransaction': (('GET', 'POST'), lambda api: api.get_transaction(_param('txID'))),
+    '/v1/getTrc20TransactionReceipt': (('GET', 'POST'), lambda api: api.get_trc20_transaction_receipt(_param('txID'))),
+    '/v1/getBlockHeight': (('GET', 'POST'), lambda api: api.get_block_height(_param('detail'), _param('fields'))),
+    '/v1/getBlockByNumber': (('GET', 'POST'), lambda api: api.get_block_by_number(
+        _param('blockID'), _param('detail'), _param('fields'))),
+}
+
+
+class ASGIApp:
+    """ASGI应用：异步处理链上查询，其余请求回落到Flask"""
+
+    def __init__(self, flask_app, tron_api: AsyncTronAPI = None):
+        """
+        初始化ASGI应用
+
+        Args:
+            flask_app: create_app()创建的Flask应用
+            tron_api (AsyncTronAPI): 异步API实例，默认与Flask应用共用缓存
+        """
+        self.flask_app = flask_app
+        if tron_api is None:
+            sync_api = flask_app.extensions.get('tron_api')
+            tron_api = AsyncTronAPI(flask_app.config, cache=sync_api.cache if sync_api else None)
+            tron_api.block_store = sync_api.block_store if sync_api else None
+            tron_api.payout_queue = sync_api.payout_queue if sync_api else None
+            if sync_api:
+                tron_api.token_registry = sync_api.token_registry
+                tron_api.router = sync_api.router
+                tron_api.api_keys = sync_api.api_keys
+        self.tron_api = tron_api
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await self._read_body(receive)
+        route = ASYNC_ROUTES.get(scope['path'])
+        if route is not None and scope['method'] in route[0]:
+            await self._handle_async(scope, body, route[1], send)
+        else:
+            await self._handle_wsgi(scope, body, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.tron_api.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _handle_async(self, scope, body: bytes, handler: Callable, send):
+        """在事件循环中执行链上查询"""
+        environ = self._build_environ(scope, body)
+        # 在Flask请求上下文中处理，复用相同的取参方式、序列化和before/after_request钩子（如CORS）
+        with self.flask_app.request_context(environ):
+            try:
+                response = self.flask_app.preprocess_request()
+                if response is None:
+                    response = self.flask_app.json.response(await handler(self.tron_api))
+                else:
+                    response = self.flask_app.make_response(response)
+                response = self.flask_app.process_response(response)
+            except Exception as e:
+                response = self.flask_app.handle_exception(e)
+            await self._send_response(send, response.status_code, response.headers.items(), [response.get_data()])
+
+    async def _handle_wsgi(self, scope, body: bytes, send):
+        """在线程池中执行Flask应用，按块流式返回响应"""
+        loop = asyncio.get_running_loop()
+        environ = self._build_environ(scope, body)
+        status_holder: Dict[str, Any] = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            status_holder['status'] = int(status.split(' ', 1)[0])
+            status_holder['headers'] = response_headers
+
+        def run_app():
+            result = self.flask_app(environ, start_response)
+            return result, iter(result)
+
+        result, iterator = await loop.run_in_executor(None, run_app)
+        sentinel = object()
+        try:
+            first = await loop.run_in_executor(None, next, iterator, sentinel)
+            await send({
+                'type': 'http.response.start',
+                'status': status_holder['status'],
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in status_holder['headers']]
+            })
+            chunk = first
+            while chunk is not sentinel:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(None, next, iterator, sentinel)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(None, result.close)
+
+    @staticmethod
+    async def _send_response(send, status: int, headers, chunks: List[bytes]):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        })
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    @staticmethod
+    def _headers(scope) -> Dict[str, str]:
+        return {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+
+    def _build_environ(self, scope, body: bytes) -> Dict[str, Any]:
+        """根据ASGI scope构建WSGI environ"""
+        server: Optional[Tuple[str, int]] = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        for name, value in self._headers(scope).items():
+            key = name.upper().replace('-', '_')
+            if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[key] = value
+            else:
+                environ[f'HTTP_{key}'] = value
+        # 请求体已完整读取，按实际长度设置（兼容分块传输）
+        environ['CONTENT_LENGTH'] = str(len(body))
+        return environ
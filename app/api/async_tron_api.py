@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TRON区块链API异步客户端
+
+AsyncTronAPI与TronAPI共用同一套查询流程，只是把上游请求换成基于httpx的异步连接池，
+单个进程即可同时保持大量进行中的链上查询，不再占用工作线程等待上游响应。
+"""
+
+import asyncio
+import ssl
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.api.rate_limit import parse_retry_after
+from app.api.tron_api import UPSTREAM_ERRORS, TronAPI, Flow, Offload, Parallel
+from app.api.upstream import NON_IDEMPOTENT_ENDPOINTS, Endpoint
+from app.utils import tracing
+from app.utils.single_flight import AsyncSingleFlight
+
+
+class AsyncTronAPI(TronAPI):
+    """TronAPI的asyncio版本，公开方法与TronAPI一致，均为协程"""
+
+    def __init__(self, config: Dict = None, cache=None):
+        """
+        初始化异步TRON API
+
+        Args:
+            config (dict): 配置项，默认读取Config类
+            cache (CacheBackend): 缓存后端，可与同步TronAPI共用
+        """
+        super().__init__(config, cache)
+        self._client: Optional[httpx.AsyncClient] = None
+        if self.single_flight is not None:
+            self.single_flight = AsyncSingleFlight()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取（首次使用时创建）异步HTTP连接池，需在事件循环中调用"""
+        if self._client is None:
+            pool_size = self._config('HTTP_POOL_MAXSIZE', 50)
+            limits = httpx.Limits(
+                max_connections=self._config('ASYNC_MAX_CONNECTIONS', pool_size * 4),
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=self._config('ASYNC_KEEPALIVE_EXPIRY', 30)
+            )
+            transport = httpx.AsyncHTTPTransport(
+                limits=limits,
+                retries=self._config('HTTP_MAX_RETRIES', 2)  # 仅重试连接失败
+            )
+            self._client = httpx.AsyncClient(
+                transport=transport,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                headers=self.REQUEST_HEADERS,
+                trust_env=False  # 忽略系统代理设置
+            )
+        return self._client
+
+    async def aclose(self):
+        """关闭异步连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_transport_stats(self) -> Dict:
+        """获取HTTP连接池配置信息"""
+        stats = super().get_transport_stats()
+        stats['async_client_open'] = self._client is not None
+        return stats
+
+    # ==================== 请求执行 ====================
+
+    async def _make_request(self, endpoint: str, method: str = 'GET', data: Dict = None, raw: bool = False) -> Dict:
+        """异步发送HTTP请求到TRON网络（只读查询优先读取缓存，相同的并发请求只发送一次）"""
+        with tracing.tracer.span('tron.request', {'tron.endpoint': endpoint, 'http.method': method.upper()}) as span:
+            cache_key, cached = self._cache_lookup(endpoint, method, data, raw)
+            if cached is not None:
+                return cached
+
+            if self.single_flight is None or endpoint in NON_IDEMPOTENT_ENDPOINTS:
+                response = await self._fetch(cache_key, endpoint, method, data, raw)
+            else:
+                flight_key = cache_key or self._cache_key(endpoint, method, data, raw)
+                response, shared = await self.single_flight.do(
+                    flight_key, lambda: self._fetch(cache_key, endpoint, method, data, raw))
+                span.set_attribute('single_flight.shared', shared)
+            self._trace_response(span, response)
+            return response
+
+    async def _fetch(self, cache_key: Optional[str], endpoint: str, method: str, data: Dict, raw: bool = False) -> Dict:
+        """请求上游并写入缓存"""
+        response, size = await self._send_request(endpoint, method, data, raw)
+        self._cache_store(cache_key, endpoint, response, size, data)
+        return response
+
+    async def _send_request(self, endpoint: str, method: str = 'GET', data: Dict = None,
+                            raw: bool = False) -> Tuple[Dict, int]:
+        """异步发送HTTP请求到TRON网络，返回(响应数据, 响应字节数)，对冲和故障转移规则同TronAPI"""
+        router = self.router
+        if len(router.endpoints) == 1:
+            return (await self._request_node(router.select(), endpoint, method, data, raw))[:2]
+
+        max_attempts = self._config('UPSTREAM_MAX_ATTEMPTS', 2)
+        hedge = router.can_hedge(endpoint)
+        tried: List[Endpoint] = []
+        pending = {}
+
+        def launch() -> bool:
+            node = router.select(exclude=tried)
+            if node is None:
+                return False
+            tried.append(node)
+            pending[asyncio.ensure_future(self._request_node(node, endpoint, method, data, raw))] = node
+            return True
+
+        launch()
+        hedged = False
+        last = ({'error': '没有可用的上游节点'}, 0)
+        try:
+            while pending:
+                timeout = router.hedge_delay() if hedge and not hedged else None
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    node = pending.pop(task)
+                    response, size, healthy = task.result()
+                    if healthy:
+                        if hedged:
+                            router.note_hedge(won=node is not tried[0])
+                        return response, size
+                    last = (response, size)
+
+                if not pending and router.can_failover(endpoint) and len(tried) < max_attempts:
+                    hedged = True
+                    if launch():
+                        router.note_failover()
+            return last
+        finally:
+            # 已有结果时取消落后的请求
+            for task in pending:
+                task.cancel()
+
+    async def _request_node(self, node: Endpoint, endpoint: str, method: str, data: Dict,
+                            raw: bool = False) -> Tuple[Dict, int, bool]:
+        """向指定节点发送请求，返回(响应数据, 响应字节数, 节点是否正常)"""
+        url = f"{node.url}{endpoint}"
+        client = self._get_client()
+
+        slot, wait, shed = self._reserve_api_key(node)
+        if shed is not None:
+            UPSTREAM_ERRORS.inc(endpoint=endpoint, type='RateLimited')
+            return shed, 0, True
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.router.release(node, 0, None)
+                raise
+        headers = self.api_keys.headers(slot)
+        span = self._start_node_span(node, endpoint, method, wait)
+        tracing.inject(headers, span)
+
+        started = time.monotonic()
+        status = None
+        error_type = None
+
+        try:
+            if method.upper() == 'POST':
+                response = await client.post(url, json=data, headers=headers)
+            else:
+                response = await client.get(url, params=data, headers=headers)
+
+            status = response.status_code
+            if status == 429 and slot is not None:
+                self.api_keys.penalize(slot, parse_retry_after(response.headers.get('Retry-After')))
+            response.raise_for_status()
+            result = self._decode_body(response.content, raw), len(response.content)
+        except asyncio.CancelledError:
+            self.router.release(node, time.monotonic() - started, None)
+            span.set_status('ERROR', '请求已取消')
+            span.end()
+            raise
+        except httpx.ProxyError as e:
+            result = {'error': f'代理连接错误: {str(e)}'}, 0
+            error_type = 'ProxyError'
+        except httpx.ConnectError as e:
+            if isinstance(e.__context__, ssl.SSLError):
+                result = {'error': f'SSL连接错误: {str(e)}'}, 0
+                error_type = 'SSLError'
+            else:
+                result = {'error': f'网络连接错误: {str(e)}'}, 0
+                error_type = 'ConnectionError'
+        except httpx.TimeoutException as e:
+            result = {'error': f'请求超时: {str(e)}'}, 0
+            error_type = 'Timeout'
+        except httpx.NetworkError as e:
+            result = {'error': f'网络连接错误: {str(e)}'}, 0
+            error_type = 'ConnectionError'
+        except (httpx.HTTPError, ValueError) as e:
+            result = {'error': f'请求异常: {str(e)}'}, 0
+            error_type = 'HTTPError' if status and status >= 400 else type(e).__name__
+
+        return result[0], result[1], self._release_node(node, endpoint, started, result[0], status, error_type, span)
+
+    async def _fan_out(self, calls: Dict[str, Tuple[str, str, Dict]], timeout: float = None) -> Dict[str, Dict]:
+        """并发执行互不依赖的上游子请求，超时未返回的子请求记为错误"""
+        if timeout is None:
+            timeout = self._config('FANOUT_LEG_TIMEOUT', 10)
+
+        tasks = {
+            name: asyncio.ensure_future(self._make_request(endpoint, method, data))
+            for name, (endpoint, method, data) in calls.items()
+        }
+        await asyncio.wait(tasks.values(), timeout=timeout)
+
+        results = {}
+        for name, task in tasks.items():
+            if not task.done():
+                task.cancel()
+                results[name] = {'error': f'请求超时: 子请求超过{timeout}秒未返回'}
+                continue
+            try:
+                results[name] = task.result()
+            except Exception as e:
+                results[name] = {'error': f'请求异常: {str(e)}'}
+        return results
+
+    async def _run_flow(self, flow: Flow) -> Any:
+        """异步执行查询流程（流程定义见TronAPI._run_flow）"""
+        result, error = None, None
+        while True:
+            try:
+                step = flow.throw(error) if error is not None else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+
+            result, error = None, None
+            try:
+                if isinstance(step, Parallel):
+                    result = await self._run_parallel(step)
+                elif isinstance(step, Offload):
+                    result = await self._run_offload(step)
+                elif isinstance(step, dict):
+                    result = await self._fan_out(step)
+                else:
+                    result = await self._make_request(*step)
+            except Exception as e:
+                error = e
+
+    async def _run_parallel(self, parallel: Parallel) -> List[Any]:
+        """以有界并发执行子流程，返回结果列表（失败项为异常对象）"""
+        semaphore = asyncio.Semaphore(max(1, parallel.limit))
+
+        async def run(flow):
+            async with semaphore:
+                try:
+                    return await self._run_flow(flow)
+                except Exception as e:
+                    return e
+
+        return list(await asyncio.gather(*(run(flow) for flow in parallel.flows)))
+
+    async def _run_offload(self, offload: Offload) -> List[Any]:
+        """CPU密集步骤放到签名线程池执行，事件循环继续处理其他请求"""
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(loop.run_in_executor(self._sign_executor, tracing.bind(offload.func), item)
+                                           for item in offload.items)))
+
+    def _success_response(self, msg: str, data: Any = None) -> Dict:
+        """成功响应格式（异步版本始终返回字典，由调用方序列化）"""
+        return self._envelope(1, msg, data)
+
+    def _error_response(self, msg: str, data: Any = None) -> Dict:
+        """错误响应格式（异步版本始终返回字典，由调用方序列化）"""
+        return self._envelope(0, msg, data)
+
+    # ==================== 地址生成相关方法 ====================
+
+    async def create_address(self) -> Dict:
+        """生成TRON地址（简单版本）"""
+        return super().create_address()
+
+    async def generate_address_with_mnemonic(self) -> Dict:
+        """通过助记词生成TRON地址"""
+        return super().generate_address_with_mnemonic()
+
+    async def derive_addresses(self, mnemonic: str = None, xpub: str = None, account=0, start=0, count=20,
+                               passphrase: str = '') -> Dict:
+        """按BIP-44路径推导一段地址"""
+        return super().derive_addresses(mnemonic, xpub, account, start, count, passphrase)
+
+    async def get_address_by_key(self, private_key: str) -> Dict:
+        """根据私钥获取地址信息"""
+        return super().get_address_by_key(private_key)
+
+    # ==================== 余额查询相关方法 ====================
+
+    async def get_trx_balance(self, address: str) -> Dict:
+        """查询TRX余额"""
+        return await self._run_flow(self._trx_balance_flow(address))
+
+    async def get_trc20_balance(self, address: str, contract: str = None) -> Dict:
+        """查询TRC20代币余额，默认查询USDT"""
+        return await self._run_flow(self._trc20_balance_flow(address, contract))
+
+    async def get_trc10_info(self, address: str = None, token_id: str = None) -> Dict:
+        """查询TRC10代币余额和信息"""
+        return await self._run_flow(self._trc10_info_flow(address, token_id))
+
+    async def get_batch_balances(self, addresses: List[str], assets: List = None) -> Dict:
+        """批量查询多个地址的余额"""
+        return await self._run_flow(self._batch_balances_flow(addresses, assets))
+
+    async def get_portfolio(self, addresses: List[str], tokens: List[str] = None) -> Dict:
+        """组合查询多个地址的TRX和TRC20余额"""
+        return await self._run_flow(self._portfolio_flow(addresses, tokens))
+
+    # ==================== 转账相关方法 ====================
+
+    async def send_trx(self, to: str, amount: str, key: str, message: str = None, idempotency_key: str = None) -> Dict:
+        """TRX转账"""
+        if self.payout_queue:
+            return await self._run_blocking(self._queued_send, 'trx', to, amount, key, idempotency_key, message=message)
+        return await self._run_flow(self._send_single_flow('trx', to, amount, key, message=message))
+
+    async def send_trc20(self, to: str, amount: str, key: str, idempotency_key: str = None) -> Dict:
+        """TRC20代币转账（如USDT）"""
+        if self.payout_queue:
+            return await self._run_blocking(self._queued_send, 'trc20', to, amount, key, idempotency_key)
+        return await self._run_flow(self._send_single_flow('trc20', to, amount, key))
+
+    async def send_trc10(self, to: str, amount: str, key: str, token_id: str = '1002992',
+                         idempotency_key: str = None) -> Dict:
+        """TRC10代币转账"""
+        if self.payout_queue:
+            return await self._run_blocking(self._queued_send, 'trc10', to, amount, key, idempotency_key,
+                                            token_id=token_id)
+        return await self._run_flow(self._send_single_flow('trc10', to, amount, key, token_id=token_id))
+
+    async def send_batch(self, transfers: List[Dict], key: str = None) -> Dict:
+        """批量转账"""
+        if self.payout_queue:
+            return await self._run_blocking(self._queued_batch, transfers, key)
+        return await self._run_flow(self._send_batch_flow(transfers, key))
+
+    async def submit_payouts(self, payouts: List[Dict], key: str) -> Dict:
+        """批量提交转账到队列"""
+        return await self._run_blocking(super().submit_payouts, payouts, key)
+
+    async def get_payout(self, payout_id=None, idempotency_key: str = None) -> Dict:
+        """查询队列中的转账"""
+        return await self._run_blocking(super().get_payout, payout_id, idempotency_key)
+
+    @staticmethod
+    async def _run_blocking(func, *args, **kwargs):
+        """在线程池中执行会阻塞的操作（转账队列读写和等待）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+
+    # ==================== 交易查询相关方法 ====================
+
+    async def get_transaction(self, tx_id: str) -> Dict:
+        """查询交易详情（通用）"""
+        return await self._run_flow(self._transaction_flow(tx_id))
+
+    async def get_trc20_transaction_receipt(self, tx_id: str) -> Dict:
+        """查询TRC20交易回执"""
+        return await self._run_flow(self._trc20_receipt_flow(tx_id))
+
+    # ==================== 区块链信息查询方法 ====================
+
+    async def get_block_height(self, detail: str = None, fields: str = None) -> Dict:
+        """获取当前区块高度"""
+        return await self._run_flow(self._block_height_flow(detail, fields))
+
+    async def get_block_by_number(self, block_id: str, detail: str = None, fields: str = None) -> Dict:
+        """根据区块号查询区块信息"""
+        return await self._run_flow(self._block_by_number_flow(block_id, detail, fields))
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地区块索引存储（SQLite）
+
+保存已固化的区块、交易、交易回执和TRC20 Transfer日志，
+供区块/交易查询优先从本地读取，减少对TronGrid的远程调用。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.api import abi
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    block_id TEXT NOT NULL UNIQUE,
+    timestamp INTEGER,
+    tx_count INTEGER NOT NULL,
+    header TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    tx_id TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    raw TEXT NOT NULL,
+    info TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_block ON transactions (block_number, position);
+
+CREATE TABLE IF NOT EXISTS trc20_transfers (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_id TEXT NOT NULL,
+    block_timestamp INTEGER,
+    contract TEXT NOT NULL,
+    from_address TEXT NOT NULL,
+    to_address TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_trc20_transfers_tx ON trc20_transfers (tx_id);
+CREATE INDEX IF NOT EXISTS idx_trc20_transfers_contract ON trc20_transfers (contract, block_number);
+
+CREATE TABLE IF NOT EXISTS address_transfers (
+    address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    direction TEXT NOT NULL,
+    counterparty TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    tx_id TEXT NOT NULL,
+    block_timestamp INTEGER,
+    contract TEXT NOT NULL,
+    PRIMARY KEY (address, block_number, log_index)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def decode_transfer_logs(tx_info: Dict, start_index: int) -> List[Dict]:
+    """
+    从交易回执中解析TRC20 Transfer日志
+
+    Args:
+        tx_info (dict): gettransactioninfo返回的交易回执
+        start_index (int): 本交易第一条日志在区块内的序号
+
+    Returns:
+        list: Transfer记录，log_index为区块内的日志序号
+    """
+    logs = tx_info.get('log')
+    if not logs:
+        return []
+    tx_id = tx_info.get('id')
+    block_number = tx_info.get('blockNumber')
+    block_timestamp = tx_info.get('blockTimeStamp')
+    return [{
+        'log_index': start_index + offset,
+        'tx_id': tx_id,
+        'block_number': block_number,
+        'block_timestamp': block_timestamp,
+        'contract': contract,
+        'from_address': from_address,
+        'to_address': to_address,
+        'amount': str(amount)
+    } for offset, contract, from_address, to_address, amount in abi.decode_transfer_logs(logs)]
+
+
+class BlockStore:
+    """区块索引存储，线程安全"""
+
+    def __init__(self, path: str, tracked_contracts: Iterable[str] = ()):
+        """
+        打开（或创建）索引数据库
+
+        Args:
+            path (str): SQLite数据库文件路径，':memory:'表示内存数据库
+            tracked_contracts: 需要按地址建立转账历史的TRC20合约（base58地址）
+        """
+        if path != ':memory:':
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connect()
+
+        self.tracked_contracts = frozenset(tracked_contracts)
+        self._sync_tracked_contracts()
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def reopen(self):
+        """fork后在子进程中重新连接数据库（SQLite连接不能跨进程使用）"""
+        self._lock = threading.Lock()
+        if self.path != ':memory:':
+            self._connect()
+
+    def _sync_tracked_contracts(self):
+        """跟踪的合约变化时，根据已索引的Transfer日志重建地址转账表"""
+        tracked = ','.join(sorted(self.tracked_contracts))
+        if self.get_state('address_transfer_contracts', '') == tracked:
+            return
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM address_transfers')
+                for contract in self.tracked_contracts:
+                    rows = self._conn.execute(
+                        'SELECT block_number, log_index, tx_id, block_timestamp, contract, from_address, '
+                        'to_address, amount FROM trc20_transfers WHERE contract = ?', (contract,)
+                    ).fetchall()
+                    self._conn.executemany(
+                        'INSERT OR REPLACE INTO address_transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        [entry for row in rows for entry in self._address_rows(*row)]
+                    )
+                self._conn.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?)',
+                                   ('address_transfer_contracts', tracked))
+
+    @staticmethod
+    def _address_rows(block_number, log_index, tx_id, block_timestamp, contract, from_address, to_address, amount):
+        """一条Transfer日志对应的地址转账记录（转出方和转入方各一条，自转账一条）"""
+        if from_address == to_address:
+            return [(from_address, block_number, log_index, 'self', to_address, amount, tx_id, block_timestamp, contract)]
+        return [
+            (from_address, block_number, log_index, 'out', to_address, amount, tx_id, block_timestamp, contract),
+            (to_address, block_number, log_index, 'in', from_address, amount, tx_id, block_timestamp, contract)
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ==================== 写入 ====================
+
+    def save_blocks(self, blocks: Iterable[Dict]):
+        """
+        在一个事务中写入一批区块
+
+        Args:
+            blocks: 元素为 {'block': getblockbynum结果, 'infos': gettransactioninfobyblocknum结果}
+        """
+        block_rows, tx_rows, transfer_rows, address_rows = [], [], [], []
+        for item in blocks:
+            block = item['block']
+            infos = {info.get('id'): info for info in item.get('infos') or []}
+            raw_data = block.get('block_header', {}).get('raw_data', {})
+            number = raw_data.get('number', 0)
+            transactions = block.get('transactions', [])
+
+            header = {'blockID': block.get('blockID'), 'block_header': block.get('block_header')}
+            block_rows.append((number, block.get('blockID'), raw_data.get('timestamp'),
+                               len(transactions), json.dumps(header, separators=(',', ':'))))
+
+            log_index = 0
+            for position, tx in enumerate(transactions):
+                info = infos.get(tx.get('txID'))
+                tx_rows.append((tx.get('txID'), number, position, json.dumps(tx, separators=(',', ':')),
+                                json.dumps(info, separators=(',', ':')) if info else None))
+                if info:
+                    for transfer in decode_transfer_logs(info, log_index):
+                        row = (number, transfer['log_index'], transfer['tx_id'], transfer['block_timestamp'],
+                               transfer['contract'], transfer['from_address'], transfer['to_address'],
+                               transfer['amount'])
+                        transfer_rows.append(row)
+                        if transfer['contract'] in self.tracked_contracts:
+                            address_rows.extend(self._address_rows(*row))
+                    log_index += len(info.get('log', []))
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?)', block_rows)
+                self._conn.executemany('INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?)', tx_rows)
+                self._conn.executemany('INSERT OR REPLACE INTO trc20_transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                       transfer_rows)
+                self._conn.executemany('INSERT OR REPLACE INTO address_transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                       address_rows)
+
+    def set_state(self, key: str, value):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?)', (key, str(value)))
+
+    def get_state(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else default
+
+    # ==================== 查询 ====================
+
+    def get_block_by_number(self, number: int, with_transactions: bool = True) -> Optional[Dict]:
+        """按区块号查询区块，结构与getblockbynum一致"""
+        with self._lock:
+            row = self._conn.execute('SELECT number, header, tx_count FROM blocks WHERE number = ?',
+                                     (number,)).fetchone()
+        return self._load_block(row, with_transactions) if row else None
+
+    def get_block_by_id(self, block_id: str, with_transactions: bool = True) -> Optional[Dict]:
+        """按区块哈希查询区块，结构与getblockbyid一致"""
+        with self._lock:
+            row = self._conn.execute('SELECT number, header, tx_count FROM blocks WHERE block_id = ?',
+                                     (block_id,)).fetchone()
+        return self._load_block(row, with_transactions) if row else None
+
+    def _load_block(self, row: sqlite3.Row, with_transactions: bool) -> Dict:
+        block = json.loads(row['header'])
+        if with_transactions and row['tx_count']:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT raw FROM transactions WHERE block_number = ? ORDER BY position',
+                    (row['number'],)
+                ).fetchall()
+            block['transactions'] = [json.loads(tx['raw']) for tx in rows]
+        return block
+
+    def get_transaction(self, tx_id: str) -> Optional[Dict]:
+        """查询交易，结构与gettransactionbyid一致"""
+        with self._lock:
+            row = self._conn.execute('SELECT raw FROM transactions WHERE tx_id = ?', (tx_id,)).fetchone()
+        return json.loads(row['raw']) if row else None
+
+    def get_transaction_info(self, tx_id: str) -> Optional[Dict]:
+        """查询交易回执，结构与gettransactioninfobyid一致"""
+        with self._lock:
+            row = self._conn.execute('SELECT info FROM transactions WHERE tx_id = ?', (tx_id,)).fetchone()
+        return json.loads(row['info']) if row and row['info'] else None
+
+    def get_address_transfers(self, address: str, since_block: int = 0, after: Optional[tuple] = None,
+                              direction: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """
+        按地址查询跟踪合约的转账记录，按 (区块号, 日志序号) 升序
+
+        Args:
+            address (str): base58地址
+            since_block (int): 起始区块号（包含）
+            after (tuple): 分页游标 (区块号, 日志序号)，只返回其后的记录
+            direction (str): 'in'、'out' 或 None（全部，自转账两者都包含）
+            limit (int): 最多返回条数
+        """
+        sql = ('SELECT block_number, log_index, direction, counterparty, amount, tx_id, block_timestamp, contract '
+               'FROM address_transfers WHERE address = ? AND block_number >= ?')
+        params: list = [address, since_block]
+        if after:
+            sql += ' AND (block_number > ? OR (block_number = ? AND log_index > ?))'
+            params.extend([after[0], after[0], after[1]])
+        if direction in ('in', 'out'):
+            sql += " AND direction IN (?, 'self')"
+            params.append(direction)
+        sql += ' ORDER BY block_number, log_index LIMIT ?'
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_stats(self) -> Dict:
+        """获取索引统计信息"""
+        with self._lock:
+            row = self._conn.execute('SELECT MIN(number) AS low, MAX(number) AS high, COUNT(*) AS total FROM blocks').fetchone()
+        return {
+            'path': self.path,
+            'lowest_block': row['low'],
+            'highest_block': row['high'],
+            'blocks': row['total']
+        }
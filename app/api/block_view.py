@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+区块响应裁剪
+
+完整区块包含全部交易，常见场景只需要区块头或交易ID。detail 控制区块内容：
+- header: 只返回区块头（blockID、block_header）
+- txids: 区块头 + 交易ID列表
+- full: 完整区块（含全部交易）
+
+fields 按点分路径选择返回字段，例如 "blockID,block_header.raw_data.number"；
+路径经过列表时对每个元素分别选择，例如 "transactions.txID"。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+DETAIL_HEADER = 'header'
+DETAIL_TXIDS = 'txids'
+DETAIL_FULL = 'full'
+DETAIL_MODES = (DETAIL_HEADER, DETAIL_TXIDS, DETAIL_FULL)
+
+# 单次请求最多选择的字段数
+MAX_FIELDS = 50
+
+
+def parse_detail(value: Optional[str], default: str) -> str:
+    """解析detail参数，无效值抛出ValueError"""
+    if not value:
+        return default
+    detail = value.strip().lower()
+    if detail not in DETAIL_MODES:
+        raise ValueError(f'detail参数无效，可选值：{"/".join(DETAIL_MODES)}')
+    return detail
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """解析fields参数（逗号分隔），为空时返回None表示不裁剪"""
+    if not value:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f'fields最多选择{MAX_FIELDS}个字段')
+    return fields or None
+
+
+def block_number(block: Dict) -> int:
+    return block.get('block_header', {}).get('raw_data', {}).get('number', 0)
+
+
+def slim_block(block: Dict, detail: str) -> Dict:
+    """按detail裁剪区块，不修改原对象（原对象可能来自缓存）"""
+    if detail == DETAIL_FULL:
+        return block
+    slim = {key: value for key, value in block.items() if key != 'transactions'}
+    if detail == DETAIL_TXIDS:
+        slim['transactions'] = [tx.get('txID') for tx in block.get('transactions') or []]
+    return slim
+
+
+def project(data: Any, fields: Optional[Iterable[str]]) -> Any:
+    """按点分路径选择字段，不存在的路径忽略"""
+    if not fields:
+        return data
+    tree: Dict = {}
+    for field in fields:
+        node = tree
+        for part in field.split('.'):
+            node = node.setdefault(part, {})
+    return _select(data, tree)
+
+
+def _select(data: Any, tree: Dict) -> Any:
+    if not tree:
+        return data
+    if isinstance(data, list):
+        return [_select(item, tree) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {key: _select(data[key], subtree) for key, subtree in tree.items() if key in data}
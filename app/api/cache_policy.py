@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+链上只读查询的缓存策略
+
+根据接口和返回内容决定缓存时长：
+- 余额、最新区块等数据约一个出块间隔（~3秒）后失效
+- 交易内容、TRC10代币元数据、已固化区块永久缓存
+"""
+
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from app.utils.cache import FOREVER
+from app.utils.json_provider import RawJSON
+
+# TRON出块间隔（秒）
+BLOCK_INTERVAL = 3
+
+# 超过该确认数的区块视为已固化（不可逆）
+SOLIDIFIED_DEPTH = 19
+
+# 上游原始响应小于该字节数时直接解析（同时识别错误和空结果），否则只读取开头的区块号
+RAW_PARSE_LIMIT = 4096
+
+# 区块头在交易列表之前，区块号只在响应开头这段范围内查找
+RAW_SCAN_BYTES = 1024
+_BLOCK_NUMBER = re.compile(rb'"number"\s*:\s*(\d+)')
+_TX_BLOCK_NUMBER = re.compile(rb'"blockNumber"\s*:\s*(\d+)')
+
+
+class ChainCachePolicy:
+    """按接口计算缓存TTL"""
+
+    # 短时缓存的接口（秒）
+    DEFAULT_TTLS = {
+        '/wallet/getnowblock': BLOCK_INTERVAL,
+        '/wallet/getaccount': BLOCK_INTERVAL,
+        '/wallet/triggersmartcontract': BLOCK_INTERVAL,
+        '/wallet/triggerconstantcontract': BLOCK_INTERVAL,
+        '/wallet/getassetissuebyid': FOREVER,
+        '/wallet/gettransactionbyid': FOREVER
+    }
+
+    # 需要根据区块号判断是否已固化的接口
+    FINALIZED_ENDPOINTS = (
+        '/wallet/getblock',
+        '/wallet/getblockbynum',
+        '/wallet/getblockbyid',
+        '/wallet/gettransactioninfobyid'
+    )
+
+    def __init__(self, overrides: Optional[Dict[str, float]] = None,
+                 short_ttl: float = BLOCK_INTERVAL, solidified_depth: int = SOLIDIFIED_DEPTH):
+        """
+        初始化缓存策略
+
+        Args:
+            overrides (dict): 按接口覆盖TTL（秒），0表示不缓存
+            short_ttl (float): 未固化数据的缓存时长
+            solidified_depth (int): 固化所需的确认区块数
+        """
+        self.ttls = dict(self.DEFAULT_TTLS)
+        self.ttls.update(overrides or {})
+        self.short_ttl = short_ttl
+        self.solidified_depth = solidified_depth
+        self._head = 0
+        self._lock = threading.Lock()
+
+    @property
+    def head(self) -> int:
+        """最近观察到的最新区块号"""
+        return self._head
+
+    def observe_head(self, number: int):
+        """记录最新区块号，用于判断区块是否已固化"""
+        with self._lock:
+            if number > self._head:
+                self._head = number
+
+    def is_cacheable(self, endpoint: str) -> bool:
+        """接口是否可能被缓存"""
+        if endpoint in self.FINALIZED_ENDPOINTS:
+            return self.ttls.get(endpoint, FOREVER) != 0
+        return self.ttls.get(endpoint, 0) != 0
+
+    def ttl_for(self, endpoint: str, response: Any, request: Optional[Dict] = None) -> float:
+        """
+        计算响应的缓存时长
+
+        Args:
+            endpoint (str): 接口路径
+            response: 上游返回的数据
+            request (dict): 请求参数，已知区块号时（如getblockbynum的num）不需要从响应中读取
+
+        Returns:
+            float: 缓存秒数，0表示不缓存
+        """
+        if isinstance(response, RawJSON):
+            # 上游原始字节：大区块只取区块号，不做完整解析（不影响原样输出）
+            number = self._raw_block_number(endpoint, response, request)
+            if number is not None:
+                return self._block_ttl(endpoint, number)
+            try:
+                response = response.parsed()
+            except ValueError:
+                return 0
+
+        # 错误和空结果（如尚未上链的交易）不缓存
+        if not isinstance(response, dict) or not response or 'error' in response or 'Error' in response:
+            return 0
+
+        if endpoint == '/wallet/gettransactioninfobyid':
+            return self._block_ttl(endpoint, response.get('blockNumber', 0))
+        return self._block_ttl(endpoint, self._block_number(response))
+
+    def _block_ttl(self, endpoint: str, number: int) -> float:
+        """根据响应所在的区块号计算缓存时长，最新区块接口同时更新最新高度"""
+        if endpoint in ('/wallet/getnowblock', '/wallet/getblock'):
+            self.observe_head(number)
+
+        if endpoint in self.FINALIZED_ENDPOINTS:
+            if number and self._head and number <= self._head - self.solidified_depth:
+                return self.ttls.get(endpoint, FOREVER)
+            return self.short_ttl
+
+        return self.ttls.get(endpoint, 0)
+
+    @staticmethod
+    def _raw_block_number(endpoint: str, response: RawJSON, request: Optional[Dict]) -> Optional[int]:
+        """
+        不解析整个响应获取区块号：优先使用请求参数，否则在响应开头查找
+
+        Returns:
+            int: 区块号，响应较小或未找到时返回None（由调用方完整解析）
+        """
+        if len(response) < RAW_PARSE_LIMIT:
+            return None
+        if request:
+            try:
+                if endpoint == '/wallet/getblockbynum' and 'num' in request:
+                    return int(request['num'])
+                if endpoint == '/wallet/getblockbyid' and request.get('value'):
+                    # 区块ID的前8字节为区块号
+                    return int(str(request['value'])[:16], 16)
+            except (TypeError, ValueError):
+                pass
+        pattern = _TX_BLOCK_NUMBER if endpoint == '/wallet/gettransactioninfobyid' else _BLOCK_NUMBER
+        end = response.data.find(b'"transactions"', 0, RAW_SCAN_BYTES)
+        match = pattern.search(response.data, 0, end if end >= 0 else RAW_SCAN_BYTES)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _block_number(block: Dict) -> int:
+        return block.get('block_header', {}).get('raw_data', {}).get('number', 0)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BIP-32/BIP-44 分层确定性钱包
+
+TRON地址路径为 m/44'/195'/account'/0/index。助记词的PBKDF2种子和推导出的账户节点会缓存，
+同一账户连续推导地址时，每个地址只需要一次HMAC-SHA512和一次椭圆曲线运算。
+"""
+
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.api.address_factory import (CRYPTO_AVAILABLE, SECP256K1_N, address_from_public_key,
+                                     address_from_secret, get_mnemonic)
+
+if CRYPTO_AVAILABLE:
+    import base58
+    from coincurve import PublicKey as CurvePublicKey
+    from Crypto.Hash import RIPEMD160
+
+HARDENED = 0x80000000
+TRON_COIN_TYPE = 195
+XPUB_VERSION = bytes.fromhex('0488b21e')
+
+_cache: 'OrderedDict[tuple, Any]' = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 128  # 缓存的主节点/账户节点数量
+
+
+class HDNode:
+    """BIP-32扩展密钥节点，没有私钥时为只读（xpub）节点"""
+
+    __slots__ = ('chain_code', 'private_key', 'depth', 'parent_fingerprint', 'index',
+                 '_public_key', '_public_bytes')
+
+    def __init__(self, chain_code: bytes, private_key: bytes = None, public_key=None, depth: int = 0,
+                 parent_fingerprint: bytes = b'\x00' * 4, index: int = 0):
+        self.chain_code = chain_code
+        self.private_key = private_key
+        self.depth = depth
+        self.parent_fingerprint = parent_fingerprint
+        self.index = index
+        self._public_key = public_key
+        self._public_bytes = None
+
+    @classmethod
+    def from_seed(cls, seed: bytes) -> 'HDNode':
+        digest = hmac.new(b'Bitcoin seed', seed, hashlib.sha512).digest()
+        return cls(digest[32:], private_key=digest[:32])
+
+    @classmethod
+    def from_xpub(cls, xpub: str) -> 'HDNode':
+        """解析xpub扩展公钥"""
+        try:
+            raw = base58.b58decode_check(xpub)
+        except ValueError:
+            raise ValueError('xpub格式错误')
+        if len(raw) != 78 or raw[:4] != XPUB_VERSION:
+            raise ValueError('xpub格式错误')
+        return cls(raw[13:45], public_key=CurvePublicKey(raw[45:]), depth=raw[4],
+                   parent_fingerprint=raw[5:9], index=int.from_bytes(raw[9:13], 'big'))
+
+    @property
+    def public_key(self):
+        if self._public_key is None:
+            self._public_key = CurvePublicKey.from_valid_secret(self.private_key)
+        return self._public_key
+
+    @property
+    def public_bytes(self) -> bytes:
+        """压缩公钥（33字节）"""
+        if self._public_bytes is None:
+            self._public_bytes = self.public_key.format(compressed=True)
+        return self._public_bytes
+
+    def fingerprint(self) -> bytes:
+        return RIPEMD160.new(hashlib.sha256(self.public_bytes).digest()).digest()[:4]
+
+    def _tweak(self, index: int) -> bytes:
+        if index & HARDENED:
+            if self.private_key is None:
+                raise ValueError('xpub不能推导强化路径')
+            data = b'\x00' + self.private_key + index.to_bytes(4, 'big')
+        else:
+            data = self.public_bytes + index.to_bytes(4, 'big')
+        return hmac.new(self.chain_code, data, hashlib.sha512).digest()
+
+    def child(self, index: int) -> 'HDNode':
+        """推导子节点（index >= HARDENED 为强化推导）"""
+        digest = self._tweak(index)
+        tweak = int.from_bytes(digest[:32], 'big')
+        if tweak >= SECP256K1_N:
+            raise ValueError(f'子节点{index}无效，请使用下一个索引')
+
+        kwargs = {'depth': self.depth + 1, 'parent_fingerprint': self.fingerprint(), 'index': index}
+        if self.private_key is not None:
+            secret = (tweak + int.from_bytes(self.private_key, 'big')) % SECP256K1_N
+            if secret == 0:
+                raise ValueError(f'子节点{index}无效，请使用下一个索引')
+            return HDNode(digest[32:], private_key=secret.to_bytes(32, 'big'), **kwargs)
+        return HDNode(digest[32:], public_key=self.public_key.add(digest[:32]), **kwargs)
+
+    def derive_path(self, path: List[int]) -> 'HDNode':
+        node = self
+        for index in path:
+            node = node.child(index)
+        return node
+
+    def to_xpub(self) -> str:
+        raw = (XPUB_VERSION + bytes([self.depth]) + self.parent_fingerprint +
+               self.index.to_bytes(4, 'big') + self.chain_code + self.public_bytes)
+        return base58.b58encode_check(raw).decode()
+
+    def derive_addresses(self, start: int, count: int) -> List[Dict]:
+        """
+        批量推导本节点下 start 到 start+count-1 的非强化子地址
+
+        直接计算子密钥而不构造中间节点，有私钥时同时返回子私钥。
+        """
+        results = []
+        parent_secret = int.from_bytes(self.private_key, 'big') if self.private_key is not None else None
+        for index in range(start, start + count):
+            digest = self._tweak(index)
+            tweak = int.from_bytes(digest[:32], 'big')
+            if tweak >= SECP256K1_N:
+                continue  # 概率约为2^-127，按BIP-32跳过该索引
+
+            if parent_secret is not None:
+                secret = (tweak + parent_secret) % SECP256K1_N
+                if secret == 0:
+                    continue
+                item = address_from_secret(secret.to_bytes(32, 'big'))
+            else:
+                public_key = self.public_key.add(digest[:32]).format(compressed=False)
+                address, hex_address = address_from_public_key(public_key)
+                item = {'address': address, 'hexAddress': hex_address}
+            item['index'] = index
+            results.append(item)
+        return results
+
+
+def _cached(key: tuple, factory: Callable[[], Any], use_cache: bool) -> Any:
+    if not use_cache:
+        return factory()
+    with _cache_lock:
+        value = _cache.get(key)
+        if value is not None:
+            _cache.move_to_end(key)
+            return value
+    value = factory()
+    with _cache_lock:
+        _cache[key] = value
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return value
+
+
+def account_nodes(mnemonic: str, passphrase: str = '', account: int = 0,
+                  use_cache: bool = True) -> Tuple[HDNode, HDNode]:
+    """
+    获取 m/44'/195'/account' 账户节点及其外部链节点 m/44'/195'/account'/0
+
+    缓存以助记词摘要为键，同一助记词的后续请求跳过PBKDF2和强化路径推导。
+    """
+    if not get_mnemonic().check(mnemonic):
+        raise ValueError('助记词无效')
+    secret_key = hashlib.sha256(f'{mnemonic}\x00{passphrase}'.encode()).digest()
+
+    def master():
+        from mnemonic import Mnemonic
+        return HDNode.from_seed(Mnemonic.to_seed(mnemonic, passphrase))
+
+    def account_level():
+        root = _cached(('master', secret_key), master, use_cache)
+        node = root.derive_path([44 | HARDENED, TRON_COIN_TYPE | HARDENED, account | HARDENED])
+        return node, node.child(0)
+
+    return _cached(('account', secret_key, account), account_level, use_cache)
+
+
+def derive_addresses(mnemonic: str = None, xpub: str = None, account: int = 0, start: int = 0,
+                     count: int = 20, passphrase: str = '', use_cache: bool = True) -> Dict:
+    """
+    按BIP-44推导一段外部地址 m/44'/195'/account'/0/start..start+count-1
+
+    Args:
+        mnemonic (str): 助记词，返回结果包含私钥
+        xpub (str): 账户级（m/44'/195'/account'）扩展公钥，只返回地址
+        account (int): 账户序号，使用xpub时以xpub中的序号为准
+        start (int): 起始地址序号
+        count (int): 地址数量
+        passphrase (str): BIP-39密码
+        use_cache (bool): 是否缓存账户节点
+    """
+    if not CRYPTO_AVAILABLE:
+        raise RuntimeError('缺少coincurve/pycryptodome/base58依赖，无法推导地址')
+
+    if xpub:
+        node = HDNode.from_xpub(xpub)
+        if node.depth != 3:
+            raise ValueError("请提供账户级（m/44'/195'/account'）xpub")
+        account = node.index & ~HARDENED
+        chain = _cached(('xpub', xpub), lambda: node.child(0), use_cache)
+    elif mnemonic:
+        node, chain = account_nodes(' '.join(mnemonic.split()), passphrase, account, use_cache)
+    else:
+        raise ValueError('助记词和xpub不能同时为空')
+
+    addresses = chain.derive_addresses(start, count)
+    for item in addresses:
+        item['path'] = f"m/44'/{TRON_COIN_TYPE}'/{account}'/0/{item['index']}"
+    return {
+        'account': account,
+        'xpub': node.to_xpub(),
+        'addresses': addresses
+    }
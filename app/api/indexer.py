@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+链上数据索引器
+
+后台线程从 /wallet/getnowblock 获取最新高度，按 /wallet/getblockbynum 和
+/wallet/gettransactioninfobyblocknum 增量同步已固化的区块，落后较多时并行回填。
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from app.api.block_store import BlockStore
+
+
+class ChainIndexer:
+    """区块跟随与回填"""
+
+    def __init__(self, tron_api, store: BlockStore, start_block: int = 0, confirmations: int = 19,
+                 poll_interval: float = 3, workers: int = 8, batch_size: int = 100):
+        """
+        初始化索引器
+
+        Args:
+            tron_api (TronAPI): 用于访问上游节点
+            store (BlockStore): 索引存储
+            start_block (int): 首次同步的起始区块，0表示从当前固化高度开始
+            confirmations (int): 区块需要的确认数，只索引已固化的区块
+            poll_interval (float): 追上最新高度后的轮询间隔（秒）
+            workers (int): 回填时的并行请求数
+            batch_size (int): 每批写入的区块数
+        """
+        self.tron_api = tron_api
+        self.store = store
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.batch_size = batch_size
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        """启动后台同步线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='tron-indexer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """停止后台同步线程"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                caught_up = self.sync_once()
+                self.last_error = None
+            except Exception as e:
+                caught_up = True
+                self.last_error = str(e)
+            if caught_up:
+                self._stop.wait(self.poll_interval)
+
+    # ==================== 同步 ====================
+
+    @property
+    def last_indexed(self) -> int:
+        """已连续索引到的区块号"""
+        return int(self.store.get_state('last_block', '0'))
+
+    def sync_once(self) -> bool:
+        """
+        同步一批区块
+
+        Returns:
+            bool: 是否已追上固化高度
+        """
+        head = self._fetch_head()
+        target = head - self.confirmations
+        next_block = self.last_indexed + 1
+        if next_block <= 1:
+            next_block = self.start_block or target
+
+        if next_block > target:
+            return True
+
+        end = min(target, next_block + self.batch_size * self.workers - 1)
+        self.backfill(next_block, end)
+        self.store.set_state('last_block', end)
+        return end >= target
+
+    def backfill(self, start: int, end: int):
+        """
+        并行回填区间 [start, end] 内的区块，按批次写入
+
+        任一区块获取失败时抛出异常，已写入的批次保留，写入是幂等的。
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tron-indexer') as executor:
+            for batch_start in range(start, end + 1, self.batch_size):
+                numbers = range(batch_start, min(end, batch_start + self.batch_size - 1) + 1)
+                self.store.save_blocks(list(executor.map(self._fetch_block, numbers)))
+
+    def _fetch_head(self) -> int:
+        response = self.tron_api._make_request('/wallet/getnowblock')
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response.get('block_header', {}).get('raw_data', {}).get('number', 0)
+
+    def _fetch_block(self, number: int) -> Dict:
+        """获取区块和区块内所有交易回执（绕过响应缓存，避免大量历史区块挤占缓存）"""
+        block, _ = self.tron_api._send_request('/wallet/getblockbynum', 'POST', {'num': number})
+        if 'error' in block:
+            raise RuntimeError(f'区块{number}获取失败：{block["error"]}')
+        if not block.get('block_header'):
+            raise RuntimeError(f'区块{number}不存在')
+
+        infos: List[Dict] = []
+        if block.get('transactions'):
+            infos, _ = self.tron_api._send_request('/wallet/gettransactioninfobyblocknum', 'POST', {'num': number})
+            if isinstance(infos, dict):
+                if 'error' in infos:
+                    raise RuntimeError(f'区块{number}交易回执获取失败：{infos["error"]}')
+                infos = []
+        return {'block': block, 'infos': infos}
+
+    def get_stats(self) -> Dict:
+        """获取索引进度"""
+        stats = self.store.get_stats()
+        stats.update({
+            'last_indexed': self.last_indexed,
+            'running': bool(self._thread and self._thread.is_alive()),
+            'last_error': self.last_error
+        })
+        return stats
+
+
+def main(argv=None):
+    """命令行回填：python -m app.api.indexer START END"""
+    from app.api.tron_api import TronAPI
+
+    parser = argparse.ArgumentParser(description='回填本地区块索引')
+    parser.add_argument('start', type=int, help='起始区块号')
+    parser.add_argument('end', type=int, help='结束区块号（包含）')
+    parser.add_argument('--db', default=None, help='索引数据库路径，默认读取INDEXER_DB_PATH')
+    parser.add_argument('--workers', type=int, default=None, help='并行请求数')
+    args = parser.parse_args(argv)
+
+    tron_api = TronAPI()
+    store = BlockStore(args.db or tron_api._config('INDEXER_DB_PATH', 'data/chain_index.db'))
+    indexer = ChainIndexer(tron_api, store, workers=args.workers or tron_api._config('INDEXER_BACKFILL_WORKERS', 8))
+
+    started = time.time()
+    indexer.backfill(args.start, args.end)
+    print(f"已回填区块 {args.start}-{args.end}，耗时 {time.time() - started:.1f} 秒")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
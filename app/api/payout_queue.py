@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+持久化转账队列
+
+转账请求先写入SQLite，由后台调度线程按发送地址分批签名和广播，并根据
+/wallet/getaccountresource 返回的可用能量和带宽控制出队速度。
+
+TRON交易没有nonce，重复支付只能靠交易ID和过期时间避免：
+- 每笔转账有唯一的幂等键，客户端重试同一个键只会得到已有记录；
+- 签名后的交易先落库再广播，节点接收后仍保持SENDING，
+  由 /wallet/gettransactioninfobyid 查到上链回执后才判定成功或失败（合约执行REVERT、OUT_OF_ENERGY等为失败）；
+- 未上链的交易在过期前重发同一笔交易（节点可能已从交易池中丢弃），
+  只有确认交易已过期且未上链后才重新签名：在同一个节点上先确认固化区块已越过过期时间，
+  再查固化数据中没有该交易的回执（落后的节点会对已上链的交易返回空结果，不能作为依据）。
+
+私钥只保存在内存中，进程重启后需要再次提交该发送地址的私钥，对应的排队转账才会继续处理。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from app.api.cache_policy import BLOCK_INTERVAL
+from app.api.tron_api import Parallel
+from app.utils import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payouts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    fingerprint TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    type TEXT NOT NULL,
+    to_address TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    token TEXT,
+    decimals INTEGER,
+    message TEXT,
+    status TEXT NOT NULL,
+    owner TEXT,
+    tx_id TEXT,
+    tx_hex TEXT,
+    expiration REAL,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_payouts_status ON payouts (status, sender, id);
+"""
+
+# 状态：排队 -> 已领取 -> 已签名广播中（等待上链确认） -> 成功/失败
+QUEUED, CLAIMED, SENDING, SUCCESS, FAILED = 'QUEUED', 'CLAIMED', 'SENDING', 'SUCCESS', 'FAILED'
+TERMINAL_STATUSES = (SUCCESS, FAILED)
+
+# 占位引用区块，仅用于入队时校验参数（交易不会被广播）
+_VALIDATION_REF_BLOCK = {'ref_block_bytes': b'\x00\x00', 'ref_block_hash': b'\x00' * 8}
+
+
+class PayoutStore:
+    """转账队列存储，多个进程可共用同一个数据库文件"""
+
+    def __init__(self, path: str):
+        if path != ':memory:':
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def reopen(self):
+        """fork后在子进程中重新连接数据库（SQLite连接不能跨进程使用）"""
+        self._lock = threading.Lock()
+        if self.path != ':memory:':
+            self._connect()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, statements):
+        """在一个IMMEDIATE事务中执行回调，保证多进程领取任务时互斥"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = statements(self._conn)
+                self._conn.execute('COMMIT')
+                return result
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    # ==================== 写入 ====================
+
+    def enqueue(self, payouts: List[Dict]) -> List[Tuple[sqlite3.Row, bool]]:
+        """
+        写入一批转账，幂等键已存在时返回已有记录
+
+        Returns:
+            list: (记录, 是否新建)
+        """
+        now = time.time()
+
+        def insert(conn):
+            results = []
+            for payout in payouts:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO payouts (idempotency_key, fingerprint, sender, type, to_address, amount, '
+                    'token, decimals, message, status, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (payout['idempotency_key'], payout['fingerprint'], payout['sender'], payout['type'],
+                     payout['to'], payout['amount'], payout.get('token'), payout.get('decimals'),
+                     payout.get('message'), QUEUED, now, now)
+                )
+                row = conn.execute('SELECT * FROM payouts WHERE idempotency_key = ?',
+                                   (payout['idempotency_key'],)).fetchone()
+                results.append((row, cursor.rowcount == 1))
+            return results
+
+        return self._transaction(insert)
+
+    def claim(self, sender: str, limit: int, owner: str) -> List[sqlite3.Row]:
+        """领取发送地址最早排队的转账"""
+        def update(conn):
+            rows = conn.execute(
+                'SELECT * FROM payouts WHERE status = ? AND sender = ? ORDER BY id LIMIT ?',
+                (QUEUED, sender, limit)
+            ).fetchall()
+            conn.executemany('UPDATE payouts SET status = ?, owner = ?, updated_at = ? WHERE id = ?',
+                             [(CLAIMED, owner, time.time(), row['id']) for row in rows])
+            return rows
+
+        return self._transaction(update)
+
+    def release(self, ids: List[int]):
+        """归还已领取但未签名的转账"""
+        self._transaction(lambda conn: conn.executemany(
+            'UPDATE payouts SET status = ?, owner = NULL, updated_at = ? WHERE id = ? AND status = ?',
+            [(QUEUED, time.time(), payout_id, CLAIMED) for payout_id in ids]
+        ))
+
+    def mark_signed(self, signed: List[Tuple[int, str, str, float]]):
+        """记录签名后的交易（在广播之前落库）"""
+        self._transaction(lambda conn: conn.executemany(
+            'UPDATE payouts SET status = ?, tx_id = ?, tx_hex = ?, expiration = ?, attempts = attempts + 1, '
+            'error = NULL, updated_at = ? WHERE id = ?',
+            [(SENDING, tx_id, tx_hex, expiration, time.time(), payout_id)
+             for payout_id, tx_id, tx_hex, expiration in signed]
+        ))
+
+    def mark(self, payout_id: int, status: str, error: Optional[str] = None, tx_id: Optional[str] = None):
+        """更新转账状态，tx_id不为空时只在交易ID未变化时更新"""
+        sql = 'UPDATE payouts SET status = ?, error = ?, owner = NULL, updated_at = ? WHERE id = ?'
+        params = [status, error, time.time(), payout_id]
+        if tx_id is not None:
+            sql += ' AND tx_id = ?'
+            params.append(tx_id)
+        self._transaction(lambda conn: conn.execute(sql, params))
+
+    def note_error(self, payout_id: int, error: str):
+        self._transaction(lambda conn: conn.execute(
+            'UPDATE payouts SET error = ?, updated_at = ? WHERE id = ?', (error, time.time(), payout_id)))
+
+    def requeue_expired(self, payout_id: int, tx_id: str):
+        """交易已过期且未上链，重新排队签名"""
+        self._transaction(lambda conn: conn.execute(
+            'UPDATE payouts SET status = ?, owner = NULL, tx_id = NULL, tx_hex = NULL, expiration = NULL, '
+            'updated_at = ? WHERE id = ? AND status = ? AND tx_id = ?',
+            (QUEUED, time.time(), payout_id, SENDING, tx_id)
+        ))
+
+    def release_stale_claims(self, older_than: float):
+        """进程在签名前退出时遗留的已领取任务，重新排队"""
+        self._transaction(lambda conn: conn.execute(
+            'UPDATE payouts SET status = ?, owner = NULL WHERE status = ? AND updated_at < ?',
+            (QUEUED, CLAIMED, time.time() - older_than)
+        ))
+
+    # ==================== 查询 ====================
+
+    def get(self, payout_id: int = None, idempotency_key: str = None) -> Optional[sqlite3.Row]:
+        with self._lock:
+            if payout_id is not None:
+                return self._conn.execute('SELECT * FROM payouts WHERE id = ?', (payout_id,)).fetchone()
+            return self._conn.execute('SELECT * FROM payouts WHERE idempotency_key = ?',
+                                      (idempotency_key,)).fetchone()
+
+    def pending_senders(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT sender FROM payouts WHERE status IN (?, ?)', (QUEUED, SENDING)
+            ).fetchall()
+        return [row['sender'] for row in rows]
+
+    def sending(self, sender: str) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT * FROM payouts WHERE status = ? AND sender = ? ORDER BY id', (SENDING, sender)
+            ).fetchall()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) AS n FROM payouts GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+def receipt_outcome(info: Dict) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    根据 /wallet/gettransactioninfobyid 的返回判断转账结果
+
+    TRC20转账即使合约执行失败（REVERT、OUT_OF_ENERGY等）也会被打包进区块，
+    需要看 receipt.result；TRX和TRC10转账的回执没有result字段，打包即成功。
+
+    Returns:
+        tuple: (SUCCESS或FAILED, 错误信息)，交易尚未上链时返回None
+    """
+    if not info.get('blockNumber'):
+        return None
+    result = info.get('receipt', {}).get('result')
+    if info.get('result') == 'FAILED' or result not in (None, 'SUCCESS'):
+        message = info.get('resMessage', '')
+        try:
+            message = bytes.fromhex(message).decode('utf-8', 'replace')
+        except ValueError:
+            pass
+        error = f'合约执行失败：{result or info.get("result")}'
+        return FAILED, f'{error}（{message}）' if message else error
+    return SUCCESS, None
+
+
+def payout_view(row: sqlite3.Row) -> Dict:
+    """转账记录的对外格式（不含签名数据）"""
+    return {
+        'id': row['id'],
+        'idempotencyKey': row['idempotency_key'],
+        'from': row['sender'],
+        'type': row['type'],
+        'to': row['to_address'],
+        'amount': row['amount'],
+        'token': row['token'],
+        'status': row['status'],
+        'txID': row['tx_id'],
+        'error': row['error'],
+        'attempts': row['attempts'],
+        'createdAt': int(row['created_at']),
+        'updatedAt': int(row['updated_at'])
+    }
+
+
+class PayoutScheduler:
+    """按发送地址分批出队的调度线程"""
+
+    view = staticmethod(payout_view)
+
+    def __init__(self, tron_api, store: PayoutStore, batch_size: int = 50, poll_interval: float = 1,
+                 bandwidth_per_tx: int = 350, energy_per_trc20: int = 65000, allow_burn: bool = False,
+                 expiry_grace: float = 30, confirm_interval: float = 3):
+        """
+        Args:
+            tron_api (TronAPI): 用于签名和广播
+            store (PayoutStore): 队列存储
+            batch_size (int): 每个发送地址每轮最多广播的笔数
+            poll_interval (float): 空闲时的轮询间隔（秒）
+            bandwidth_per_tx (int): 每笔交易预估消耗的带宽
+            energy_per_trc20 (int): 每笔TRC20转账预估消耗的能量
+            allow_burn (bool): 资源不足时是否允许燃烧TRX支付手续费
+            expiry_grace (float): 交易过期后再等待多久才检查是否未上链（秒），
+                不小于上游路由允许的最大区块落后数对应的时间
+            confirm_interval (float): 同一笔交易两次查询上链回执的最小间隔（秒），约为出块时间
+        """
+        self.tron_api = tron_api
+        self.store = store
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.bandwidth_per_tx = bandwidth_per_tx
+        self.energy_per_trc20 = energy_per_trc20
+        self.allow_burn = allow_burn
+        self.expiry_grace = max(expiry_grace, tron_api.router.max_lag * BLOCK_INTERVAL)
+        self.confirm_interval = confirm_interval
+
+        self.owner = uuid.uuid4().hex
+        self._signers = {}  # 发送地址 -> tx_builder.Signer，仅保存在内存
+        self._paused: Dict[str, str] = {}
+        self._next_check: Dict[str, float] = {}  # 交易ID -> 下次查询回执的时间
+        self._completed = deque()  # 最近完成的时间戳，用于计算出队速率
+        self.finished = {SUCCESS: 0, FAILED: 0}  # 本进程处理完成的转账数
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    # ==================== 入队 ====================
+
+    def submit(self, payouts: List[Dict], key: str) -> List[Dict]:
+        """
+        校验并写入一批转账
+
+        Args:
+            payouts (list): 元素格式同批量转账，另可带 idempotencyKey
+            key (str): 发送方私钥
+
+        Returns:
+            list: 每笔的入队结果，参数错误或幂等键冲突的项带error
+        """
+        from app.api import tx_builder
+
+        try:
+            signer = tx_builder.Signer(key)
+        except Exception:
+            raise ValueError('私钥格式错误')
+        self._signers[signer.address] = signer
+
+        # 未指定decimals的TRC20合约先获取精度
+        self.tron_api._run_flow(self.tron_api._resolve_tokens_flow([
+            payout.get('contract') or self.tron_api.usdt_contract for payout in payouts
+            if isinstance(payout, dict) and str(payout.get('type') or '').lower() == 'trc20'
+            and payout.get('decimals') is None
+        ]))
+
+        results, records, positions = [None] * len(payouts), [], []
+        for index, payout in enumerate(payouts):
+            try:
+                records.append(self._normalize(payout, signer))
+                positions.append(index)
+            except ValueError as e:
+                results[index] = {'index': index, 'success': False, 'error': str(e)}
+
+        # 不允许燃烧TRX时，账户资源上限不足以支付的转账永远无法出账，提交时直接拒绝
+        if records and not self.allow_burn:
+            try:
+                resource = self.tron_api._run_flow(self._resource_flow(signer.address))
+            except RuntimeError:
+                resource = None  # 查询失败时照常入队，出队前还会再检查
+            if resource is not None:
+                accepted = []
+                for index, record in zip(positions, records):
+                    error = self._capacity_error(resource, record['type'])
+                    if error:
+                        results[index] = {'index': index, 'success': False, 'error': error}
+                    else:
+                        accepted.append((index, record))
+                positions = [index for index, _ in accepted]
+                records = [record for _, record in accepted]
+
+        for index, record, (row, created) in zip(positions, records, self.store.enqueue(records)):
+            item = dict(payout_view(row), index=index, duplicate=not created, success=True)
+            if not created and row['fingerprint'] != record['fingerprint']:
+                item.update(success=False, error='幂等键已用于参数不同的另一笔转账')
+            results[index] = item
+
+        self._wake.set()
+        return results
+
+    def _normalize(self, payout: Dict, signer) -> Dict:
+        """校验参数并生成入队记录"""
+        if not isinstance(payout, dict):
+            raise ValueError('转账项格式错误')
+        transfer_type = str(payout.get('type') or 'trx').lower()
+        transfer = dict(payout, type=transfer_type, key=signer.address)
+        # 按真实流程构建一次交易以校验地址、金额和精度
+        self.tron_api._sign_transfer(0, transfer, {signer.address: signer}, _VALIDATION_REF_BLOCK)
+
+        token = None
+        if transfer_type == 'trc20':
+            token = payout.get('contract') or self.tron_api.usdt_contract
+        elif transfer_type == 'trc10':
+            token = str(payout.get('tokenId') or payout.get('token_id'))
+        record = {
+            'sender': signer.address,
+            'type': transfer_type,
+            'to': payout['to'],
+            'amount': str(payout['amount']),
+            'token': token,
+            'decimals': payout.get('decimals'),
+            'message': payout.get('message')
+        }
+        record['fingerprint'] = hashlib.sha256(
+            json.dumps(record, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        record['idempotency_key'] = str(payout.get('idempotencyKey') or payout.get('idempotency_key')
+                                        or uuid.uuid4().hex)
+        return record
+
+    def wait(self, payout_id: int, timeout: float) -> Optional[sqlite3.Row]:
+        """等待转账进入最终状态，超时返回当前记录"""
+        deadline = time.time() + timeout
+        with self._changed:
+            while True:
+                row = self.store.get(payout_id)
+                remaining = deadline - time.time()
+                if row is None or row['status'] in TERMINAL_STATUSES or remaining <= 0:
+                    return row
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    # ==================== 调度 ====================
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='tron-payouts', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                busy = self.process_once()
+                self.last_error = None
+            except Exception as e:
+                busy = False
+                self.last_error = str(e)
+            if not busy:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def process_once(self) -> bool:
+        """
+        处理一轮：先确认广播结果不确定的交易，再为每个发送地址广播一批
+
+        Returns:
+            bool: 本轮是否有转账被广播（有则立即进行下一轮）
+        """
+        self.store.release_stale_claims(older_than=300)
+        busy = False
+        senders = self.store.pending_senders()
+        for sender in list(self._paused):
+            if sender not in senders:
+                self._paused.pop(sender, None)
+        for sender in senders:
+            signer = self._signers.get(sender)
+            if signer is None:
+                self._paused[sender] = '等待提交该地址的私钥'
+                continue
+            self._reconcile(sender)
+            busy = self._drain(sender, signer) or busy
+        return busy
+
+    def _reconcile(self, sender: str):
+        """确认已签名交易的上链结果，未上链的重发或在过期后重新排队"""
+        now = time.time()
+        for row in self.store.sending(sender):
+            tx_id = row['tx_id']
+            if now < self._next_check.get(tx_id, 0):
+                continue
+            self._next_check[tx_id] = now + self.confirm_interval
+            outcome = self.tron_api._run_flow(self._confirmation_flow(tx_id))
+            if outcome is not None:
+                self._finish(row['id'], outcome[0], outcome[1], tx_id=tx_id)
+            elif now > row['expiration'] + self.expiry_grace:
+                self._settle_expired(row)
+            else:
+                # 尚未上链：节点可能丢弃了交易，重发同一笔交易（重复广播返回DUP_TRANSACTION_ERROR，不会重复支付）
+                response = self.tron_api._run_flow(self.tron_api._broadcast_flow(row['tx_hex']))
+                status, error = self.tron_api._broadcast_outcome(response)
+                if status != 'SUCCESS':
+                    # 之前的广播可能已被接收，重发失败不能判定转账失败，等待上链或过期
+                    self.store.note_error(row['id'], error)
+
+    def _settle_expired(self, row: sqlite3.Row):
+        """
+        已过期的交易：确认未上链后重新排队签名
+
+        在同一个节点上先查固化区块，再查固化数据中的交易回执。固化区块的时间晚于交易过期时间（加上宽限时间，
+        覆盖本地时钟与出块时间的偏差）时仍查不到回执，这笔交易不可能再被打包，才可以安全地重新签名；
+        否则继续等待，查询失败时不做判断。
+        """
+        tx_id = row['tx_id']
+        responses = self.tron_api._request_same_node([
+            ('/walletsolidity/getnowblock', 'GET', None),
+            ('/walletsolidity/gettransactioninfobyid', 'POST', {'value': tx_id})
+        ])
+        error = next((response['error'] for response in responses if 'error' in response), None)
+        if error is not None:
+            self.store.note_error(row['id'], f'确认交易是否上链失败：{error}')
+            return
+        block, info = responses
+        outcome = receipt_outcome(info)
+        if outcome is not None:
+            self._finish(row['id'], outcome[0], outcome[1], tx_id=tx_id)
+            return
+        solidified_at = block.get('block_header', {}).get('raw_data', {}).get('timestamp', 0) / 1000
+        if solidified_at > row['expiration'] + self.expiry_grace:
+            self._next_check.pop(tx_id, None)
+            self.store.requeue_expired(row['id'], tx_id)
+
+    def _confirmation_flow(self, tx_id: str):
+        """查询交易回执，未上链时返回None，否则返回 (SUCCESS或FAILED, 错误信息)"""
+        response = yield ('/wallet/gettransactioninfobyid', 'POST', {'value': tx_id})
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return receipt_outcome(response)
+
+    def _drain(self, sender: str, signer) -> bool:
+        rows = self.store.claim(sender, self.batch_size, self.owner)
+        if not rows:
+            return False
+
+        try:
+            affordable, waiting = (rows, []) if self.allow_burn else self._affordable(sender, rows)
+            if waiting:
+                self.store.release([row['id'] for row in waiting])
+            if not affordable:
+                if waiting:
+                    self._paused[sender] = '能量或带宽不足，等待恢复'
+                return False
+            self._paused.pop(sender, None)
+
+            ref_block = self.tron_api._run_flow(self.tron_api._ref_block_flow())
+            expiration = time.time() + self.tron_api._config('TX_EXPIRATION', 60)
+            signed, broadcasts = [], []
+            for row in affordable:
+                transfer = {'type': row['type'], 'to': row['to_address'], 'amount': row['amount'],
+                            'key': sender, 'message': row['message'], 'decimals': row['decimals']}
+                if row['type'] == 'trc20':
+                    transfer['contract'] = row['token']
+                elif row['type'] == 'trc10':
+                    transfer['tokenId'] = row['token']
+                try:
+                    result = self.tron_api._sign_transfer(0, transfer, {sender: signer}, ref_block)
+                except ValueError as e:
+                    self._finish(row['id'], FAILED, str(e))
+                    continue
+                signed.append((row['id'], result['txID'], result['_hex'], expiration))
+                broadcasts.append((row['id'], result['txID'], result['_hex']))
+        except Exception:
+            # 查询资源或引用区块失败：未签名的转账立即归还（release只处理仍为CLAIMED的记录），
+            # 不必等待release_stale_claims超时
+            self.store.release([row['id'] for row in rows])
+            raise
+
+        # 先落库再广播，进程在广播期间退出时由_reconcile处理
+        self.store.mark_signed(signed)
+        responses = self.tron_api._run_flow(self._broadcast_all_flow([tx_hex for _, _, tx_hex in broadcasts]))
+        for (payout_id, tx_id, _), response in zip(broadcasts, responses):
+            if isinstance(response, Exception):
+                response = {'error': str(response)}
+            self._apply_outcome(payout_id, tx_id, response)
+        return True
+
+    def _broadcast_all_flow(self, tx_hexes: List[str]):
+        responses = yield Parallel([self.tron_api._broadcast_flow(tx_hex) for tx_hex in tx_hexes],
+                                   limit=self.tron_api._config('BROADCAST_CONCURRENCY', 20))
+        return responses
+
+    def _apply_outcome(self, payout_id: int, tx_id: str, response: Dict):
+        """处理新签名交易的首次广播结果"""
+        status, error = self.tron_api._broadcast_outcome(response)
+        if status == 'FAILED':
+            # 节点拒绝的交易不会进入交易池，可以直接判定失败
+            self._finish(payout_id, FAILED, error, tx_id=tx_id)
+            return
+        # 节点已接收或结果未知：保持SENDING，等待上链回执
+        self._next_check[tx_id] = time.time() + self.confirm_interval
+        self.store.note_error(payout_id, error)
+
+    def _affordable(self, sender: str, rows: List[sqlite3.Row]) -> Tuple[List[sqlite3.Row], List[sqlite3.Row]]:
+        """
+        按账户当前可用的带宽和能量，计算本轮可以广播的前若干笔
+
+        资源上限不足以支付的转账（如提交后解除了质押）等待也无法出账，直接判定失败。
+
+        Returns:
+            tuple: (本轮广播的转账, 等待资源恢复的转账)
+        """
+        resource = self.tron_api._run_flow(self._resource_flow(sender))
+        bandwidth = (resource.get('freeNetLimit', 0) - resource.get('freeNetUsed', 0) +
+                     resource.get('NetLimit', 0) - resource.get('NetUsed', 0))
+        energy = resource.get('EnergyLimit', 0) - resource.get('EnergyUsed', 0)
+
+        affordable, waiting = [], []
+        for row in rows:
+            error = self._capacity_error(resource, row['type'])
+            if error:
+                self._finish(row['id'], FAILED, error)
+                continue
+            need_energy = self.energy_per_trc20 if row['type'] == 'trc20' else 0
+            if waiting or bandwidth < self.bandwidth_per_tx or energy < need_energy:
+                waiting.append(row)  # 保持先进先出，不跳过排在前面的转账
+                continue
+            bandwidth -= self.bandwidth_per_tx
+            energy -= need_energy
+            affordable.append(row)
+        return affordable, waiting
+
+    def _capacity_error(self, resource: Dict, transfer_type: str) -> Optional[str]:
+        """账户的带宽或能量上限不足以支付一笔转账时返回错误信息"""
+        bandwidth = resource.get('freeNetLimit', 0) + resource.get('NetLimit', 0)
+        if bandwidth < self.bandwidth_per_tx:
+            return (f'发送地址带宽上限{bandwidth}不足以支付一笔转账（约{self.bandwidth_per_tx}），'
+                    '请激活账户或质押TRX获取带宽，或设置PAYOUT_ALLOW_BURN允许燃烧TRX')
+        energy = resource.get('EnergyLimit', 0)
+        if transfer_type == 'trc20' and energy < self.energy_per_trc20:
+            return (f'发送地址能量上限{energy}不足以支付一笔TRC20转账（约{self.energy_per_trc20}），'
+                    '请质押TRX获取能量，或设置PAYOUT_ALLOW_BURN允许燃烧TRX')
+        return None
+
+    def _resource_flow(self, address: str):
+        response = yield ('/wallet/getaccountresource', 'POST', {'address': address, 'visible': True})
+        if 'error' in response:
+            raise RuntimeError(f'查询账户资源失败：{response["error"]}')
+        return response
+
+    def _finish(self, payout_id: int, status: str, error: str = None, tx_id: str = None):
+        self.store.mark(payout_id, status, error, tx_id)
+        self._next_check.pop(tx_id, None)
+        self.finished[status] += 1
+        if status == SUCCESS:
+            self._completed.append(time.time())
+        with self._changed:
+            self._changed.notify_all()
+
+    def get_stats(self) -> Dict:
+        """队列深度和最近一分钟的出队速率"""
+        cutoff = time.time() - 60
+        while self._completed and self._completed[0] < cutoff:
+            self._completed.popleft()
+        counts = self.store.counts()
+        return {
+            'depth': counts.get(QUEUED, 0) + counts.get(CLAIMED, 0) + counts.get(SENDING, 0),
+            'by_status': counts,
+            'drain_rate_per_min': len(self._completed),
+            'senders_with_key': len(self._signers),
+            'paused_senders': dict(self._paused),
+            'running': bool(self._thread and self._thread.is_alive()),
+            'last_error': self.last_error
+        }
+
+    def collect_metrics(self) -> List[metrics.Family]:
+        """抓取/metrics时输出队列深度、完成数和暂停的发送地址数"""
+        stats = self.get_stats()
+        return [
+            ('tron_payout_queue_depth', 'gauge', '转账队列中各状态的转账数',
+             [({'status': status}, stats['by_status'].get(status, 0)) for status in (QUEUED, CLAIMED, SENDING)]),
+            ('tron_payout_completed_total', 'counter', '本进程处理完成的转账数',
+             [({'status': status}, count) for status, count in self.finished.items()]),
+            metrics.stats_family('tron_payout_drain_rate_per_minute', 'gauge', '最近一分钟成功的转账数',
+                                 stats['drain_rate_per_min']),
+            metrics.stats_family('tron_payout_paused_senders', 'gauge', '因资源不足或缺少私钥暂停出账的发送地址数',
+                                 len(stats['paused_senders']))
+        ]
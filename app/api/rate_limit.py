@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TronGrid API Key池和客户端限流
+
+每个Key一个令牌桶，速率与服务商配额一致。请求前先在本地预约令牌：需要等待时由调用方等待，
+等待时间超过上限时直接在本地拒绝，不把请求浪费在429上。收到429时按Retry-After暂停该Key。
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class KeySlot:
+    """单个API Key的令牌桶和使用统计"""
+
+    def __init__(self, key: str, rate: float, burst: float):
+        self.key = key
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.throttled = 0  # 上游返回429的次数
+        self.waited = 0  # 需要排队等待的请求数
+
+    def refill(self, now: float):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """获得一个令牌需要等待的时间（秒）"""
+        wait = max(0.0, self.cooldown_until - now)
+        if self.rate > 0 and self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    @property
+    def label(self) -> str:
+        """脱敏后的Key，用于统计输出"""
+        if not self.key:
+            return 'anonymous'
+        return f'{self.key[:4]}****{self.key[-4:]}' if len(self.key) > 8 else '****'
+
+
+class ApiKeyPool:
+    """API Key轮换和限流，线程安全"""
+
+    def __init__(self, keys: Iterable[str], rate: float = 15, burst: float = None,
+                 strategy: str = 'least_used', max_wait: float = 2, anonymous_rate: float = 0):
+        """
+        Args:
+            keys: API Key列表，为空时以匿名方式请求
+            rate (float): 每个Key每秒允许的请求数，0表示不限
+            burst (float): 令牌桶容量，默认等于rate
+            strategy (str): least_used（选择剩余令牌最多的Key）或 round_robin（轮流使用）
+            max_wait (float): 本地排队等待上限（秒），超过时直接拒绝请求
+            anonymous_rate (float): 没有Key时的每秒请求数，0表示不限
+        """
+        keys = list(dict.fromkeys(key.strip() for key in keys if key and key.strip()))
+        if keys:
+            self.slots = [KeySlot(key, rate, burst or rate) for key in keys]
+        else:
+            self.slots = [KeySlot('', anonymous_rate, anonymous_rate)]
+        if strategy not in ('least_used', 'round_robin'):
+            raise ValueError(f'不支持的Key轮换策略：{strategy}')
+        self.strategy = strategy
+        self.max_wait = max_wait
+        self.shed = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = None) -> Tuple[Optional[KeySlot], float]:
+        """
+        预约一个令牌
+
+        Returns:
+            tuple: (KeySlot, 需要等待的秒数)；等待超过上限时为 (None, 最短等待时间)，请求应在本地拒绝
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        now = time.monotonic()
+        with self._lock:
+            for slot in self.slots:
+                slot.refill(now)
+
+            count = len(self.slots)
+            if self.strategy == 'round_robin':
+                ordered = [self.slots[(self._next + offset) % count] for offset in range(count)]
+                chosen = min(ordered, key=lambda s: s.wait_time(now))
+                self._next = (self.slots.index(chosen) + 1) % count
+            else:
+                chosen = min(self.slots, key=lambda s: (s.wait_time(now), -s.tokens, s.requests))
+
+            wait = chosen.wait_time(now)
+            if wait > max_wait:
+                self.shed += 1
+                return None, wait
+
+            if chosen.rate > 0:
+                chosen.tokens -= 1  # 可以为负，表示已预约的未来令牌
+            chosen.requests += 1
+            if wait > 0:
+                chosen.waited += 1
+            return chosen, wait
+
+    def penalize(self, slot: KeySlot, retry_after: float = None):
+        """上游返回429：暂停该Key到Retry-After之后，并清空令牌"""
+        with self._lock:
+            slot.throttled += 1
+            slot.tokens = min(slot.tokens, 0)
+            pause = retry_after if retry_after and retry_after > 0 else 1.0
+            slot.cooldown_until = max(slot.cooldown_until, time.monotonic() + min(pause, 60))
+
+    def headers(self, slot: Optional[KeySlot]) -> Dict[str, str]:
+        """请求头，匿名时为空"""
+        if slot is None or not slot.key:
+            return {}
+        return {'TRON-PRO-API-KEY': slot.key}
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            keys: List[Dict] = []
+            for slot in self.slots:
+                slot.refill(now)
+                keys.append({
+                    'key': slot.label,
+                    'requests': slot.requests,
+                    'throttled': slot.throttled,
+                    'waited': slot.waited,
+                    'tokens': round(slot.tokens, 2) if slot.rate > 0 else None,
+                    'cooling_down': slot.cooldown_until > now
+                })
+            return {'strategy': self.strategy, 'shed': self.shed, 'keys': keys}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
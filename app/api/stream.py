@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+新区块和地址转账推送
+
+一个后台BlockFollower轮询 /wallet/getnowblock，发现新区块后交给EventHub，
+EventHub把区块事件和关注地址的转账事件分发给所有订阅者（Server-Sent Events）。
+无论有多少订阅者，上游只有一个轮询。
+"""
+
+import json
+import queue
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.api import abi
+from app.api.abi import TRANSFER_FROM_SELECTOR, TRANSFER_SELECTOR
+
+
+def extract_transfers(block: Dict) -> List[Dict]:
+    """
+    从区块中解析TRX、TRC10和直接调用的TRC20转账（地址为hex格式）
+
+    合约内部发起的TRC20转账不在交易参数中，需结合交易回执日志，这里不做解析。
+    """
+    transfers = []
+    for tx in block.get('transactions', []):
+        contracts = tx.get('raw_data', {}).get('contract', [])
+        if not contracts:
+            continue
+        contract = contracts[0]
+        value = contract.get('parameter', {}).get('value', {})
+        status = (tx.get('ret') or [{}])[0].get('contractRet', 'SUCCESS')
+        base = {'tx_id': tx.get('txID'), 'status': status}
+        contract_type = contract.get('type')
+
+        if contract_type == 'TransferContract':
+            transfers.append(dict(base, asset='TRX', token=None, amount_raw=value.get('amount', 0),
+                                  from_hex=value.get('owner_address', '').lower(),
+                                  to_hex=value.get('to_address', '').lower()))
+        elif contract_type == 'TransferAssetContract':
+            token = bytes.fromhex(value.get('asset_name', '')).decode('utf-8', 'replace')
+            transfers.append(dict(base, asset='TRC10', token=token, amount_raw=value.get('amount', 0),
+                                  from_hex=value.get('owner_address', '').lower(),
+                                  to_hex=value.get('to_address', '').lower()))
+        elif contract_type == 'TriggerSmartContract':
+            data = value.get('data', '')
+            selector = data[:8]
+            if selector == TRANSFER_SELECTOR and len(data) >= 136:
+                from_hex = value.get('owner_address', '').lower()
+                to_hex = '41' + data[32:72].lower()
+                amount = int(data[72:136], 16)
+            elif selector == TRANSFER_FROM_SELECTOR and len(data) >= 200:
+                from_hex = '41' + data[32:72].lower()
+                to_hex = '41' + data[96:136].lower()
+                amount = int(data[136:200], 16)
+            else:
+                continue
+            transfers.append(dict(base, asset='TRC20', token=value.get('contract_address', '').lower(),
+                                  amount_raw=amount, from_hex=from_hex, to_hex=to_hex))
+    return transfers
+
+
+class Subscription:
+    """单个订阅者"""
+
+    def __init__(self, hub: 'EventHub', blocks: bool, addresses: Dict[str, str], queue_size: int):
+        self.hub = hub
+        self.blocks = blocks
+        self.addresses = addresses  # hex -> 订阅时传入的地址
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def put(self, event: Dict):
+        """推送事件，队列已满说明客户端消费过慢，直接断开"""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.hub.unsubscribe(self)
+            self.closed = True
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+        self.closed = True
+
+
+class EventHub:
+    """事件分发中心"""
+
+    def __init__(self, queue_size: int = 1000, replay_blocks: int = 20):
+        """
+        Args:
+            queue_size (int): 每个订阅者的事件队列长度
+            replay_blocks (int): 保留最近多少个区块的事件，用于断线重连补发
+        """
+        self.queue_size = queue_size
+        self._lock = threading.RLock()
+        self._block_subscribers: Set[Subscription] = set()
+        self._address_subscribers: Dict[str, Set[Subscription]] = {}
+        self._recent = deque(maxlen=replay_blocks)  # (区块号, 区块事件, 转账列表)
+        self._has_subscribers = threading.Event()
+
+    def subscribe(self, blocks: bool = True, addresses: Iterable[str] = (),
+                  last_block: Optional[int] = None) -> Subscription:
+        """
+        订阅事件
+
+        Args:
+            blocks (bool): 是否接收新区块事件
+            addresses: 关注的地址，接收涉及这些地址的转账事件
+            last_block (int): 客户端已处理到的区块号，会补发之后缓存的事件
+        """
+        watched = {abi.to_hex_address(address): address for address in addresses}
+        subscription = Subscription(self, blocks, watched, self.queue_size)
+        with self._lock:
+            if blocks:
+                self._block_subscribers.add(subscription)
+            for hex_address in watched:
+                self._address_subscribers.setdefault(hex_address, set()).add(subscription)
+            self._has_subscribers.set()
+
+            # 在锁内补发，保证补发事件排在新事件之前且不重复
+            if last_block is not None:
+                for number, block_event, transfers in self._recent:
+                    if number > last_block:
+                        self._deliver(subscription, block_event, transfers)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._block_subscribers.discard(subscription)
+            for hex_address in subscription.addresses:
+                subscribers = self._address_subscribers.get(hex_address)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._address_subscribers[hex_address]
+            if not self._block_subscribers and not self._address_subscribers:
+                self._has_subscribers.clear()
+
+    def close_all(self):
+        """关闭全部订阅（进程退出前调用），等待事件的推送连接随即结束"""
+        with self._lock:
+            subscriptions = set(self._block_subscribers)
+            for subscribers in self._address_subscribers.values():
+                subscriptions.update(subscribers)
+        for subscription in subscriptions:
+            subscription.close()
+            try:
+                subscription.queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def wait_for_subscribers(self, timeout: float) -> bool:
+        return self._has_subscribers.wait(timeout)
+
+    def publish_block(self, block: Dict):
+        """发布新区块，每个订阅者每个事件只收到一次"""
+        raw_data = block.get('block_header', {}).get('raw_data', {})
+        number = raw_data.get('number', 0)
+        block_event = {
+            'number': number,
+            'block_id': block.get('blockID'),
+            'timestamp': raw_data.get('timestamp'),
+            'tx_count': len(block.get('transactions', []))
+        }
+        transfers = extract_transfers(block)
+
+        with self._lock:
+            self._recent.append((number, block_event, transfers))
+            targets = set(self._block_subscribers)
+            for transfer in transfers:
+                targets.update(self._address_subscribers.get(transfer['from_hex'], ()))
+                targets.update(self._address_subscribers.get(transfer['to_hex'], ()))
+
+        for subscription in targets:
+            self._deliver(subscription, block_event, transfers)
+
+    def _deliver(self, subscription: Subscription, block_event: Dict, transfers: List[Dict]):
+        number = block_event['number']
+        sequence = 0
+        if subscription.blocks:
+            subscription.put({'id': f'{number}:{sequence}', 'event': 'block', 'data': block_event})
+            sequence += 1
+
+        for transfer in transfers:
+            for side in ('from_hex', 'to_hex'):
+                address = subscription.addresses.get(transfer[side])
+                if address is None:
+                    continue
+                subscription.put({
+                    'id': f'{number}:{sequence}',
+                    'event': 'transfer',
+                    'data': {
+                        'address': address,
+                        'direction': 'out' if side == 'from_hex' else 'in',
+                        'block_number': number,
+                        'tx_id': transfer['tx_id'],
+                        'status': transfer['status'],
+                        'asset': transfer['asset'],
+                        'token': abi.to_base58_address(transfer['token']) if transfer['asset'] == 'TRC20' else transfer['token'],
+                        'from': abi.to_base58_address(transfer['from_hex']),
+                        'to': abi.to_base58_address(transfer['to_hex']),
+                        'amount_raw': transfer['amount_raw']
+                    }
+                })
+                sequence += 1
+                break  # 自转账只推送一次
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            subscribers = set(self._block_subscribers)
+            for subs in self._address_subscribers.values():
+                subscribers.update(subs)
+            return {
+                'subscribers': len(subscribers),
+                'watched_addresses': len(self._address_subscribers),
+                'latest_block': self._recent[-1][0] if self._recent else None
+            }
+
+
+class BlockFollower:
+    """共享的新区块轮询线程，只在有订阅者时访问上游"""
+
+    def __init__(self, tron_api, hub: EventHub, poll_interval: float = 1, max_gap: int = 20):
+        """
+        Args:
+            tron_api (TronAPI): 用于访问上游节点
+            hub (EventHub): 事件分发中心
+            poll_interval (float): 轮询间隔（秒）
+            max_gap (int): 一次最多补齐的区块数，落后更多时跳到最新区块
+        """
+        self.tron_api = tron_api
+        self.hub = hub
+        self.poll_interval = poll_interval
+        self.max_gap = max_gap
+        self.last_block = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """首次订阅时启动轮询线程"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='tron-block-follower', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.hub.wait_for_subscribers(self.poll_interval):
+                # 没有订阅者时不访问上游，重新订阅后从最新区块开始
+                self.last_block = 0
+                continue
+            try:
+                self.poll_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            self._stop.wait(self.poll_interval)
+
+    def poll_once(self):
+        """检查新区块并发布（绕过响应缓存，尽快发现新区块）"""
+        head, _ = self.tron_api._send_request('/wallet/getnowblock')
+        if 'error' in head:
+            raise RuntimeError(head['error'])
+        number = head.get('block_header', {}).get('raw_data', {}).get('number', 0)
+        if number <= self.last_block:
+            return
+
+        start = self.last_block + 1 if self.last_block else number
+        start = max(start, number - self.max_gap + 1)
+        for block_number in range(start, number):
+            block, _ = self.tron_api._send_request('/wallet/getblockbynum', 'POST', {'num': block_number})
+            if 'error' in block:
+                raise RuntimeError(block['error'])
+            self.hub.publish_block(block)
+            self.last_block = block_number
+
+        self.hub.publish_block(head)
+        self.last_block = number
+
+
+def format_sse(event: Dict) -> str:
+    """格式化为Server-Sent Events消息"""
+    data = json.dumps(event['data'], ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TRC20代币元数据注册表
+
+每个合约的 decimals()、symbol()、name() 只向节点查询一次，结果保存在内存并写入SQLite，
+服务重启后直接加载，多代币余额查询时每个余额只需要一次合约调用。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.api import abi
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    contract TEXT PRIMARY KEY,
+    symbol TEXT,
+    name TEXT,
+    decimals INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+"""
+
+METADATA_FUNCTIONS = ('decimals()', 'symbol()', 'name()')
+
+
+def metadata_calls(contract: str) -> Dict[str, Tuple[str, str, Dict]]:
+    """查询代币元数据的常量合约调用，名称 -> (endpoint, method, data)"""
+    return {
+        function: ('/wallet/triggerconstantcontract', 'POST', {
+            'contract_address': contract,
+            'function_selector': function,
+            'owner_address': contract,
+            'visible': True
+        })
+        for function in METADATA_FUNCTIONS
+    }
+
+
+def parse_metadata(contract: str, responses: Dict[str, Dict]) -> Dict:
+    """
+    解析元数据调用结果
+
+    decimals() 必须成功；symbol()/name() 是可选的ERC20扩展，失败时为None。
+    """
+    decimals_response = responses.get('decimals()') or {}
+    if 'error' in decimals_response:
+        raise RuntimeError(decimals_response['error'])
+    result = abi.constant_result(decimals_response)
+    if not result:
+        raise ValueError(f'合约{contract}不是有效的TRC20代币')
+    decimals = abi.decode_uint256(result)
+    if decimals > 77:
+        raise ValueError(f'合约{contract}的decimals异常：{decimals}')
+
+    info = {'contract': contract, 'decimals': decimals}
+    for field, function in (('symbol', 'symbol()'), ('name', 'name()')):
+        value = abi.constant_result(responses.get(function) or {})
+        info[field] = None
+        if value:
+            try:
+                info[field] = abi.decode_string(value).strip('\x00').strip() or None
+            except ValueError:
+                pass
+    return info
+
+
+class TokenRegistry:
+    """代币元数据缓存，线程安全"""
+
+    def __init__(self, path: Optional[str] = None, defaults: Iterable[Dict] = ()):
+        """
+        Args:
+            path (str): SQLite数据库文件路径，为空时只缓存在内存中
+            defaults: 内置的代币元数据（如配置中的USDT），不需要查询节点
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, Dict] = {}
+        self._conn = None
+        self.fetched = 0
+
+        if path:
+            if path != ':memory:':
+                directory = os.path.dirname(path)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory)
+            self._connect()
+            with self._lock:
+                for row in self._conn.execute('SELECT contract, symbol, name, decimals FROM tokens'):
+                    self._tokens[row['contract']] = dict(row)
+
+        for token in defaults:
+            self._tokens[self._key(token['contract'])] = dict(token, contract=self._key(token['contract']))
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def reopen(self):
+        """fork后在子进程中重新连接数据库（SQLite连接不能跨进程使用）"""
+        self._lock = threading.Lock()
+        if self._conn is not None and self.path != ':memory:':
+            self._connect()
+
+    @staticmethod
+    def _key(contract: str) -> str:
+        """统一使用base58地址作为键"""
+        return abi.to_base58_address(abi.to_hex_address(contract))
+
+    def get(self, contract: str) -> Optional[Dict]:
+        """获取已缓存的元数据，未缓存时返回None"""
+        try:
+            key = self._key(contract)
+        except ValueError:
+            return None
+        token = self._tokens.get(key)
+        return dict(token) if token is not None else None
+
+    def put(self, info: Dict) -> Dict:
+        """保存元数据（写入内存和数据库）"""
+        key = self._key(info['contract'])
+        token = {'contract': key, 'symbol': info.get('symbol'), 'name': info.get('name'),
+                 'decimals': int(info['decimals'])}
+        with self._lock:
+            self._tokens[key] = token
+            if self._conn is not None:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO tokens (contract, symbol, name, decimals, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, token['symbol'], token['name'], token['decimals'], int(time.time()))
+                )
+                self._conn.commit()
+        return dict(token)
+
+    def resolve(self, contract: str, responses: Dict[str, Dict]) -> Dict:
+        """解析 metadata_calls 的响应并缓存"""
+        self.fetched += 1
+        return self.put(parse_metadata(self._key(contract), responses))
+
+    def token_flow(self, contract: str):
+        """获取代币元数据的查询流程，已缓存时不访问节点"""
+        token = self.get(contract)
+        if token is not None:
+            return token
+        key = self._key(contract)
+        responses = yield metadata_calls(key)
+        return self.resolve(key, responses)
+
+    def tokens(self) -> List[Dict]:
+        with self._lock:
+            return [dict(token) for token in self._tokens.values()]
+
+    def get_stats(self) -> Dict:
+        return {
+            'cached_tokens': len(self._tokens),
+            'fetched': self.fetched,
+            'persistent': self._conn is not None
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享的HTTP连接池传输层
+
+TronAPI实例持有一个PooledTransport，所有上游请求复用同一个requests.Session，
+连接在Flask工作线程之间共享，避免每次请求都重新进行TCP+TLS握手。
+"""
+
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class PoolStats:
+    """连接池统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0            # 复用已建立的连接
+        self.misses = 0          # 需要新建TCP/TLS连接
+        self.age_total = 0.0     # 复用连接的累计存活时间
+        self.age_max = 0.0
+
+    def record_hit(self, age: float):
+        with self._lock:
+            self.hits += 1
+            self.age_total += age
+            if age > self.age_max:
+                self.age_max = age
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'reused_conn_age_avg': round(self.age_total / self.hits, 3) if self.hits else 0.0,
+                'reused_conn_age_max': round(self.age_max, 3)
+            }
+
+
+def _instrumented_pool(base_cls):
+    """为urllib3连接池类增加命中/未命中和连接存活时间统计"""
+
+    class InstrumentedPool(base_cls):
+        stats: Optional[PoolStats] = None
+
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout=timeout)
+            now = time.monotonic()
+            if getattr(conn, 'sock', None) is not None:
+                # 连接仍保持打开，属于复用
+                born = getattr(conn, '_fp_connected_at', now)
+                if self.stats:
+                    self.stats.record_hit(now - born)
+            else:
+                # 新连接或已被服务端关闭的连接，需要重新握手
+                conn._fp_connected_at = now
+                if self.stats:
+                    self.stats.record_miss()
+            return conn
+
+    # 保持原类名，避免改变异常信息中的连接池名称
+    InstrumentedPool.__name__ = InstrumentedPool.__qualname__ = base_cls.__name__
+    return InstrumentedPool
+
+
+class _InstrumentedAdapter(HTTPAdapter):
+    """使用带统计连接池的HTTPAdapter"""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        http_pool = _instrumented_pool(HTTPConnectionPool)
+        https_pool = _instrumented_pool(HTTPSConnectionPool)
+        http_pool.stats = self._stats
+        https_pool.stats = self._stats
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': http_pool,
+            'https': https_pool
+        }
+
+
+class PooledTransport:
+    """线程安全的keep-alive HTTP传输层"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 50,
+                 pool_block: bool = False, max_retries: int = 2,
+                 backoff_factor: float = 0.3, status_forcelist=(500, 502, 503, 504)):
+        """
+        初始化连接池
+
+        Args:
+            pool_connections (int): 缓存的主机连接池数量
+            pool_maxsize (int): 每个主机保持的最大连接数，应不小于Flask工作线程数
+            pool_block (bool): 连接池耗尽时是否阻塞等待
+            max_retries (int): 连接错误和5xx响应的最大重试次数
+            backoff_factor (float): 重试退避系数（秒）
+            status_forcelist: 需要重试的HTTP状态码
+        """
+        self.pool_maxsize = pool_maxsize
+        self.stats = PoolStats()
+        self._created_at = time.monotonic()
+
+        # TRON的查询接口均为POST，但语义上是幂等的，因此允许对POST重试
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=tuple(status_forcelist),
+            allowed_methods=frozenset(['GET', 'POST']),
+            # 429由API Key池处理（暂停该Key并换Key），不在连接池内按Retry-After阻塞重试
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+
+        adapter = _InstrumentedAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.trust_env = False  # 忽略系统代理设置
+        self.session.headers.update({'Connection': 'keep-alive'})
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送请求（复用连接池）"""
+        return self.session.request(method, url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        stats = self.stats.snapshot()
+        stats['pool_maxsize'] = self.pool_maxsize
+        stats['uptime'] = round(time.monotonic() - self._created_at, 3)
+        return stats
+
+    def close(self):
+        """关闭所有连接"""
+        self.session.close()
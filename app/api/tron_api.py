@@ -9,13 +9,29 @@ import json
 import time
 import requests
 from datetime import datetime
+from urllib.parse import urlparse
 from flask import jsonify
-from typing import Dict, Any, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Any, Callable, Generator, List, Optional, Tuple
+
+from app.api import abi, block_view, hd_wallet
+from app.api.address_factory import get_mnemonic
+from app.api.cache_policy import ChainCachePolicy
+from app.api.rate_limit import ApiKeyPool, KeySlot, parse_retry_after
+from app.api.token_registry import TokenRegistry, metadata_calls
+from app.api.transport import PooledTransport
+from app.api.upstream import NON_IDEMPOTENT_ENDPOINTS, Endpoint, UpstreamRouter
+from app.utils import metrics, tracing
+from app.utils.cache import CacheBackend, LRUTTLCache
+from app.utils.json_provider import RawJSON, loads as json_loads
+from app.utils.single_flight import SingleFlight
+from config.config import Config
 
 try:
     from tronpy import Tron
     from tronpy.keys import PrivateKey
     from mnemonic import Mnemonic
+    from app.api import tx_builder
     TRONPY_AVAILABLE = True
 except ImportError:
     # 如果tronpy不可用，创建模拟类
@@ -37,15 +53,121 @@ except ImportError:
 
     TRONPY_AVAILABLE = False
 
+# 查询流程：yield请求描述，接收响应，最终return响应结果
+Flow = Generator[Any, Any, Any]
+
+
+# 上游请求指标
+UPSTREAM_LATENCY = metrics.registry.histogram(
+    'tron_upstream_request_duration_seconds', '上游请求耗时（秒）', ('endpoint', 'node'))
+UPSTREAM_RESPONSES = metrics.registry.counter(
+    'tron_upstream_responses_total', '上游响应数（按HTTP状态码）', ('endpoint', 'status'))
+UPSTREAM_ERRORS = metrics.registry.counter(
+    'tron_upstream_errors_total', '上游请求失败数（按异常类型）', ('endpoint', 'type'))
+
+
+class Parallel:
+    """流程中并发执行多个子流程，limit为最大并发数"""
+
+    def __init__(self, flows: List[Flow], limit: int = 16):
+        self.flows = flows
+        self.limit = limit
+
+
+class Offload:
+    """流程中的CPU密集步骤（如签名），对每个元素调用func，由执行器放到线程池中运行，返回结果列表"""
+
+    def __init__(self, func: Callable[[Any], Any], items: List[Any]):
+        self.func = func
+        self.items = items
+
+
 class TronAPI:
     """TRON API核心类"""
 
-    def __init__(self):
-        """初始化TRON API"""
-        self.tron_grid_url = 'https://api.trongrid.io'
-        self.usdt_contract = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'  # USDT TRC20合约地址
-        self.usdt_decimals = 6
-        self.timeout = 30
+    REQUEST_HEADERS = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'TRON-API-Python/3.0'
+    }
+
+    def __init__(self, config: Dict = None, cache: CacheBackend = None):
+        """
+        初始化TRON API
+
+        Args:
+            config (dict): 配置项，默认读取Config类
+            cache (CacheBackend): 自定义缓存后端，默认使用进程内LRU缓存
+        """
+        self.config = config if config is not None else {
+            key: getattr(Config, key) for key in dir(Config) if key.isupper()
+        }
+        # 上游全节点：按延迟选择、熔断故障节点，只读请求可对冲
+        self.router = UpstreamRouter(
+            self._config('TRON_NODE_URLS') or [self._config('TRON_GRID_API_URL', 'https://api.trongrid.io')],
+            failure_threshold=self._config('UPSTREAM_FAILURE_THRESHOLD', 5),
+            open_seconds=self._config('UPSTREAM_OPEN_SECONDS', 30),
+            max_lag=self._config('UPSTREAM_MAX_LAG', 20),
+            hedge_enabled=self._config('UPSTREAM_HEDGE_ENABLED', True),
+            hedge_min_delay=self._config('UPSTREAM_HEDGE_MIN_DELAY', 0.05),
+            hedge_max_delay=self._config('UPSTREAM_HEDGE_MAX_DELAY', 2)
+        )
+        self.usdt_contract = self._config('USDT_CONTRACT_ADDRESS', 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t')
+        self.usdt_decimals = self._config('USDT_DECIMALS', 6)
+        # TronGrid API Key池，每个Key按配额限流
+        self.api_keys = ApiKeyPool(
+            self._config('TRON_GRID_API_KEYS') or [self._config('TRON_GRID_API_KEY', '')],
+            rate=self._config('TRON_GRID_KEY_RATE', 15),
+            burst=self._config('TRON_GRID_KEY_BURST'),
+            strategy=self._config('TRON_GRID_KEY_STRATEGY', 'least_used'),
+            max_wait=self._config('TRON_GRID_MAX_QUEUE_WAIT', 2),
+            anonymous_rate=self._config('TRON_GRID_ANON_RATE', 0)
+        )
+        self._key_hosts = {'trongrid.io', urlparse(self._config('TRON_GRID_API_URL', 'https://api.trongrid.io')).hostname}
+
+        self.timeout = self._config('API_TIMEOUT', 30)
+        self.connect_timeout = self._config('UPSTREAM_CONNECT_TIMEOUT', 3)
+
+        # 共享的keep-alive连接池，所有工作线程复用
+        self.transport = PooledTransport(
+            pool_connections=self._config('HTTP_POOL_CONNECTIONS', 10),
+            pool_maxsize=self._config('HTTP_POOL_MAXSIZE', 50),
+            pool_block=self._config('HTTP_POOL_BLOCK', False),
+            max_retries=self._config('HTTP_MAX_RETRIES', 2),
+            backoff_factor=self._config('HTTP_RETRY_BACKOFF', 0.3),
+            status_forcelist=self._config('HTTP_RETRY_STATUS', (500, 502, 503, 504))
+        )
+
+        # 只读查询响应缓存
+        if cache is None and self._config('CACHE_ENABLED', True):
+            cache = LRUTTLCache(
+                max_entries=self._config('CACHE_MAX_ENTRIES', 10000),
+                max_bytes=self._config('CACHE_MAX_BYTES', 64 * 1024 * 1024)
+            )
+        self.cache = cache
+        self.cache_policy = ChainCachePolicy(
+            overrides=self._config('CACHE_TTL_OVERRIDES'),
+            solidified_depth=self._config('CACHE_SOLIDIFIED_DEPTH', 19)
+        )
+
+        # 原样返回上游数据的接口（交易、完整区块）不解析再编码，直接拼接上游响应字节
+        self.raw_passthrough = self._config('JSON_RAW_PASSTHROUGH', True)
+
+        # 相同的并发只读请求合并为一次上游调用
+        self.single_flight = SingleFlight() if self._config('SINGLE_FLIGHT_ENABLED', True) else None
+
+        # TRC20代币元数据（decimals/symbol/name），每个合约只查询一次
+        self.token_registry = TokenRegistry(self._config('TOKEN_DB_PATH'), defaults=[{
+            'contract': self.usdt_contract, 'symbol': 'USDT', 'name': 'Tether USD', 'decimals': self.usdt_decimals
+        }])
+
+        # 本地区块索引（启用索引器时设置），区块/交易查询优先读取
+        self.block_store = None
+        # 转账队列调度器（启用转账队列时设置）
+        self.payout_queue = None
+
+        self._create_executors()
+        # 引用区块缓存
+        self._ref_block = None
 
         # 尝试初始化Tron客户端
         try:
@@ -57,49 +179,494 @@ class TronAPI:
             print(f"Warning: Could not initialize Tron client: {e}")
             self.client = None
 
-    def _make_request(self, endpoint: str, method: str = 'GET', data: Dict = None) -> Dict:
-        """发送HTTP请求到TRON网络"""
-        url = f"{self.tron_grid_url}{endpoint}"
-        headers = {
-            'Content-Type': 'application/json',
-            'User-Agent': 'TRON-API-Python/3.0'
-        }
-
-        # 配置会话以处理网络问题
-        session = requests.Session()
-        session.trust_env = False  # 忽略系统代理设置
+    def _create_executors(self):
+        """创建线程池（线程在首次提交任务时启动）"""
+        # 多节点时发送对冲/故障转移请求的线程池
+        self._upstream_executor = ThreadPoolExecutor(
+            max_workers=self._config('HTTP_POOL_MAXSIZE', 50),
+            thread_name_prefix='tron-upstream'
+        )
+
+        # 组合查询内部的并发子请求线程池
+        self._fanout_executor = ThreadPoolExecutor(
+            max_workers=self._config('FANOUT_MAX_WORKERS', 32),
+            thread_name_prefix='tron-fanout'
+        )
+
+        # 转账签名线程池
+        self._sign_executor = ThreadPoolExecutor(
+            max_workers=self._config('SIGN_WORKERS', 4),
+            thread_name_prefix='tron-sign'
+        )
+
+    def after_fork(self):
+        """
+        在fork出的工作进程中调用
+
+        父进程中的线程不会复制到子进程，已建立的连接和SQLite连接也不能跨进程共用，
+        这里重建线程池、丢弃继承的上游连接并重新连接数据库；缓存、代币元数据等只读状态直接沿用。
+        """
+        self._create_executors()
+        self.transport.close()
+        self.token_registry.reopen()
+        if self.block_store is not None:
+            self.block_store.reopen()
+        if self.payout_queue is not None:
+            self.payout_queue.store.reopen()
+
+    def shutdown(self, wait: bool = True):
+        """停止接收新的并发子请求，wait为True时等待进行中的上游请求完成后关闭连接池"""
+        for executor in (self._fanout_executor, self._upstream_executor, self._sign_executor):
+            executor.shutdown(wait=wait)
+        self.transport.close()
+
+    def _config(self, key: str, default: Any = None) -> Any:
+        """读取配置项"""
+        return self.config.get(key, default)
+
+    @property
+    def tron_grid_url(self) -> str:
+        """首选上游节点地址"""
+        return self.router.primary_url
+
+    @tron_grid_url.setter
+    def tron_grid_url(self, url: str):
+        self.router.set_urls([url])
+
+    def get_transport_stats(self) -> Dict:
+        """获取HTTP连接池统计信息"""
+        return self.transport.get_stats()
+
+    def get_cache_stats(self) -> Optional[Dict]:
+        """获取响应缓存统计信息"""
+        if self.cache is None:
+            return None
+        return self.cache.get_stats()
+
+    def _cache_key(self, endpoint: str, method: str, data: Dict, raw: bool = False) -> str:
+        """生成缓存键（原始字节和解析结果分开缓存）"""
+        payload = json.dumps(data, sort_keys=True, separators=(',', ':')) if data else ''
+        return f"{'RAW ' if raw else ''}{method.upper()} {endpoint} {payload}"
+
+    def _cache_lookup(self, endpoint: str, method: str, data: Dict, raw: bool = False) -> Tuple[Optional[str], Any]:
+        """查询缓存，返回(缓存键, 缓存值)，接口不可缓存时缓存键为None"""
+        if self.cache is None or not self.cache_policy.is_cacheable(endpoint):
+            return None, None
+        cache_key = self._cache_key(endpoint, method, data, raw)
+        with tracing.tracer.span('cache.lookup') as span:
+            cached = self.cache.get(cache_key)
+            span.set_attribute('cache.hit', cached is not None)
+        return cache_key, cached
+
+    def _cache_store(self, cache_key: Optional[str], endpoint: str, response: Dict, size: int,
+                     data: Dict = None):
+        """按缓存策略写入缓存"""
+        if cache_key is not None:
+            ttl = self.cache_policy.ttl_for(endpoint, response, data)
+            self.cache.set(cache_key, response, ttl, size=size)
+
+    def _make_request(self, endpoint: str, method: str = 'GET', data: Dict = None, raw: bool = False) -> Dict:
+        """
+        发送HTTP请求到TRON网络（只读查询优先读取缓存，相同的并发请求只发送一次）
+
+        raw为True时成功响应为RawJSON（上游原始字节），失败时仍为 {'error': ...}
+        """
+        with tracing.tracer.span('tron.request', {'tron.endpoint': endpoint, 'http.method': method.upper()}) as span:
+            cache_key, cached = self._cache_lookup(endpoint, method, data, raw)
+            if cached is not None:
+                return cached
+
+            if self.single_flight is None or endpoint in NON_IDEMPOTENT_ENDPOINTS:
+                response = self._fetch(cache_key, endpoint, method, data, raw)
+            else:
+                flight_key = cache_key or self._cache_key(endpoint, method, data, raw)
+                response, shared = self.single_flight.do(
+                    flight_key, lambda: self._fetch(cache_key, endpoint, method, data, raw))
+                span.set_attribute('single_flight.shared', shared)
+            self._trace_response(span, response)
+            return response
+
+    @staticmethod
+    def _trace_response(span, response: Any):
+        """上游返回错误时标记span"""
+        if isinstance(response, dict) and 'error' in response:
+            span.set_status('ERROR', str(response['error']))
+
+    def _fetch(self, cache_key: Optional[str], endpoint: str, method: str, data: Dict, raw: bool = False) -> Dict:
+        """请求上游并写入缓存"""
+        response, size = self._send_request(endpoint, method, data, raw)
+        self._cache_store(cache_key, endpoint, response, size, data)
+        return response
+
+    def get_single_flight_stats(self) -> Optional[Dict]:
+        """获取请求合并统计"""
+        if self.single_flight is None:
+            return None
+        return self.single_flight.get_stats()
+
+    def _send_request(self, endpoint: str, method: str = 'GET', data: Dict = None,
+                      raw: bool = False) -> Tuple[Dict, int]:
+        """
+        发送HTTP请求到TRON网络，返回(响应数据, 响应字节数)
+
+        配置多个节点时，只读请求在超过近期P95延迟仍未返回时向另一个节点发出对冲请求，取先成功的结果；
+        节点网络错误或5xx时换节点重试。广播交易只发送到一个节点。
+        """
+        router = self.router
+        if len(router.endpoints) == 1:
+            return self._request_node(router.select(), endpoint, method, data, raw)[:2]
+
+        max_attempts = self._config('UPSTREAM_MAX_ATTEMPTS', 2)
+        hedge = router.can_hedge(endpoint)
+        tried: List[Endpoint] = []
+        pending = {}
+
+        def launch() -> bool:
+            node = router.select(exclude=tried)
+            if node is None:
+                return False
+            tried.append(node)
+            pending[self._upstream_executor.submit(tracing.bind(self._request_node), node, endpoint, method, data, raw)] = node
+            return True
+
+        launch()
+        hedged = False
+        last = ({'error': '没有可用的上游节点'}, 0)
+        while pending:
+            timeout = router.hedge_delay() if hedge and not hedged else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 首选节点超过P95延迟未返回，向另一个节点发出对冲请求
+                hedged = True
+                launch()
+                continue
+
+            for future in done:
+                node = pending.pop(future)
+                response, size, healthy = future.result()
+                if healthy:
+                    if hedged:
+                        router.note_hedge(won=node is not tried[0])
+                    return response, size
+                last = (response, size)
+
+            if not pending and router.can_failover(endpoint) and len(tried) < max_attempts:
+                hedged = True  # 重试请求不再对冲
+                if launch():
+                    router.note_failover()
+        return last
+
+    def _request_same_node(self, calls: List[Tuple[str, str, Optional[Dict]]]) -> List[Dict]:
+        """
+        在同一个上游节点上依次发送请求，不经过缓存、请求合并和对冲
+
+        后一个请求的结果要以前一个请求看到的节点状态为前提时使用（如先查固化区块高度、再查固化数据中的交易），
+        不同节点的同步进度不同，分开路由无法得出结论。遇到错误时停止，返回已完成的响应。
+        """
+        node = self.router.select()
+        responses = []
+        for index, (endpoint, method, data) in enumerate(calls):
+            if index:
+                self.router.acquire(node)
+            response = self._request_node(node, endpoint, method, data)[0]
+            responses.append(response)
+            if 'error' in response:
+                break
+        return responses
+
+    def _request_node(self, node: Endpoint, endpoint: str, method: str, data: Dict,
+                      raw: bool = False) -> Tuple[Dict, int, bool]:
+        """
+        向指定节点发送请求
+
+        Returns:
+            tuple: (响应数据, 响应字节数, 节点是否正常)，4xx属于请求本身的问题，不计入节点故障
+        """
+        url = f"{node.url}{endpoint}"
+        headers = dict(self.REQUEST_HEADERS)
+        timeout = (self.connect_timeout, self.timeout)
+
+        slot, wait, shed = self._reserve_api_key(node)
+        if shed is not None:
+            UPSTREAM_ERRORS.inc(endpoint=endpoint, type='RateLimited')
+            return shed, 0, True
+        if wait > 0:
+            time.sleep(wait)
+        headers.update(self.api_keys.headers(slot))
+        span = self._start_node_span(node, endpoint, method, wait)
+        tracing.inject(headers, span)
+
+        started = time.monotonic()
+        status = None
+        error_type = None
 
         try:
             if method.upper() == 'POST':
-                response = session.post(url, json=data, headers=headers, timeout=self.timeout,
-                                      verify=True, proxies={})
+                response = self.transport.request('POST', url, json=data, headers=headers,
+                                                  timeout=timeout, verify=True, proxies={})
             else:
-                response = session.get(url, params=data, headers=headers, timeout=self.timeout,
-                                     verify=True, proxies={})
+                response = self.transport.request('GET', url, params=data, headers=headers,
+                                                  timeout=timeout, verify=True, proxies={})
 
+            status = response.status_code
+            if status == 429 and slot is not None:
+                self.api_keys.penalize(slot, parse_retry_after(response.headers.get('Retry-After')))
             response.raise_for_status()
-            return response.json()
+            result = self._decode_body(response.content, raw), len(response.content)
         except requests.exceptions.ProxyError as e:
-            return {'error': f'代理连接错误: {str(e)}'}
+            result = {'error': f'代理连接错误: {str(e)}'}, 0
+            error_type = 'ProxyError'
         except requests.exceptions.SSLError as e:
-            return {'error': f'SSL连接错误: {str(e)}'}
+            result = {'error': f'SSL连接错误: {str(e)}'}, 0
+            error_type = 'SSLError'
         except requests.exceptions.ConnectionError as e:
-            return {'error': f'网络连接错误: {str(e)}'}
+            result = {'error': f'网络连接错误: {str(e)}'}, 0
+            error_type = 'ConnectionError'
         except requests.exceptions.Timeout as e:
-            return {'error': f'请求超时: {str(e)}'}
-        except requests.exceptions.RequestException as e:
-            return {'error': f'请求异常: {str(e)}'}
-        finally:
-            session.close()
-
-    def _success_response(self, msg: str, data: Any = None) -> Dict:
-        """成功响应格式"""
-        response_data = {
-            'code': 1,
+            result = {'error': f'请求超时: {str(e)}'}, 0
+            error_type = 'Timeout'
+        except (requests.exceptions.RequestException, ValueError) as e:
+            result = {'error': f'请求异常: {str(e)}'}, 0
+            error_type = 'HTTPError' if status and status >= 400 else type(e).__name__
+
+        return result[0], result[1], self._release_node(node, endpoint, started, result[0], status, error_type, span)
+
+    @staticmethod
+    def _start_node_span(node: Endpoint, endpoint: str, method: str, wait: float):
+        """单个节点请求的客户端span"""
+        attributes = {'tron.endpoint': endpoint, 'http.method': method.upper(), 'tron.node': node.url}
+        if wait > 0:
+            attributes['tron.api_key_wait_ms'] = round(wait * 1000, 2)
+        return tracing.tracer.start_span('upstream.http', attributes, kind='client')
+
+    @staticmethod
+    def _decode_body(content: bytes, raw: bool) -> Any:
+        """解析上游响应，raw时保留原始字节"""
+        return RawJSON(content) if raw else json_loads(content)
+
+    def _release_node(self, node: Endpoint, endpoint: str, started: float, response: Any,
+                      status: Optional[int], error_type: Optional[str], span=tracing.NOOP_SPAN) -> bool:
+        """登记请求结果、指标和span，返回节点是否正常（4xx属于请求本身的问题，不计入节点故障）"""
+        latency = time.monotonic() - started
+        error = response.get('error') if isinstance(response, dict) else None
+        healthy = error is None or (status is not None and status < 500)
+        self.router.release(node, latency, healthy, error)
+
+        UPSTREAM_LATENCY.observe(latency, endpoint=endpoint, node=node.url)
+        if status is not None:
+            UPSTREAM_RESPONSES.inc(endpoint=endpoint, status=status)
+        if error_type is not None:
+            UPSTREAM_ERRORS.inc(endpoint=endpoint, type=error_type)
+
+        if status is not None:
+            span.set_attribute('http.status_code', status)
+        if error_type is not None:
+            span.set_attribute('error.type', error_type)
+            span.set_status('ERROR', error)
+        span.end()
+        return healthy
+
+    def _uses_api_key(self, url: str) -> bool:
+        """TronGrid节点需要携带API Key，自建节点不需要"""
+        host = urlparse(url).hostname or ''
+        return host in self._key_hosts or host.endswith('.trongrid.io')
+
+    def _reserve_api_key(self, node: Endpoint) -> Tuple[Optional[KeySlot], float, Optional[Dict]]:
+        """
+        为发往TronGrid的请求预约API Key令牌
+
+        Returns:
+            tuple: (KeySlot, 需要等待的秒数, 本地拒绝时的错误响应)
+        """
+        if not self._uses_api_key(node.url):
+            return None, 0.0, None
+        slot, wait = self.api_keys.reserve()
+        if slot is None:
+            # 本地拒绝不算节点故障，也不计入延迟统计
+            self.router.release(node, 0, None)
+            return None, wait, {'error': f'上游请求限流: API Key配额已用尽，约{wait:.1f}秒后恢复'}
+        return slot, wait, None
+
+    def _probe_upstream(self, url: str) -> Tuple[Optional[bool], int, Optional[str]]:
+        """
+        主动健康检查：读取节点最新区块号
+
+        Returns:
+            tuple: (是否成功, 最新区块号, 错误信息)；API Key配额不足未发送探测时返回 (None, 0, None)，
+            UpstreamRouter.check_once 跳过该节点，不计为成功或失败
+        """
+        timeout = (self.connect_timeout, self._config('UPSTREAM_PROBE_TIMEOUT', 5))
+        headers = dict(self.REQUEST_HEADERS)
+        if self._uses_api_key(url):
+            # 探测请求同样占用Key配额，配额不足时跳过本轮探测
+            slot, _ = self.api_keys.reserve(max_wait=0)
+            if slot is None:
+                return None, 0, None
+            headers.update(self.api_keys.headers(slot))
+        try:
+            response = self.transport.request('POST', f'{url}/wallet/getblock', json={'detail': False},
+                                              headers=headers, timeout=timeout, proxies={})
+            block = response.json() if response.status_code < 400 else {}
+            if 'block_header' not in block:
+                # 旧版本节点不支持getblock，改用getnowblock
+                response = self.transport.request('POST', f'{url}/wallet/getnowblock', headers=headers,
+                                                  timeout=timeout, proxies={})
+                response.raise_for_status()
+                block = response.json()
+            number = block.get('block_header', {}).get('raw_data', {}).get('number')
+            if not number:
+                return False, 0, '响应数据格式异常'
+            return True, number, None
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return False, 0, str(e)
+
+    def get_api_key_stats(self) -> Dict:
+        """获取API Key使用统计"""
+        return self.api_keys.get_stats()
+
+    def collect_metrics(self) -> List[metrics.Family]:
+        """抓取/metrics时读取缓存、连接池、上游节点等已有统计"""
+        families = []
+        pool = self.get_transport_stats()
+        families.append(metrics.stats_family('tron_http_pool_hits_total', 'counter', '复用已建立连接的次数', pool['hits']))
+        families.append(metrics.stats_family('tron_http_pool_misses_total', 'counter', '新建连接的次数', pool['misses']))
+
+        cache = self.get_cache_stats()
+        if cache is not None:
+            for key, metric_type, documentation in (
+                ('hits', 'counter', '缓存命中数'), ('misses', 'counter', '缓存未命中数'),
+                ('evictions', 'counter', 'LRU淘汰数'), ('expirations', 'counter', '过期条目数'),
+                ('entries', 'gauge', '缓存条目数'), ('bytes', 'gauge', '缓存占用字节数')
+            ):
+                name = f'tron_cache_{key}_total' if metric_type == 'counter' else f'tron_cache_{key}'
+                families.append(metrics.stats_family(name, metric_type, documentation, cache[key]))
+
+        flights = self.get_single_flight_stats()
+        if flights is not None:
+            families.append(metrics.stats_family('tron_single_flight_coalesced_total', 'counter',
+                                                 '被合并的相同并发请求数', flights['coalesced']))
+
+        upstream = self.get_upstream_stats()
+        nodes = upstream['endpoints']
+        families.append(('tron_upstream_in_flight', 'gauge', '上游节点在途请求数',
+                         [({'node': node['url']}, node['in_flight']) for node in nodes]))
+        families.append(('tron_upstream_up', 'gauge', '上游节点是否可用（熔断时为0）',
+                         [({'node': node['url']}, 0 if node['state'] == 'open' else 1) for node in nodes]))
+        families.append(('tron_upstream_head_block', 'gauge', '健康检查观察到的节点最新区块号',
+                         [({'node': node['url']}, node['head_block']) for node in nodes]))
+        families.append(metrics.stats_family('tron_upstream_hedged_total', 'counter', '发出的对冲请求数', upstream['hedged']))
+        families.append(metrics.stats_family('tron_upstream_failovers_total', 'counter', '故障转移次数', upstream['failovers']))
+
+        keys = self.get_api_key_stats()
+        families.append(('tron_api_key_requests_total', 'counter', '各API Key的请求数',
+                         [({'key': key['key']}, key['requests']) for key in keys['keys']]))
+        families.append(('tron_api_key_throttled_total', 'counter', '各API Key收到429的次数',
+                         [({'key': key['key']}, key['throttled']) for key in keys['keys']]))
+        families.append(metrics.stats_family('tron_api_key_shed_total', 'counter', '配额不足在本地拒绝的请求数', keys['shed']))
+        return families
+
+    def get_upstream_stats(self) -> Dict:
+        """获取上游节点状态"""
+        return self.router.get_stats()
+
+    def _fan_out(self, calls: Dict[str, Tuple[str, str, Dict]], timeout: float = None) -> Dict[str, Dict]:
+        """
+        并发执行互不依赖的上游子请求
+
+        Args:
+            calls (dict): 名称 -> (endpoint, method, data)
+            timeout (float): 整体等待时间（秒），超时未返回的子请求记为错误
+
+        Returns:
+            dict: 名称 -> 响应数据，失败或超时的子请求返回 {'error': ...}
+        """
+        if timeout is None:
+            timeout = self._config('FANOUT_LEG_TIMEOUT', 10)
+
+        futures = {
+            name: self._fanout_executor.submit(tracing.bind(self._make_request), endpoint, method, data)
+            for name, (endpoint, method, data) in calls.items()
+        }
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                results[name] = {'error': f'请求超时: 子请求超过{timeout}秒未返回'}
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = {'error': f'请求异常: {str(e)}'}
+        return results
+
+    def _run_flow(self, flow: Flow) -> Any:
+        """
+        同步执行查询流程
+
+        流程是一个生成器：yield (endpoint, method, data) 发送单个请求，
+        yield {名称: (endpoint, method, data)} 并发发送多个请求，
+        yield Parallel([...]) 并发执行多个子流程，yield Offload(func, items) 在线程池中执行CPU密集步骤；
+        这里负责实际执行并把结果送回。
+        同一流程也可由AsyncTronAPI以异步方式执行。
+        """
+        result, error = None, None
+        while True:
+            try:
+                step = flow.throw(error) if error is not None else flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+
+            result, error = None, None
+            try:
+                if isinstance(step, Parallel):
+                    result = self._run_parallel(step)
+                elif isinstance(step, Offload):
+                    result = self._run_offload(step)
+                elif isinstance(step, dict):
+                    result = self._fan_out(step)
+                else:
+                    result = self._make_request(*step)
+            except Exception as e:
+                error = e
+
+    def _run_parallel(self, parallel: 'Parallel') -> List[Any]:
+        """在有界线程池中并发执行子流程，返回结果列表（失败项为异常对象）"""
+        if not parallel.flows:
+            return []
+
+        outcomes = [None] * len(parallel.flows)
+        max_workers = max(1, min(parallel.limit, len(parallel.flows)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(tracing.bind(self._run_flow), flow): index
+                       for index, flow in enumerate(parallel.flows)}
+            for future in as_completed(futures):
+                try:
+                    outcomes[futures[future]] = future.result()
+                except Exception as e:
+                    outcomes[futures[future]] = e
+        return outcomes
+
+    def _run_offload(self, offload: 'Offload') -> List[Any]:
+        """多个元素时在签名线程池中并行执行，单个元素直接在当前线程执行"""
+        if len(offload.items) > 1:
+            futures = [self._sign_executor.submit(tracing.bind(offload.func), item) for item in offload.items]
+            return [future.result() for future in futures]
+        return [offload.func(item) for item in offload.items]
+
+    def _envelope(self, code: int, msg: str, data: Any = None) -> Dict:
+        """统一响应结构"""
+        return {
+            'code': code,
             'msg': msg,
             'data': data,
             'time': int(datetime.now().timestamp())
         }
+
+    def _success_response(self, msg: str, data: Any = None) -> Dict:
+        """成功响应格式"""
+        response_data = self._envelope(1, msg, data)
         try:
             return jsonify(response_data)
         except RuntimeError:
@@ -108,12 +675,7 @@ class TronAPI:
 
     def _error_response(self, msg: str, data: Any = None) -> Dict:
         """错误响应格式"""
-        response_data = {
-            'code': 0,
-            'msg': msg,
-            'data': data,
-            'time': int(datetime.now().timestamp())
-        }
+        response_data = self._envelope(0, msg, data)
         try:
             return jsonify(response_data)
         except RuntimeError:
@@ -151,22 +713,20 @@ class TronAPI:
         """通过助记词生成TRON地址"""
         try:
             if TRONPY_AVAILABLE and self.client:
-                # 使用mnemonic库生成助记词
-                mnemo = Mnemonic('english')
-                mnemonic_words = mnemo.generate(strength=128)
-                seed = mnemo.to_seed(mnemonic_words)
+                # 使用mnemonic库生成助记词（共用已加载的词表）
+                mnemonic_words = get_mnemonic().generate(strength=128)
 
-                # 从种子生成私钥（使用种子的前32字节作为私钥）
-                import hashlib
-                private_key_bytes = hashlib.sha256(seed[:32]).digest()
-                private_key = PrivateKey(private_key_bytes)
-                address = private_key.public_key.to_base58check_address()
+                # 按BIP-44路径 m/44'/195'/0'/0/0 推导，可导入TronLink等标准钱包
+                wallet = hd_wallet.derive_addresses(mnemonic_words, count=1, use_cache=False)
+                first = wallet['addresses'][0]
 
                 return self._success_response('助记词地址生成成功', {
                     'mnemonic': mnemonic_words,
-                    'privateKey': private_key.hex(),
-                    'address': address,
-                    'hexAddress': private_key.public_key.to_hex_address()
+                    'privateKey': first['privateKey'],
+                    'address': first['address'],
+                    'hexAddress': first['hexAddress'],
+                    'path': first['path'],
+                    'xpub': wallet['xpub']
                 })
             else:
                 # 模拟生成助记词地址
@@ -214,20 +774,52 @@ class TronAPI:
         except Exception as e:
             return self._error_response(f'获取地址失败：{str(e)}')
 
+    def derive_addresses(self, mnemonic: str = None, xpub: str = None, account=0, start=0, count=20,
+                         passphrase: str = '') -> Dict:
+        """按BIP-44路径从助记词或账户xpub推导一段地址"""
+        if not mnemonic and not xpub:
+            return self._error_response('助记词和xpub不能同时为空')
+
+        try:
+            account, start, count = int(account or 0), int(start or 0), int(count or 20)
+        except (TypeError, ValueError):
+            return self._error_response('account、start、count需为整数')
+        max_count = self._config('HD_DERIVE_MAX_COUNT', 1000)
+        if not 0 <= account < hd_wallet.HARDENED or not 0 <= start < hd_wallet.HARDENED:
+            return self._error_response('account或start超出范围')
+        if count < 1 or count > max_count:
+            return self._error_response(f'推导数量需在1到{max_count}之间')
+        count = min(count, hd_wallet.HARDENED - start)
+
+        try:
+            return self._success_response('地址推导成功', hd_wallet.derive_addresses(
+                mnemonic, xpub, account, start, count, passphrase or ''))
+        except ValueError as e:
+            return self._error_response(str(e))
+        except Exception as e:
+            return self._error_response(f'地址推导失败：{str(e)}')
+
         # ==================== 余额查询相关方法 ====================
 
     def get_trx_balance(self, address: str) -> Dict:
         """查询TRX余额"""
+        return self._run_flow(self._trx_balance_flow(address))
+
+    def _trx_balance_flow(self, address: str) -> Flow:
+        """TRX余额查询流程"""
         if not address:
             return self._error_response('地址不能为空')
 
         try:
             # 调用TRON网络API查询余额
-            response = self._make_request('/wallet/getaccount', 'POST', {
+            response = yield ('/wallet/getaccount', 'POST', {
                 'address': address
             })
 
             if 'error' in response:
+                if not self._config('SIMULATED_FALLBACK', True):
+                    return self._error_response(f'TRX余额查询失败：{response["error"]}')
+
                 # 如果网络请求失败，返回模拟数据（用于演示）
                 import random
                 balance_trx = round(random.uniform(0.001, 1000.0), 6)
@@ -255,87 +847,112 @@ class TronAPI:
         except Exception as e:
             return self._error_response(f'TRX余额查询失败：{str(e)}')
 
-    def get_trc20_balance(self, address: str) -> Dict:
-        """查询TRC20代币余额（如USDT）"""
+    def get_trc20_balance(self, address: str, contract: str = None) -> Dict:
+        """查询TRC20代币余额，默认查询USDT"""
+        return self._run_flow(self._trc20_balance_flow(address, contract))
+
+    def _trc20_balance_flow(self, address: str, contract: str = None) -> Flow:
+        """TRC20余额查询流程"""
         if not address:
             return self._error_response('地址不能为空')
+        contract = contract or self.usdt_contract
+        try:
+            abi.to_hex_address(contract)
+        except ValueError:
+            return self._error_response(f'合约地址格式错误：{contract}')
 
         try:
-            # 构建TRC20合约调用参数
-            function_selector = 'balanceOf(address)'
-            parameter = address.replace('T', '41').ljust(64, '0')  # 转换为hex格式并填充
-
-            response = self._make_request('/wallet/triggersmartcontract', 'POST', {
-                'contract_address': self.usdt_contract,
-                'function_selector': function_selector,
-                'parameter': parameter,
-                'owner_address': address
+            # 构建TRC20合约调用参数（ABI编码的20字节地址）
+            balance_call = ('/wallet/triggersmartcontract', 'POST', {
+                'contract_address': contract,
+                'function_selector': 'balanceOf(address)',
+                'parameter': abi.balance_of_parameter(address),
+                'owner_address': address,
+                'visible': True
             })
 
+            # 元数据已缓存时只需一次合约调用，否则与余额查询并发获取
+            token = self.token_registry.get(contract)
+            if token is None:
+                responses = yield dict(metadata_calls(contract), balance=balance_call)
+                response = responses.pop('balance')
+                try:
+                    token = self.token_registry.resolve(contract, responses)
+                except ValueError as e:
+                    return self._error_response(f'TRC20余额查询失败：{str(e)}')
+                except RuntimeError as e:
+                    return self._error_response(f'TRC20代币信息查询失败：{str(e)}')
+            else:
+                response = yield balance_call
+
+            decimals = token['decimals']
+            token_data = {'contract': token['contract'], 'symbol': token['symbol'], 'name': token['name'],
+                          'decimals': decimals}
+
             if 'error' in response:
+                if not self._config('SIMULATED_FALLBACK', True):
+                    return self._error_response(f'TRC20余额查询失败：{response["error"]}')
+
                 # 如果网络请求失败，返回模拟数据（用于演示）
                 import random
                 balance = round(random.uniform(0.001, 10000.0), 6)
-                balance_raw = int(balance * (10 ** self.usdt_decimals))
+                balance_raw = int(balance * (10 ** decimals))
 
-                return self._success_response('TRC20余额查询成功（模拟数据）', {
+                return self._success_response('TRC20余额查询成功（模拟数据）', dict({
                     'address': address,
                     'balance': balance,
-                    'balance_raw': balance_raw,
-                    'contract': self.usdt_contract,
-                    'symbol': 'USDT',
-                    'decimals': self.usdt_decimals,
-                    'note': '网络连接失败，返回模拟数据用于演示',
-                    'error_info': response["error"]
-                })
+                    'balance_raw': balance_raw
+                }, **token_data, note='网络连接失败，返回模拟数据用于演示', error_info=response['error']))
 
             # 解析余额
-            if 'constant_result' in response and response['constant_result']:
-                balance_hex = response['constant_result'][0]
-                balance_raw = int(balance_hex, 16)
-                balance = balance_raw / (10 ** self.usdt_decimals)
+            result = abi.constant_result(response)
+            if result is not None:
+                balance_raw = abi.decode_uint256(result)
+                balance = balance_raw / (10 ** decimals)
 
-                return self._success_response('TRC20余额查询成功', {
+                return self._success_response('TRC20余额查询成功', dict({
                     'address': address,
                     'balance': balance,
-                    'balance_raw': balance_raw,
-                    'contract': self.usdt_contract,
-                    'symbol': 'USDT',
-                    'decimals': self.usdt_decimals
-                })
+                    'balance_raw': balance_raw
+                }, **token_data))
             else:
+                if not self._config('SIMULATED_FALLBACK', True):
+                    return self._error_response('TRC20余额查询失败：响应数据格式异常')
+
                 # 如果响应格式不正确，也返回模拟数据
                 import random
                 balance = round(random.uniform(0.001, 10000.0), 6)
-                balance_raw = int(balance * (10 ** self.usdt_decimals))
+                balance_raw = int(balance * (10 ** decimals))
 
-                return self._success_response('TRC20余额查询成功（模拟数据）', {
+                return self._success_response('TRC20余额查询成功（模拟数据）', dict({
                     'address': address,
                     'balance': balance,
-                    'balance_raw': balance_raw,
-                    'contract': self.usdt_contract,
-                    'symbol': 'USDT',
-                    'decimals': self.usdt_decimals,
-                    'note': '响应数据格式异常，返回模拟数据用于演示'
-                })
+                    'balance_raw': balance_raw
+                }, **token_data, note='响应数据格式异常，返回模拟数据用于演示'))
         except Exception as e:
             return self._error_response(f'TRC20余额查询失败：{str(e)}')
 
     def get_trc10_info(self, address: str = None, token_id: str = None) -> Dict:
         """查询TRC10代币余额和信息"""
+        return self._run_flow(self._trc10_info_flow(address, token_id))
+
+    def _trc10_info_flow(self, address: str = None, token_id: str = None) -> Flow:
+        """TRC10信息查询流程"""
         address = address or 'TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu'
         token_id = token_id or '1002992'
 
         try:
-            # 查询账户信息
-            account_response = self._make_request('/wallet/getaccount', 'POST', {
-                'address': address
-            })
-
-            # 查询代币信息
-            token_response = self._make_request('/wallet/getassetissuebyid', 'POST', {
-                'value': token_id
-            })
+            # 账户信息和代币信息互不依赖，并发查询
+            responses = yield {
+                'account': ('/wallet/getaccount', 'POST', {'address': address}),
+                'token': ('/wallet/getassetissuebyid', 'POST', {'value': token_id})
+            }
+            account_response = responses['account']
+            token_response = responses['token']
+
+            errors = {name: response['error'] for name, response in responses.items() if 'error' in response}
+            if len(errors) == len(responses):
+                return self._error_response(f'TRC10信息查询失败：{errors["account"]}')
 
             # 解析TRC10余额
             trc10_balance = 0
@@ -348,106 +965,756 @@ class TronAPI:
             # 解析TRX余额
             trx_balance = account_response.get('balance', 0) / 1_000_000
 
-            return self._success_response('TRC10信息查询成功', {
+            data = {
                 'address': address,
                 'trx_balance': trx_balance,
                 'trc10_balance': trc10_balance,
-                'token_info': token_response,
+                'token_info': None if 'token' in errors else token_response,
                 'token_id': token_id
-            })
+            }
+            if errors:
+                # 部分子请求失败时返回已获取的数据
+                data['partial'] = True
+                data['errors'] = errors
+                return self._success_response('TRC10信息查询成功（部分数据）', data)
+
+            return self._success_response('TRC10信息查询成功', data)
         except Exception as e:
             return self._error_response(f'TRC10信息查询失败：{str(e)}')
 
-    # ==================== 转账相关方法 ====================
+    def get_batch_balances(self, addresses: List[str], assets: List = None) -> Dict:
+        """
+        批量查询多个地址的余额
 
-    def send_trx(self, to: str, amount: str, key: str, message: str = None) -> Dict:
-        """TRX转账"""
-        if not all([to, amount, key]):
-            return self._error_response('参数不完整：需要接收地址、转账金额和私钥')
+        Args:
+            addresses (list): TRON地址列表
+            assets (list): 资产列表，元素为 'trx'、'trc20'（USDT）或
+                {'type': 'trc20', 'contract': '...'}、{'type': 'trc10', 'tokenId': '...'}，
+                默认查询TRX和USDT
+
+        Returns:
+            每个地址的余额和错误信息，单个地址失败不影响其他地址
+        """
+        return self._run_flow(self._batch_balances_flow(addresses, assets))
+
+    def _batch_balances_flow(self, addresses: List[str], assets: List = None) -> Flow:
+        """批量余额查询流程"""
+        if not addresses or not isinstance(addresses, list):
+            return self._error_response('地址列表不能为空')
+
+        max_addresses = self._config('BATCH_MAX_ADDRESSES', 1000)
+        if len(addresses) > max_addresses:
+            return self._error_response(f'单次最多查询{max_addresses}个地址')
 
         try:
-            amount_float = float(amount)
-            if amount_float <= 0:
-                return self._error_response('转账金额必须大于0')
-        except ValueError:
-            return self._error_response('转账金额格式错误')
+            asset_specs = self._parse_batch_assets(assets or ['trx', 'trc20'])
+        except ValueError as e:
+            return self._error_response(str(e))
+
+        # 先获取各TRC20合约的元数据，已缓存的不访问节点
+        yield from self._resolve_tokens_flow([spec['contract'] for spec in asset_specs if spec['type'] == 'trc20'])
+
+        # 去重但保持顺序
+        unique_addresses = list(dict.fromkeys(a for a in addresses if a))
+
+        # 同一地址的TRX和TRC10余额共用一次getaccount调用，每个TRC20合约一次合约调用
+        tasks = []
+        needs_account = any(spec['type'] in ('trx', 'trc10') for spec in asset_specs)
+        for address in unique_addresses:
+            if needs_account:
+                tasks.append((address, 'account', None))
+            for spec in asset_specs:
+                if spec['type'] == 'trc20':
+                    tasks.append((address, 'trc20', spec['contract']))
+
+        outcomes = yield Parallel(
+            [self._batch_task_flow(address, kind, contract) for address, kind, contract in tasks],
+            limit=self._config('BATCH_MAX_CONCURRENCY', 16)
+        )
+
+        results = {address: {'address': address, 'balances': {}, 'errors': {}} for address in unique_addresses}
+        for (address, kind, contract), value in zip(tasks, outcomes):
+            entry = results[address]
+            if isinstance(value, Exception):
+                if kind == 'account':
+                    for spec in asset_specs:
+                        if spec['type'] != 'trc20':
+                            entry['errors'][spec['key']] = str(value)
+                else:
+                    entry['errors'][f'TRC20:{contract}'] = str(value)
+                continue
+
+            if kind == 'account':
+                for spec in asset_specs:
+                    if spec['type'] == 'trx':
+                        entry['balances'][spec['key']] = value['trx']
+                    elif spec['type'] == 'trc10':
+                        entry['balances'][spec['key']] = {
+                            'balance': value['assets'].get(spec['tokenId'], 0),
+                            'token_id': spec['tokenId']
+                        }
+            else:
+                entry['balances'][f'TRC20:{contract}'] = value
+
+        items = []
+        for address in unique_addresses:
+            entry = results[address]
+            entry['success'] = not entry['errors']
+            items.append(entry)
+
+        failed = sum(1 for item in items if not item['success'])
+        return self._success_response('批量余额查询完成', {
+            'results': items,
+            'total': len(items),
+            'succeeded': len(items) - failed,
+            'failed': failed
+        })
+
+    def _parse_batch_assets(self, assets: List) -> List[Dict]:
+        """解析批量查询的资产列表"""
+        specs = []
+        for asset in assets:
+            if isinstance(asset, str):
+                asset = {'type': asset}
+            if not isinstance(asset, dict):
+                raise ValueError(f'资产格式错误：{asset}')
+
+            asset_type = str(asset.get('type', '')).lower()
+            if asset_type == 'trx':
+                specs.append({'type': 'trx', 'key': 'TRX'})
+            elif asset_type == 'trc20':
+                contract = asset.get('contract') or self.usdt_contract
+                try:
+                    abi.to_hex_address(contract)
+                except ValueError:
+                    raise ValueError(f'合约地址格式错误：{contract}')
+                specs.append({'type': 'trc20', 'contract': contract, 'key': f'TRC20:{contract}'})
+            elif asset_type == 'trc10':
+                token_id = str(asset.get('tokenId') or asset.get('token_id') or '')
+                if not token_id:
+                    raise ValueError('TRC10资产需要指定tokenId')
+                specs.append({'type': 'trc10', 'tokenId': token_id, 'key': f'TRC10:{token_id}'})
+            else:
+                raise ValueError(f'不支持的资产类型：{asset.get("type")}')
+        return specs
+
+    def _batch_task_flow(self, address: str, kind: str, contract: Optional[str]) -> Flow:
+        """单个批量查询任务，失败时抛出异常"""
+        if kind == 'account':
+            response = yield ('/wallet/getaccount', 'POST', {'address': address})
+            if 'error' in response:
+                raise RuntimeError(response['error'])
+
+            balance_sun = response.get('balance', 0)
+            return {
+                'trx': {
+                    'balance': balance_sun / 1_000_000,
+                    'balance_sun': balance_sun,
+                    'unit': 'TRX'
+                },
+                'assets': {asset.get('key'): asset.get('value', 0) for asset in response.get('assetV2', [])}
+            }
+
+        response = yield ('/wallet/triggersmartcontract', 'POST', {
+            'contract_address': contract,
+            'function_selector': 'balanceOf(address)',
+            'parameter': abi.balance_of_parameter(address),
+            'owner_address': address,
+            'visible': True
+        })
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        result = abi.constant_result(response)
+        if result is None:
+            raise RuntimeError('响应数据格式异常')
+
+        balance_raw = abi.decode_uint256(result)
+        token = self.token_registry.get(contract) or {}
+        decimals = token.get('decimals')
+        return {
+            'balance': balance_raw / (10 ** decimals) if decimals is not None else None,
+            'balance_raw': balance_raw,
+            'contract': contract,
+            'symbol': token.get('symbol'),
+            'decimals': decimals
+        }
+
+    def _resolve_tokens_flow(self, contracts: List[str]) -> Flow:
+        """
+        并发获取未缓存的TRC20代币元数据
+
+        Returns:
+            dict: 合约地址 -> 元数据，获取失败的合约不在结果中
+        """
+        tokens = {}
+        missing = []
+        for contract in dict.fromkeys(contracts):
+            token = self.token_registry.get(contract)
+            if token is not None:
+                tokens[contract] = token
+            elif abi.is_address(contract):
+                missing.append(contract)
+
+        if missing:
+            outcomes = yield Parallel([self.token_registry.token_flow(contract) for contract in missing],
+                                      limit=self._config('BATCH_MAX_CONCURRENCY', 16))
+            for contract, outcome in zip(missing, outcomes):
+                if not isinstance(outcome, Exception):
+                    tokens[contract] = outcome
+        return tokens
+
+    def get_portfolio(self, addresses: List[str], tokens: List[str] = None) -> Dict:
+        """
+        组合查询多个地址的TRX余额和多个TRC20代币余额
+
+        配置了MULTICALL_CONTRACT时，每批余额通过一次Multicall合约调用读取；否则并发发送getaccount和
+        balanceOf调用。重复的地址和代币只查询一次，上游调用数只与不重复的（地址, 代币）组合有关。
+
+        Args:
+            addresses (list): TRON地址列表
+            tokens (list): TRC20合约地址列表，默认USDT
+        """
+        return self._run_flow(self._portfolio_flow(addresses, tokens))
+
+    def _portfolio_flow(self, addresses: List[str], tokens: List[str] = None) -> Flow:
+        """组合余额查询流程"""
+        if not addresses or not isinstance(addresses, list):
+            return self._error_response('地址列表不能为空')
+        tokens = tokens or [self.usdt_contract]
+        if not isinstance(tokens, list):
+            return self._error_response('代币列表格式错误')
+
+        unique_addresses = list(dict.fromkeys(a for a in addresses if a))
+        contracts = list(dict.fromkeys(t for t in tokens if t))
+        max_addresses = self._config('PORTFOLIO_MAX_ADDRESSES', 100)
+        max_tokens = self._config('PORTFOLIO_MAX_TOKENS', 20)
+        if len(unique_addresses) > max_addresses:
+            return self._error_response(f'单次最多查询{max_addresses}个地址')
+        if len(contracts) > max_tokens:
+            return self._error_response(f'单次最多查询{max_tokens}个代币')
+        for address in unique_addresses:
+            if not abi.is_address(address):
+                return self._error_response(f'地址格式错误：{address}')
+        for contract in contracts:
+            if not abi.is_address(contract):
+                return self._error_response(f'合约地址格式错误：{contract}')
 
         try:
-            # 这里应该实现实际的TRX转账逻辑
-            # 由于涉及私钥操作，这里提供模拟实现
-
-            transaction_id = f"trx_transfer_{int(time.time())}"
-
-            return self._success_response('TRX转账成功', {
-                'transaction_id': transaction_id,
-                'from_address': 'T' + key[:32],  # 模拟发送地址
-                'to_address': to,
-                'amount': amount_float,
-                'message': message,
-                'status': 'SUCCESS',
-                'block_number': 45123456  # 模拟区块号
-            })
+            token_info = yield from self._resolve_tokens_flow(contracts)
+
+            # None表示TRX余额
+            pairs = [(address, contract) for address in unique_addresses for contract in [None] + contracts]
+            multicall = self._config('MULTICALL_CONTRACT')
+            if multicall:
+                values = yield from self._multicall_balances_flow(multicall, pairs)
+                source = 'multicall'
+            else:
+                values = yield Parallel([self._direct_balance_flow(address, contract) for address, contract in pairs],
+                                        limit=self._config('BATCH_MAX_CONCURRENCY', 16))
+                source = 'direct'
         except Exception as e:
-            return self._error_response(f'TRX转账失败：{str(e)}')
+            return self._error_response(f'组合余额查询失败：{str(e)}')
+
+        balances = dict(zip(pairs, values))
+        items = []
+        for address in unique_addresses:
+            entry = {'address': address, 'trx': None, 'tokens': {}, 'errors': {}}
+            value = balances[(address, None)]
+            if isinstance(value, Exception):
+                entry['errors']['TRX'] = str(value)
+            else:
+                entry['trx'] = {'balance': value / 1_000_000, 'balance_sun': value, 'unit': 'TRX'}
+
+            for contract in contracts:
+                value = balances[(address, contract)]
+                if isinstance(value, Exception):
+                    entry['errors'][contract] = str(value)
+                    continue
+                token = token_info.get(contract) or {}
+                decimals = token.get('decimals')
+                entry['tokens'][contract] = {
+                    'symbol': token.get('symbol'),
+                    'decimals': decimals,
+                    'balance': value / (10 ** decimals) if decimals is not None else None,
+                    'balance_raw': value
+                }
+            entry['success'] = not entry['errors']
+            items.append(entry)
+
+        failed = sum(1 for item in items if not item['success'])
+        return self._success_response('组合余额查询完成', {
+            'results': items,
+            'total': len(items),
+            'succeeded': len(items) - failed,
+            'failed': failed,
+            'source': source
+        })
+
+    def _direct_balance_flow(self, address: str, contract: Optional[str]) -> Flow:
+        """单个余额（TRX为sun，代币为最小单位），失败时抛出异常"""
+        if contract is None:
+            result = yield from self._batch_task_flow(address, 'account', None)
+            return result['trx']['balance_sun']
+        result = yield from self._batch_task_flow(address, 'trc20', contract)
+        return result['balance_raw']
+
+    def _multicall_balances_flow(self, multicall: str, pairs: List[Tuple[str, Optional[str]]]) -> Flow:
+        """
+        通过Multicall合约批量读取余额
+
+        每MULTICALL_BATCH_SIZE个余额一次常量合约调用；整批调用失败时对该批改为逐个查询。
+
+        Returns:
+            list: 与pairs顺序一致的余额，失败项为异常对象
+        """
+        batch_size = max(1, self._config('MULTICALL_BATCH_SIZE', 100))
+        chunks = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+        outcomes = yield Parallel([self._multicall_chunk_flow(multicall, chunk) for chunk in chunks],
+                                  limit=self._config('BATCH_MAX_CONCURRENCY', 16))
+
+        values = []
+        fallback = []
+        for chunk, outcome in zip(chunks, outcomes):
+            if isinstance(outcome, Exception):
+                fallback.extend(range(len(values), len(values) + len(chunk)))
+                values.extend([outcome] * len(chunk))
+            else:
+                values.extend(outcome)
+
+        if fallback:
+            retried = yield Parallel([self._direct_balance_flow(*pairs[index]) for index in fallback],
+                                     limit=self._config('BATCH_MAX_CONCURRENCY', 16))
+            for index, value in zip(fallback, retried):
+                values[index] = value
+        return values
+
+    def _multicall_chunk_flow(self, multicall: str, pairs: List[Tuple[str, Optional[str]]]) -> Flow:
+        """一次Multicall tryAggregate调用，TRX余额通过getEthBalance读取"""
+        balance_of = abi.selector('balanceOf(address)')
+        get_balance = abi.selector('getEthBalance(address)')
+        calls = [(multicall, get_balance + abi.encode_address(address)) if contract is None
+                 else (contract, balance_of + abi.balance_of_parameter(address))
+                 for address, contract in pairs]
+
+        response = yield ('/wallet/triggerconstantcontract', 'POST', {
+            'contract_address': multicall,
+            'function_selector': 'tryAggregate(bool,(address,bytes)[])',
+            'parameter': abi.encode_multicall(calls),
+            'owner_address': multicall,
+            'visible': True
+        })
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        result = abi.constant_result(response)
+        if result is None:
+            raise RuntimeError('Multicall合约调用失败')
+        decoded = abi.decode_multicall(result)
+        if len(decoded) != len(calls):
+            raise RuntimeError('Multicall返回结果数量不一致')
+        return [abi.decode_uint256(data) if success and data else RuntimeError('合约调用失败')
+                for success, data in decoded]
+
+    # ==================== 转账相关方法 ====================
 
-    def send_trc20(self, to: str, amount: str, key: str) -> Dict:
+    def send_trx(self, to: str, amount: str, key: str, message: str = None, idempotency_key: str = None) -> Dict:
+        """TRX转账（启用转账队列时经由队列处理，未提供幂等键时自动生成）"""
+        if self.payout_queue:
+            return self._queued_send('trx', to, amount, key, idempotency_key, message=message)
+        return self._run_flow(self._send_single_flow('trx', to, amount, key, message=message))
+
+    def send_trc20(self, to: str, amount: str, key: str, idempotency_key: str = None) -> Dict:
         """TRC20代币转账（如USDT）"""
-        if not all([to, key]):
-            return self._error_response('参数不完整：需要接收地址和私钥')
+        if self.payout_queue:
+            return self._queued_send('trc20', to, amount, key, idempotency_key)
+        return self._run_flow(self._send_single_flow('trc20', to, amount, key))
 
+    def send_trc10(self, to: str, amount: str, key: str, token_id: str = '1002992',
+                   idempotency_key: str = None) -> Dict:
+        """TRC10代币转账"""
+        if self.payout_queue:
+            return self._queued_send('trc10', to, amount, key, idempotency_key, token_id=token_id)
+        return self._run_flow(self._send_single_flow('trc10', to, amount, key, token_id=token_id))
+
+    def send_batch(self, transfers: List[Dict], key: str = None) -> Dict:
+        """
+        批量转账：本地并行签名，通过连接池并发广播
+
+        启用转账队列时逐笔写入队列，由调度线程按发送地址和可用资源出账，这里等待处理结果。
+
+        Args:
+            transfers (list): 转账列表，元素为
+                {'type': 'trx'|'trc20'|'trc10', 'to': ..., 'amount': ..., 'key': ...,
+                 'message': ..., 'contract': ..., 'decimals': ..., 'tokenId': ...}
+            key (str): 默认发送方私钥，转账项未指定key时使用
+
+        Returns:
+            每笔转账的交易ID和广播结果，单笔失败不影响其他转账
+        """
+        if self.payout_queue:
+            return self._queued_batch(transfers, key)
+        return self._run_flow(self._send_batch_flow(transfers, key))
+
+    SEND_LABELS = {'trx': 'TRX', 'trc20': 'TRC20', 'trc10': 'TRC10'}
+
+    def _send_single_flow(self, transfer_type: str, to: str, amount: str, key: str, **extra) -> Flow:
+        """单笔转账流程，响应字段与原接口保持一致"""
+        label = self.SEND_LABELS[transfer_type]
+        if not all([to, amount, key]):
+            return self._error_response('参数不完整：需要接收地址、转账金额和私钥')
+        if not TRONPY_AVAILABLE:
+            return self._error_response(f'{label}转账失败：tronpy不可用，无法签名交易')
+
+        transfer = dict(extra, type=transfer_type, to=to, amount=amount, key=key)
         try:
-            # 这里应该实现实际的TRC20转账逻辑
-            # 由于涉及私钥操作和智能合约调用，这里提供模拟实现
+            result = (yield from self._send_transfers_flow([transfer]))[0]
+        except Exception as e:
+            return self._error_response(f'{label}转账失败：{str(e)}')
+        return self._single_send_response(transfer_type, to, amount, extra, result)
+
+    def _single_send_response(self, transfer_type: str, to: str, amount: str, extra: Dict, result: Dict) -> Dict:
+        label = self.SEND_LABELS[transfer_type]
+        data = {
+            'transaction_id': result.get('txID'),
+            'from_address': result.get('from'),
+            'to_address': to,
+            'amount': amount,
+            'status': result['status']
+        }
+        if transfer_type == 'trx':
+            data['message'] = extra.get('message')
+        elif transfer_type == 'trc20':
+            token = self.token_registry.get(self.usdt_contract) or {}
+            data.update({'contract': self.usdt_contract, 'symbol': token.get('symbol')})
+        else:
+            data['token_id'] = extra.get('token_id')
+        data.update(result.get('extra_data', {}))
+
+        if result['status'] in ('QUEUED', 'CLAIMED', 'SENDING'):
+            return self._success_response(f'{label}转账已进入队列，请稍后按幂等键查询结果', data)
+        if not result['success']:
+            return self._error_response(f'{label}转账失败：{result["error"]}', data)
+        return self._success_response(f'{label}转账成功', data)
+
+    # ==================== 转账队列 ====================
+
+    def _queued_send(self, transfer_type: str, to: str, amount: str, key: str, idempotency_key: str,
+                     **extra) -> Dict:
+        """经由转账队列发送单笔转账，等待上链结果（同一幂等键重试时返回已有结果）"""
+        label = self.SEND_LABELS[transfer_type]
+        if not all([to, amount, key]):
+            return self._error_response('参数不完整：需要接收地址、转账金额和私钥')
 
-            transaction_id = f"trc20_transfer_{int(time.time())}"
+        payout = dict(type=transfer_type, to=to, amount=amount, idempotencyKey=idempotency_key,
+                      message=extra.get('message'), tokenId=extra.get('token_id'))
+        try:
+            item = self.payout_queue.submit([payout], key)[0]
+        except ValueError as e:
+            return self._error_response(f'{label}转账失败：{str(e)}')
+        if not item['success']:
+            return self._error_response(f'{label}转账失败：{item["error"]}')
+
+        row = self.payout_queue.wait(item['id'], self._config('PAYOUT_WAIT_TIMEOUT', 10))
+        view = self.payout_queue.view(row)
+        result = {'txID': view['txID'], 'from': view['from'], 'status': view['status'],
+                  'success': view['status'] == 'SUCCESS', 'error': view['error'],
+                  'extra_data': {'payout_id': view['id'], 'idempotency_key': view['idempotencyKey'],
+                                 'duplicate': item['duplicate']}}
+        return self._single_send_response(transfer_type, to, amount, extra, result)
+
+    def _queued_batch(self, transfers: List[Dict], key: str = None) -> Dict:
+        """经由转账队列发送批量转账，按发送方私钥分组入队，在PAYOUT_WAIT_TIMEOUT内等待结果"""
+        if not transfers or not isinstance(transfers, list):
+            return self._error_response('转账列表不能为空')
+        max_transfers = self._config('SEND_BATCH_MAX', 500)
+        if len(transfers) > max_transfers:
+            return self._error_response(f'单次最多提交{max_transfers}笔转账')
+
+        results = [None] * len(transfers)
+        groups: Dict[str, List[int]] = {}
+        for index, transfer in enumerate(transfers):
+            if not isinstance(transfer, dict):
+                results[index] = {'index': index, 'success': False, 'status': 'FAILED', 'error': '转账项格式错误'}
+            elif not (transfer.get('key') or key):
+                results[index] = {'index': index, 'success': False, 'status': 'FAILED',
+                                  'error': '参数不完整：需要发送方私钥'}
+            else:
+                groups.setdefault(transfer.get('key') or key, []).append(index)
+
+        accepted = []
+        for sender_key, indexes in groups.items():
+            payouts = [{k: v for k, v in transfers[index].items() if k != 'key'} for index in indexes]
+            try:
+                items = self.payout_queue.submit(payouts, sender_key)
+            except ValueError as e:
+                items = [{'success': False, 'error': str(e)}] * len(indexes)
+            for index, item in zip(indexes, items):
+                if item['success']:
+                    accepted.append((index, item))
+                else:
+                    results[index] = {'index': index, 'success': False, 'status': 'FAILED', 'error': item['error']}
+
+        deadline = time.time() + self._config('PAYOUT_WAIT_TIMEOUT', 10)
+        for index, item in accepted:
+            view = self.payout_queue.view(self.payout_queue.wait(item['id'], max(0, deadline - time.time())))
+            results[index] = {
+                'index': index, 'type': view['type'], 'from': view['from'], 'to': view['to'],
+                'amount': view['amount'], 'txID': view['txID'], 'status': view['status'],
+                'success': view['status'] == 'SUCCESS', 'payout_id': view['id'],
+                'idempotency_key': view['idempotencyKey'], 'duplicate': item['duplicate']
+            }
+            if view['error']:
+                results[index]['error'] = view['error']
+
+        failed = sum(1 for item in results if item['status'] == 'FAILED')
+        succeeded = sum(1 for item in results if item['success'])
+        return self._success_response('批量转账完成', {
+            'results': results,
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': failed,
+            'pending': len(results) - succeeded - failed
+        })
+
+    def submit_payouts(self, payouts: List[Dict], key: str) -> Dict:
+        """
+        批量提交转账到队列，立即返回，由后台调度线程签名广播
+
+        Args:
+            payouts (list): 元素格式同批量转账，另可带 idempotencyKey（重试时传相同的值）
+            key (str): 发送方私钥（只保存在内存中）
+        """
+        if self.payout_queue is None:
+            return self._error_response('转账队列未启用')
+        if not payouts or not isinstance(payouts, list):
+            return self._error_response('转账列表不能为空')
+        max_payouts = self._config('SEND_BATCH_MAX', 500)
+        if len(payouts) > max_payouts:
+            return self._error_response(f'单次最多提交{max_payouts}笔转账')
+        if not key:
+            return self._error_response('参数不完整：需要发送方私钥')
 
-            return self._success_response('TRC20转账成功', {
-                'transaction_id': transaction_id,
-                'from_address': 'T' + key[:32],  # 模拟发送地址
-                'to_address': to,
-                'amount': amount,
-                'contract': self.usdt_contract,
-                'symbol': 'USDT',
-                'status': 'SUCCESS'
-            })
+        try:
+            items = self.payout_queue.submit(payouts, key)
+        except ValueError as e:
+            return self._error_response(str(e))
         except Exception as e:
-            return self._error_response(f'TRC20转账失败：{str(e)}')
-
-    def send_trc10(self, to: str, amount: str, key: str, token_id: str = '1002992') -> Dict:
-        """TRC10代币转账"""
-        if not all([to, key]):
-            return self._error_response('参数不完整：需要私钥和接收地址')
+            return self._error_response(f'转账入队失败：{str(e)}')
+
+        rejected = sum(1 for item in items if not item['success'])
+        return self._success_response('转账已提交', {
+            'results': items,
+            'total': len(items),
+            'accepted': len(items) - rejected,
+            'rejected': rejected
+        })
+
+    def get_payout(self, payout_id=None, idempotency_key: str = None) -> Dict:
+        """按ID或幂等键查询队列中的转账"""
+        if self.payout_queue is None:
+            return self._error_response('转账队列未启用')
+        if not payout_id and not idempotency_key:
+            return self._error_response('请提供转账ID或幂等键')
+        try:
+            row = self.payout_queue.store.get(int(payout_id) if payout_id else None, idempotency_key)
+        except ValueError:
+            return self._error_response('转账ID格式错误')
+        if row is None:
+            return self._error_response('转账不存在')
+        return self._success_response('查询成功', self.payout_queue.view(row))
+
+    def _send_batch_flow(self, transfers: List[Dict], key: str = None) -> Flow:
+        """批量转账流程"""
+        if not transfers or not isinstance(transfers, list):
+            return self._error_response('转账列表不能为空')
+        max_transfers = self._config('SEND_BATCH_MAX', 500)
+        if len(transfers) > max_transfers:
+            return self._error_response(f'单次最多提交{max_transfers}笔转账')
+        if not TRONPY_AVAILABLE:
+            return self._error_response('批量转账失败：tronpy不可用，无法签名交易')
 
         try:
-            # 这里应该实现实际的TRC10转账逻辑
-            # 由于涉及私钥操作，这里提供模拟实现
-
-            transaction_id = f"trc10_transfer_{int(time.time())}"
-
-            return self._success_response('TRC10转账成功', {
-                'transaction_id': transaction_id,
-                'from_address': 'T' + key[:32],  # 模拟发送地址
-                'to_address': to,
-                'amount': amount,
-                'token_id': token_id,
-                'status': 'SUCCESS'
-            })
+            transfers = [dict(t, key=t.get('key') or key) if isinstance(t, dict) else t for t in transfers]
+            results = yield from self._send_transfers_flow(transfers)
         except Exception as e:
-            return self._error_response(f'TRC10转账失败：{str(e)}')
+            return self._error_response(f'批量转账失败：{str(e)}')
+
+        failed = sum(1 for item in results if not item['success'])
+        return self._success_response('批量转账完成', {
+            'results': results,
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed
+        })
+
+    def _send_transfers_flow(self, transfers: List) -> Flow:
+        """
+        构建、签名并广播一组转账，返回每笔的结果
+
+        引用区块只在过期时重新获取；签名作为Offload步骤在线程池中并行执行；广播复用HTTP连接池并发发送。
+        """
+        ref_block = yield from self._ref_block_flow()
+
+        # 未指定decimals的TRC20合约先获取精度
+        yield from self._resolve_tokens_flow([
+            transfer.get('contract') or self.usdt_contract for transfer in transfers
+            if isinstance(transfer, dict) and str(transfer.get('type') or '').lower() == 'trc20'
+            and transfer.get('decimals') is None
+        ])
+
+        # 每个私钥只解析一次
+        signers = {}
+        for transfer in transfers:
+            if isinstance(transfer, dict) and transfer.get('key') and transfer['key'] not in signers:
+                try:
+                    signers[transfer['key']] = tx_builder.Signer(transfer['key'])
+                except Exception:
+                    signers[transfer['key']] = None
+
+        def prepare(item):
+            index, transfer = item
+            try:
+                return self._sign_transfer(index, transfer, signers, ref_block)
+            except ValueError as e:
+                result = {'index': index, 'success': False, 'status': 'FAILED', 'error': str(e)}
+                if isinstance(transfer, dict):
+                    result.update({'type': transfer.get('type') or 'trx', 'to': transfer.get('to'),
+                                   'amount': transfer.get('amount')})
+                return result
+
+        # 签名交给执行器：同步执行时在签名线程池中并行，异步执行时不阻塞事件循环
+        results = yield Offload(prepare, list(enumerate(transfers)))
+
+        signed = [result for result in results if result['status'] == 'SIGNED']
+        responses = yield Parallel(
+            [self._broadcast_flow(result['_hex']) for result in signed],
+            limit=self._config('BROADCAST_CONCURRENCY', 20)
+        )
+        for result, response in zip(signed, responses):
+            del result['_hex']
+            if isinstance(response, Exception):
+                response = {'error': str(response)}
+            status, error = self._broadcast_outcome(response)
+            result['status'] = status
+            result['success'] = status == 'SUCCESS'
+            if error:
+                result['error'] = error
+        return results
+
+    def _sign_transfer(self, index: int, transfer: Dict, signers: Dict, ref_block: Dict) -> Dict:
+        """构建并签名单笔转账，参数错误时抛出ValueError"""
+        if not isinstance(transfer, dict):
+            raise ValueError('转账项格式错误')
+        transfer_type = str(transfer.get('type') or 'trx').lower()
+        to, amount = transfer.get('to'), transfer.get('amount')
+        if not to or amount in (None, ''):
+            raise ValueError('参数不完整：需要接收地址和转账金额')
+        if not transfer.get('key'):
+            raise ValueError('参数不完整：需要发送方私钥')
+        signer = signers.get(transfer['key'])
+        if signer is None:
+            raise ValueError('私钥格式错误')
+        try:
+            to_bytes = tx_builder.address_bytes(to)
+        except Exception:
+            raise ValueError(f'接收地址格式错误：{to}')
+
+        fee_limit = 0
+        result = {'index': index, 'type': transfer_type, 'from': signer.address, 'to': to, 'amount': amount}
+        if transfer_type == 'trx':
+            contract = tx_builder.transfer_contract(signer.address_bytes, to_bytes, tx_builder.to_base_units(amount, 6))
+        elif transfer_type == 'trc10':
+            token_id = str(transfer.get('tokenId') or transfer.get('token_id') or '')
+            if not token_id:
+                raise ValueError('TRC10转账需要指定tokenId')
+            contract = tx_builder.transfer_asset_contract(signer.address_bytes, to_bytes,
+                                                          tx_builder.to_base_units(amount, 0), token_id)
+            result['token_id'] = token_id
+        elif transfer_type == 'trc20':
+            token = transfer.get('contract') or self.usdt_contract
+            decimals = transfer.get('decimals')
+            if decimals is None:
+                token_info = self.token_registry.get(token)
+                if token_info is None:
+                    raise ValueError(f'无法获取TRC20合约{token}的精度，请指定decimals')
+                decimals = token_info['decimals']
+            try:
+                token_bytes = tx_builder.address_bytes(token)
+            except Exception:
+                raise ValueError(f'合约地址格式错误：{token}')
+            contract = tx_builder.trc20_transfer_contract(signer.address_bytes, token_bytes, to,
+                                                          tx_builder.to_base_units(amount, int(decimals)))
+            fee_limit = self._config('TRC20_FEE_LIMIT', 100_000_000)
+            result['contract'] = token
+        else:
+            raise ValueError(f'不支持的转账类型：{transfer.get("type")}')
+
+        raw = tx_builder.build_raw(contract, ref_block, self._config('TX_EXPIRATION', 60), fee_limit,
+                                   transfer.get('message'))
+        result['txID'], result['_hex'] = signer.sign(raw)
+        result.update({'status': 'SIGNED', 'success': False})
+        return result
+
+    def _ref_block_flow(self) -> Flow:
+        """获取引用区块，在TX_REF_BLOCK_TTL内复用，不为每笔交易重新查询"""
+        ref_block = self._ref_block
+        if ref_block is None or time.time() - ref_block['fetched_at'] > self._config('TX_REF_BLOCK_TTL', 60):
+            response = yield ('/wallet/getnowblock', 'GET', None)
+            if 'error' in response:
+                raise RuntimeError(f'获取引用区块失败：{response["error"]}')
+            ref_block = tx_builder.ref_block_from(response)
+            self._ref_block = ref_block
+        return ref_block
+
+    def _broadcast_flow(self, tx_hex: str) -> Flow:
+        """广播已签名交易"""
+        response = yield ('/wallet/broadcasthex', 'POST', {'transaction': tx_hex})
+        return response
+
+    @staticmethod
+    def _broadcast_outcome(response: Dict) -> Tuple[str, Optional[str]]:
+        """
+        解析广播结果
+
+        Returns:
+            tuple: (状态, 错误信息)。网络错误时交易可能已被节点接收，状态为UNKNOWN，
+            应按交易ID查询确认，不要直接重发新交易。
+        """
+        if 'error' in response:
+            return 'UNKNOWN', response['error']
+        if response.get('result'):
+            return 'SUCCESS', None
+        code = response.get('code', '')
+        if code == 'DUP_TRANSACTION_ERROR':
+            return 'SUCCESS', None  # 重试导致的重复广播，交易已被接收
+        message = response.get('message', '')
+        try:
+            message = bytes.fromhex(message).decode('utf-8', 'replace')
+        except ValueError:
+            pass
+        return 'FAILED', f'{code}: {message}' if code else (message or '广播失败')
 
     # ==================== 交易查询相关方法 ====================
 
     def get_transaction(self, tx_id: str) -> Dict:
         """查询交易详情（通用）"""
+        return self._run_flow(self._transaction_flow(tx_id))
+
+    def _transaction_flow(self, tx_id: str) -> Flow:
+        """交易查询流程"""
         if not tx_id:
             return self._error_response('交易ID不能为空')
 
         try:
-            response = self._make_request('/wallet/gettransactionbyid', 'POST', {
+            # 优先从本地索引读取
+            indexed = self.block_store.get_transaction(tx_id) if self.block_store else None
+            if indexed is not None:
+                return self._success_response('交易查询成功', indexed)
+
+            response = yield ('/wallet/gettransactionbyid', 'POST', {
                 'value': tx_id
-            })
+            }, self.raw_passthrough)
 
-            if 'error' in response:
+            if isinstance(response, dict) and 'error' in response:
                 return self._error_response(f'交易查询失败：{response["error"]}')
 
             return self._success_response('交易查询成功', response)
@@ -456,11 +1723,20 @@ class TronAPI:
 
     def get_trc20_transaction_receipt(self, tx_id: str) -> Dict:
         """查询TRC20交易回执"""
+        return self._run_flow(self._trc20_receipt_flow(tx_id))
+
+    def _trc20_receipt_flow(self, tx_id: str) -> Flow:
+        """TRC20交易回执查询流程"""
         if not tx_id:
             return self._error_response('交易ID不能为空')
 
         try:
-            response = self._make_request('/wallet/gettransactioninfobyid', 'POST', {
+            # 优先从本地索引读取
+            indexed = self.block_store.get_transaction_info(tx_id) if self.block_store else None
+            if indexed is not None:
+                return self._success_response('TRC20交易回执查询成功', indexed)
+
+            response = yield ('/wallet/gettransactioninfobyid', 'POST', {
                 'value': tx_id
             })
 
@@ -471,45 +1747,173 @@ class TronAPI:
         except Exception as e:
             return self._error_response(f'TRC20交易回执查询失败：{str(e)}')
 
+    def get_trc20_transfers(self, address: str, since_block: str = None, cursor: str = None,
+                            limit: str = None, direction: str = None) -> Dict:
+        """
+        查询地址的USDT转入/转出记录（基于本地索引）
+
+        Args:
+            address (str): TRON地址
+            since_block (str): 起始区块号（包含），默认0
+            cursor (str): 上一页返回的next_cursor
+            limit (str): 每页条数，默认50，最大500
+            direction (str): in（转入）、out（转出），默认全部
+        """
+        if not address:
+            return self._error_response('地址不能为空')
+        if self.block_store is None:
+            return self._error_response('本地索引未启用，请设置INDEXER_ENABLED')
+
+        try:
+            since = int(since_block or 0)
+            page_size = min(max(int(limit or 50), 1), 500)
+            after = None
+            if cursor:
+                block_part, log_part = cursor.split('-', 1)
+                after = (int(block_part), int(log_part))
+        except ValueError:
+            return self._error_response('参数格式错误：sinceBlock、limit须为数字，cursor须为上一页返回值')
+
+        if direction and direction not in ('in', 'out'):
+            return self._error_response('direction只能为in或out')
+
+        try:
+            rows = self.block_store.get_address_transfers(address, since, after, direction, page_size + 1)
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+
+            transfers = []
+            for row in rows:
+                outgoing = row['direction'] in ('out', 'self')
+                amount_raw = int(row['amount'])
+                transfers.append({
+                    'tx_id': row['tx_id'],
+                    'block_number': row['block_number'],
+                    'log_index': row['log_index'],
+                    'timestamp': row['block_timestamp'],
+                    'direction': row['direction'],
+                    'from': address if outgoing else row['counterparty'],
+                    'to': row['counterparty'] if outgoing else address,
+                    'amount': amount_raw / (10 ** self.usdt_decimals),
+                    'amount_raw': amount_raw
+                })
+
+            next_cursor = f"{rows[-1]['block_number']}-{rows[-1]['log_index']}" if has_more else None
+            return self._success_response('TRC20转账记录查询成功', {
+                'address': address,
+                'contract': self.usdt_contract,
+                'symbol': (self.token_registry.get(self.usdt_contract) or {}).get('symbol'),
+                'transfers': transfers,
+                'next_cursor': next_cursor,
+                'indexed_to': int(self.block_store.get_state('last_block', '0'))
+            })
+        except Exception as e:
+            return self._error_response(f'TRC20转账记录查询失败：{str(e)}')
+
     # ==================== 区块链信息查询方法 ====================
 
-    def get_block_height(self) -> Dict:
-        """获取当前区块高度"""
+    def get_block_height(self, detail: str = None, fields: str = None) -> Dict:
+        """
+        获取当前区块高度
+
+        Args:
+            detail (str): block_info的内容：header（默认）/txids/full
+            fields (str): 返回字段（逗号分隔的点分路径），如 "block_height"
+        """
+        return self._run_flow(self._block_height_flow(detail, fields))
+
+    def _block_height_flow(self, detail: str = None, fields: str = None) -> Flow:
+        """区块高度查询流程"""
         try:
-            response = self._make_request('/wallet/getnowblock')
+            detail = block_view.parse_detail(detail, block_view.DETAIL_HEADER)
+            fields = block_view.parse_fields(fields)
+
+            # 默认只读取区块头（getblock detail=false），不下载整个区块的交易
+            response = yield from self._block_flow(None, detail)
 
             if 'error' in response:
                 return self._error_response(f'区块高度查询失败：{response["error"]}')
 
-            block_height = response.get('block_header', {}).get('raw_data', {}).get('number', 0)
-
-            return self._success_response('区块高度查询成功', {
-                'block_height': block_height,
+            return self._success_response('区块高度查询成功', block_view.project({
+                'block_height': block_view.block_number(response),
                 'block_info': response
-            })
+            }, fields))
         except Exception as e:
             return self._error_response(f'区块高度查询失败：{str(e)}')
 
-    def get_block_by_number(self, block_id: str) -> Dict:
-        """根据区块号查询区块信息"""
+    def get_block_by_number(self, block_id: str, detail: str = None, fields: str = None) -> Dict:
+        """
+        根据区块号查询区块信息
+
+        Args:
+            block_id (str): 区块号、区块哈希或latest
+            detail (str): header/txids/full（默认）
+            fields (str): 返回字段（逗号分隔的点分路径），如 "blockID,block_header.raw_data.timestamp"
+        """
+        return self._run_flow(self._block_by_number_flow(block_id, detail, fields))
+
+    def _block_by_number_flow(self, block_id: str, detail: str = None, fields: str = None) -> Flow:
+        """区块信息查询流程"""
         if not block_id:
             return self._error_response('区块号不能为空')
 
         try:
-            # 如果是数字，按区块号查询
-            if block_id.isdigit():
-                response = self._make_request('/wallet/getblockbynum', 'POST', {
-                    'num': int(block_id)
-                })
-            else:
-                # 否则按区块ID查询
-                response = self._make_request('/wallet/getblockbyid', 'POST', {
-                    'value': block_id
-                })
-
-            if 'error' in response:
+            detail = block_view.parse_detail(detail, block_view.DETAIL_FULL)
+            fields = block_view.parse_fields(fields)
+            block_id = None if block_id.lower() == 'latest' else block_id
+
+            # 优先从本地索引读取
+            if self.block_store and block_id is not None:
+                with_transactions = detail != block_view.DETAIL_HEADER
+                if block_id.isdigit():
+                    indexed = self.block_store.get_block_by_number(int(block_id), with_transactions)
+                else:
+                    indexed = self.block_store.get_block_by_id(block_id, with_transactions)
+                if indexed is not None:
+                    return self._success_response('区块信息查询成功',
+                                                  block_view.project(block_view.slim_block(indexed, detail), fields))
+
+            response = yield from self._block_flow(block_id, detail, raw=self.raw_passthrough and not fields)
+
+            if isinstance(response, dict) and 'error' in response:
                 return self._error_response(f'区块信息查询失败：{response["error"]}')
 
-            return self._success_response('区块信息查询成功', response)
+            return self._success_response('区块信息查询成功', block_view.project(response, fields))
         except Exception as e:
-            return self._error_response(f'区块信息查询失败：{str(e)}')
\ No newline at end of file
+            return self._error_response(f'区块信息查询失败：{str(e)}')
+
+    def _block_flow(self, block_id: Optional[str], detail: str, raw: bool = False) -> Flow:
+        """
+        查询区块并按detail裁剪
+
+        Args:
+            block_id (str): 区块号或区块哈希，None表示最新区块
+            detail (str): header时使用getblock(detail=false)，只下载区块头
+            raw (bool): detail为full时返回上游原始字节（RawJSON）
+        """
+        raw = raw and detail == block_view.DETAIL_FULL
+        if detail == block_view.DETAIL_HEADER:
+            request = {'detail': False}
+            if block_id is not None:
+                request['id_or_num'] = block_id
+            response = yield ('/wallet/getblock', 'POST', request)
+            if 'block_header' in response:
+                return block_view.slim_block(response, detail)
+            # 旧版本节点不支持getblock，改用完整区块接口
+
+        if block_id is None:
+            response = yield ('/wallet/getnowblock', 'GET', None, raw)
+        elif block_id.isdigit():
+            # 如果是数字，按区块号查询
+            response = yield ('/wallet/getblockbynum', 'POST', {
+                'num': int(block_id)
+            }, raw)
+        else:
+            # 否则按区块ID查询
+            response = yield ('/wallet/getblockbyid', 'POST', {
+                'value': block_id
+            }, raw)
+
+        if raw or 'error' in response:
+            return response
+        return block_view.slim_block(response, detail)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地构建和签名TRON交易
+
+按java-tron的protobuf定义直接编码 Transaction.raw，不再调用节点的
+createtransaction/triggersmartcontract 接口；交易ID为 sha256(raw)，签名后通过
+/wallet/broadcasthex 广播。
+"""
+
+import hashlib
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional, Tuple
+
+from coincurve import PrivateKey as CurvePrivateKey
+from tronpy.keys import PrivateKey
+
+from app.api import abi
+
+# Transaction.Contract.ContractType
+CONTRACT_TYPES = {
+    'TransferContract': 1,
+    'TransferAssetContract': 2,
+    'TriggerSmartContract': 31
+}
+TYPE_URL_PREFIX = 'type.googleapis.com/protocol.'
+
+
+# ==================== protobuf编码 ====================
+
+def _varint(value: int) -> bytes:
+    if value < 0:
+        value += 1 << 64  # int64负数按补码编码
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _int_field(number: int, value: int) -> bytes:
+    """varint字段，值为0时按proto3规则省略"""
+    if not value:
+        return b''
+    return _varint(number << 3) + _varint(value)
+
+
+def _bytes_field(number: int, value: bytes) -> bytes:
+    """长度前缀字段，空值省略"""
+    if not value:
+        return b''
+    return _varint((number << 3) | 2) + _varint(len(value)) + value
+
+
+# ==================== 合约参数 ====================
+
+def address_bytes(address: str) -> bytes:
+    """base58或hex地址转换为21字节地址（转换结果有缓存）"""
+    return abi.address_bytes(address)
+
+
+def transfer_contract(owner: bytes, to: bytes, amount: int) -> Tuple[str, bytes]:
+    """TRX转账（TransferContract）"""
+    return 'TransferContract', _bytes_field(1, owner) + _bytes_field(2, to) + _int_field(3, amount)
+
+
+def transfer_asset_contract(owner: bytes, to: bytes, amount: int, token_id: str) -> Tuple[str, bytes]:
+    """TRC10转账（TransferAssetContract），asset_name为代币ID"""
+    return 'TransferAssetContract', (_bytes_field(1, str(token_id).encode()) + _bytes_field(2, owner) +
+                                     _bytes_field(3, to) + _int_field(4, amount))
+
+
+def trigger_smart_contract(owner: bytes, contract: bytes, data: bytes, call_value: int = 0) -> Tuple[str, bytes]:
+    """调用智能合约（TriggerSmartContract）"""
+    return 'TriggerSmartContract', (_bytes_field(1, owner) + _bytes_field(2, contract) +
+                                    _int_field(3, call_value) + _bytes_field(4, data))
+
+
+def trc20_transfer_contract(owner: bytes, contract: bytes, to: str, amount: int) -> Tuple[str, bytes]:
+    """TRC20转账：调用合约的 transfer(address,uint256)，调用数据由abi模块编码"""
+    return trigger_smart_contract(owner, contract, abi.trc20_transfer_data(to, amount))
+
+
+# ==================== 交易构建与签名 ====================
+
+def ref_block_from(block: Dict) -> Dict:
+    """
+    从区块中提取引用区块信息
+
+    ref_block_bytes 为区块号的第6-7字节，ref_block_hash 为区块ID的第8-15字节。
+    """
+    block_id = block.get('blockID')
+    if not block_id:
+        raise ValueError('区块数据缺少blockID')
+    raw_id = bytes.fromhex(block_id)
+    return {
+        'number': block.get('block_header', {}).get('raw_data', {}).get('number', 0),
+        'ref_block_bytes': raw_id[6:8],
+        'ref_block_hash': raw_id[8:16],
+        'fetched_at': time.time()
+    }
+
+
+def build_raw(contract: Tuple[str, bytes], ref_block: Dict, expiration: int = 60, fee_limit: int = 0,
+              memo: Optional[str] = None, timestamp: Optional[int] = None) -> bytes:
+    """
+    编码 Transaction.raw
+
+    Args:
+        contract: transfer_contract等函数返回的 (合约类型, 参数编码)
+        ref_block (dict): ref_block_from的返回值
+        expiration (int): 交易有效期（秒）
+        fee_limit (int): 最大手续费（sun），仅合约调用需要
+        memo (str): 交易备注
+        timestamp (int): 交易时间戳（毫秒），默认当前时间
+    """
+    contract_type, parameter = contract
+    timestamp = timestamp or int(time.time() * 1000)
+    any_parameter = _bytes_field(1, (TYPE_URL_PREFIX + contract_type).encode()) + _bytes_field(2, parameter)
+    contract_bytes = _int_field(1, CONTRACT_TYPES[contract_type]) + _bytes_field(2, any_parameter)
+    return (_bytes_field(1, ref_block['ref_block_bytes']) +
+            _bytes_field(4, ref_block['ref_block_hash']) +
+            _int_field(8, timestamp + expiration * 1000) +
+            _bytes_field(10, memo.encode('utf-8') if memo else b'') +
+            _bytes_field(11, contract_bytes) +
+            _int_field(14, timestamp) +
+            _int_field(18, fee_limit))
+
+
+def sign_raw(raw: bytes, signer: CurvePrivateKey) -> Tuple[str, str]:
+    """
+    签名交易
+
+    Returns:
+        tuple: (交易ID, 可直接广播的交易hex)
+    """
+    tx_id = hashlib.sha256(raw).digest()
+    signature = signer.sign_recoverable(tx_id, hasher=None)
+    return tx_id.hex(), (_bytes_field(1, raw) + _bytes_field(2, signature)).hex()
+
+
+class Signer:
+    """发送方私钥，签名上下文只创建一次"""
+
+    __slots__ = ('address', 'address_bytes', '_key')
+
+    def __init__(self, private_key: str):
+        key = PrivateKey.fromhex(private_key)
+        self.address = key.public_key.to_base58check_address()
+        self.address_bytes = bytes.fromhex(key.public_key.to_hex_address())
+        self._key = CurvePrivateKey(key.to_bytes())
+
+    def sign(self, raw: bytes) -> Tuple[str, str]:
+        return sign_raw(raw, self._key)
+
+
+def to_base_units(amount, decimals: int) -> int:
+    """十进制金额转换为最小单位整数，精度超出时报错"""
+    try:
+        value = Decimal(str(amount)) * (10 ** decimals)
+    except InvalidOperation:
+        raise ValueError('转账金额格式错误')
+    if not value.is_finite():
+        raise ValueError('转账金额格式错误')
+    if value <= 0:
+        raise ValueError('转账金额必须大于0')
+    if value != value.to_integral_value():
+        raise ValueError(f'转账金额最多{decimals}位小数')
+    return int(value)
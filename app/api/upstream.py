@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多节点上游路由
+
+维护一组全节点地址（TronGrid、自建java-tron节点等），按EWMA延迟和在途请求数选择节点；
+请求失败（被动检查）和后台探测（主动检查）共同决定节点健康状态，连续失败的节点熔断一段时间后
+再放行一个试探请求。只读请求可以在等待超过近期P95延迟后向另一个节点发出对冲请求，取先返回的结果。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 不做对冲和故障转移的接口（广播交易只发送一次）
+NON_IDEMPOTENT_ENDPOINTS = frozenset([
+    '/wallet/broadcasthex',
+    '/wallet/broadcasttransaction'
+])
+
+
+class Endpoint:
+    """单个上游节点的状态"""
+
+    def __init__(self, url: str, name: str = None):
+        self.url = url.rstrip('/')
+        self.name = name or self.url
+        self.ewma = None  # 平滑后的响应时间（秒）
+        self.samples = deque(maxlen=200)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False  # 半开状态下是否已放行试探请求
+        self.head_block = 0
+        self.last_error = None
+
+    def snapshot(self) -> Dict:
+        return {
+            'url': self.url,
+            'state': self.state,
+            'ewma_ms': round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            'p95_ms': round(sorted(self.samples)[int(len(self.samples) * 0.95)] * 1000, 1) if self.samples else None,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'head_block': self.head_block or None,
+            'last_error': self.last_error
+        }
+
+
+class UpstreamRouter:
+    """节点选择、健康检查和熔断，线程安全"""
+
+    def __init__(self, urls: Iterable[str], failure_threshold: int = 5, open_seconds: float = 30,
+                 ewma_alpha: float = 0.3, max_lag: int = 20, hedge_enabled: bool = True,
+                 hedge_min_delay: float = 0.05, hedge_max_delay: float = 2.0):
+        """
+        Args:
+            urls: 节点地址列表，第一个为首选节点
+            failure_threshold (int): 连续失败多少次后熔断
+            open_seconds (float): 熔断持续时间（秒），之后放行一个试探请求
+            ewma_alpha (float): 延迟平滑系数
+            max_lag (int): 落后最高区块超过该数量的节点不参与选择（由主动检查更新）
+            hedge_enabled (bool): 是否对只读请求发送对冲请求
+            hedge_min_delay (float): 对冲等待下限（秒）
+            hedge_max_delay (float): 对冲等待上限（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.ewma_alpha = ewma_alpha
+        self.max_lag = max_lag
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=500)
+        self._p95 = None
+        self._since_p95 = 0  # 上次计算P95之后的新样本数
+        self._stop = threading.Event()
+        self._thread = None
+        self.endpoints: List[Endpoint] = []
+        self.set_urls(urls)
+
+    def set_urls(self, urls: Iterable[str]):
+        """替换节点列表（统计数据重置）"""
+        endpoints = [Endpoint(url) for url in dict.fromkeys(u.strip() for u in urls if u and u.strip())]
+        if not endpoints:
+            raise ValueError('至少需要配置一个上游节点')
+        with self._lock:
+            self.endpoints = endpoints
+            self._latencies.clear()
+            self._p95 = None
+
+    @property
+    def primary_url(self) -> str:
+        return self.endpoints[0].url
+
+    # ==================== 节点选择 ====================
+
+    def _available(self, endpoint: Endpoint, now: float, best_head: int) -> bool:
+        if endpoint.state == OPEN:
+            if now - endpoint.opened_at < self.open_seconds:
+                return False
+            endpoint.state = HALF_OPEN
+            endpoint.probing = False
+        if endpoint.state == HALF_OPEN and endpoint.probing:
+            return False
+        if best_head and endpoint.head_block and best_head - endpoint.head_block > self.max_lag:
+            return False
+        return True
+
+    def select(self, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        选择一个节点并登记在途请求
+
+        得分为EWMA延迟 ×（在途请求数 + 1），未测量过的节点优先；首选节点在得分相同时优先。
+        所有节点都不可用时返回熔断最早结束的节点，避免完全无法请求。
+        """
+        excluded = set(id(endpoint) for endpoint in exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if id(endpoint) not in excluded]
+            if not candidates:
+                return None
+            best_head = max(endpoint.head_block for endpoint in self.endpoints)
+            available = [endpoint for endpoint in candidates if self._available(endpoint, now, best_head)]
+            if available:
+                chosen = min(available, key=lambda e: ((e.ewma or 0.0) * (e.in_flight + 1),
+                                                       self.endpoints.index(e)))
+            else:
+                chosen = min(candidates, key=lambda e: e.opened_at)
+            if chosen.state == HALF_OPEN:
+                chosen.probing = True
+            chosen.in_flight += 1
+            chosen.requests += 1
+            return chosen
+
+    def acquire(self, endpoint: Endpoint):
+        """为指定节点登记在途请求（在select选中的节点上继续发送请求时使用）"""
+        with self._lock:
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+
+    def release(self, endpoint: Endpoint, latency: float, ok: Optional[bool], error: str = None):
+        """请求结束，更新延迟和健康状态（被动检查），ok为None表示请求被取消，不计入统计"""
+        with self._lock:
+            endpoint.in_flight = max(0, endpoint.in_flight - 1)
+            if ok is None:
+                if endpoint.state == HALF_OPEN:
+                    endpoint.probing = False
+                return
+            self._record(endpoint, latency, ok, error)
+
+    def _record(self, endpoint: Endpoint, latency: float, ok: bool, error: str = None):
+        if ok:
+            endpoint.ewma = latency if endpoint.ewma is None else (
+                self.ewma_alpha * latency + (1 - self.ewma_alpha) * endpoint.ewma)
+            endpoint.samples.append(latency)
+            self._latencies.append(latency)
+            self._since_p95 += 1
+            endpoint.consecutive_failures = 0
+            endpoint.state = CLOSED
+            endpoint.probing = False
+            endpoint.last_error = None
+            return
+
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        endpoint.last_error = error
+        if endpoint.state == HALF_OPEN or endpoint.consecutive_failures >= self.failure_threshold:
+            endpoint.state = OPEN
+            endpoint.opened_at = time.monotonic()
+            endpoint.probing = False
+
+    def hedge_delay(self) -> float:
+        """对冲等待时间：近期成功请求延迟的P95，限制在上下限之间"""
+        with self._lock:
+            if len(self._latencies) < 20:
+                return self.hedge_max_delay
+            # 每积累20个新样本重新计算一次
+            if self._p95 is None or self._since_p95 >= 20:
+                samples = sorted(self._latencies)
+                self._p95 = samples[int(len(samples) * 0.95)]
+                self._since_p95 = 0
+            p95 = self._p95
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95))
+
+    def can_hedge(self, endpoint: str) -> bool:
+        return self.hedge_enabled and len(self.endpoints) > 1 and endpoint not in NON_IDEMPOTENT_ENDPOINTS
+
+    def can_failover(self, endpoint: str) -> bool:
+        return len(self.endpoints) > 1 and endpoint not in NON_IDEMPOTENT_ENDPOINTS
+
+    def note_hedge(self, won: bool):
+        with self._lock:
+            self.hedged += 1
+            if won:
+                self.hedge_wins += 1
+
+    def note_failover(self):
+        with self._lock:
+            self.failovers += 1
+
+    # ==================== 主动健康检查 ====================
+
+    def check_once(self, probe: Callable[[str], Tuple[Optional[bool], int, Optional[str]]]):
+        """
+        探测所有节点
+
+        Args:
+            probe: probe(url) -> (是否成功, 最新区块号, 错误信息)，是否成功为None表示本轮跳过
+        """
+        for endpoint in list(self.endpoints):
+            started = time.monotonic()
+            try:
+                ok, head, error = probe(endpoint.url)
+            except Exception as e:
+                ok, head, error = False, 0, str(e)
+            if ok is None:
+                continue
+            latency = time.monotonic() - started
+            with self._lock:
+                if ok:
+                    endpoint.head_block = head
+                # 熔断期间探测成功可以提前恢复
+                self._record(endpoint, latency, ok, error)
+
+    def start_health_checks(self, probe: Callable[[str], Tuple[Optional[bool], int, Optional[str]]],
+                            interval: float = 10):
+        """启动后台主动探测线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.check_once(probe)
+
+        self._thread = threading.Thread(target=run, name='tron-upstream-health', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            endpoints = [endpoint.snapshot() for endpoint in self.endpoints]
+            hedged, wins, failovers = self.hedged, self.hedge_wins, self.failovers
+        return {
+            'endpoints': endpoints,
+            'hedge_delay_ms': round(self.hedge_delay() * 1000, 1),
+            'hedged': hedged,
+            'hedge_wins': wins,
+            'failovers': failovers
+        }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+进程内缓存模块
+
+提供带TTL过期和LRU淘汰的内存缓存，容量同时受条目数和字节数限制。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+# 永久缓存（仅受LRU淘汰影响）
+FOREVER = float('inf')
+
+_MISSING = object()
+
+
+class CacheBackend:
+    """缓存后端接口，自定义后端需实现以下方法"""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, ttl: float, size: int = 0):
+        raise NotImplementedError
+
+    def delete(self, key: Hashable):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class LRUTTLCache(CacheBackend):
+    """线程安全的TTL + LRU缓存"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            max_entries (int): 最大条目数
+            max_bytes (int): 最大占用字节数（按写入时提供的size估算）
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，过期条目视为未命中"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float, size: int = 0):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl (float): 存活秒数，FOREVER表示永不过期，<=0表示不缓存
+            size (int): 条目大小（字节），用于内存上限控制
+        """
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中率等统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
+
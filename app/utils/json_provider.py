@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON序列化
+
+安装了orjson时使用orjson编码/解码，否则回落到标准库json。RawJSON包装上游返回的原始字节，
+序列化响应时直接拼接到 {code,msg,data,time} 结构中，不经过解析再编码。
+"""
+
+import json
+import os
+import re
+from typing import Any, Callable, List, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils import tracing
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+class RawJSON:
+    """已编码的JSON片段（如上游响应原文），序列化时原样输出"""
+
+    __slots__ = ('data', '_parsed')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._parsed = None
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def parsed(self) -> Any:
+        """解析后的对象（首次调用时解析），用于需要读取内容的场景，如计算缓存时长"""
+        if self._parsed is None:
+            self._parsed = loads(self.data)
+        return self._parsed
+
+    def is_empty(self) -> bool:
+        """上游返回空对象（如交易不存在）"""
+        return self.data.strip() in (b'', b'{}', b'null')
+
+
+def loads(data: Any) -> Any:
+    """解析JSON（bytes或str）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False,
+          default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    编码为UTF-8 JSON字节，中文不转义
+
+    Args:
+        obj: 要编码的对象，可以包含RawJSON
+        indent (bool): 是否缩进（2空格）
+        sort_keys (bool): 是否按键排序
+        default: 不支持的类型的转换函数
+    """
+    raws: List[bytes] = []
+    nonce = []
+
+    def fallback(value: Any) -> Any:
+        if isinstance(value, RawJSON):
+            # 先输出占位字符串，编码后替换为原始字节；随机标记防止数据中的字符串被误替换
+            if not nonce:
+                nonce.append(os.urandom(8).hex())
+            raws.append(value.data)
+            return f'\x00{nonce[0]}:{len(raws) - 1}\x00'
+        if default is not None:
+            return default(value)
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+    encoded = None
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            encoded = orjson.dumps(obj, default=fallback, option=option)
+        except orjson.JSONEncodeError:
+            # orjson不支持超过64位的整数（如uint256余额），改用标准库
+            raws.clear()
+    if encoded is None:
+        encoded = json.dumps(obj, default=fallback, ensure_ascii=False, sort_keys=sort_keys,
+                             indent=2 if indent else None,
+                             separators=None if indent else (',', ':')).encode('utf-8')
+
+    if raws:
+        pattern = re.compile(rb'"\\u0000' + nonce[0].encode() + rb':(\d+)\\u0000"')
+        encoded = pattern.sub(lambda match: raws[int(match.group(1))], encoded)
+    return encoded
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON提供者：orjson编码、中文不转义、支持RawJSON"""
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, indent=bool(kwargs.get('indent')), sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                     default=kwargs.get('default', self.default)).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """直接输出字节，省去str编码一次"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        with tracing.tracer.span('json.encode') as span:
+            body = dumps(obj, indent=indent, sort_keys=self.sort_keys, default=self.default) + b'\n'
+            span.set_attribute('json.bytes', len(body))
+        return self._app.response_class(body, mimetype=self.mimetype)
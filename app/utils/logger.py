@@ -3,92 +3,289 @@
 
 """
 日志工具模块
+
+异步模式下请求线程只把日志记录放入有界队列，由后台线程格式化并写入文件和控制台，
+磁盘卡顿不会增加请求延迟；队列满时丢弃日志而不是阻塞请求。
+JSON模式下每条日志输出一行JSON，key、privateKey等敏感参数在写出前脱敏。
 """
 
 import os
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
 
-def setup_logger(name='tron_api', level=logging.INFO):
+from app.utils import tracing
+from config.config import Config
+
+# 日志中需要脱敏的参数名（不区分大小写）
+REDACT_KEYS = frozenset(['key', 'privatekey', 'private_key', 'mnemonic', 'seed', 'secret', 'password',
+                         'tron-pro-api-key'])
+REDACTED = '***'
+
+_listeners = []
+_queue_handlers = []
+
+
+def redact(value, keys=REDACT_KEYS):
+    """
+    递归脱敏字典/列表中的敏感字段，返回新对象
+
+    Args:
+        value: 要脱敏的数据
+        keys: 需要脱敏的字段名（小写）
+    """
+    if isinstance(value, dict):
+        return {k: (REDACTED if str(k).lower() in keys else redact(v, keys)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item, keys) for item in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行JSON，extra={'fields': {...}} 中的结构化字段合并到顶层"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(redact(fields))
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，结构化字段脱敏后附加在消息后"""
+
+    def format(self, record):
+        message = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message = f"{message} {json.dumps(redact(fields), ensure_ascii=False, default=str)}"
+        return message
+
+
+class SamplingFilter(logging.Filter):
+    """按比例采样INFO及以下级别的日志，WARNING及以上全部保留"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.INFO or self.rate >= 1 or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    只入队不格式化的QueueHandler
+
+    标准QueueHandler在入队前调用format()，格式化开销仍在请求线程上；
+    这里原样入队，由后台线程格式化。队列满时丢弃并计数。
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logger(name='tron_api', level=logging.INFO, async_mode=True, json_format=True,
+                 sample_rate=1.0, queue_size=10000, log_dir='logs'):
     """
     设置日志记录器
-    
+
     Args:
         name (str): 日志记录器名称
         level: 日志级别
-    
+        async_mode (bool): 是否由后台线程写日志（请求线程只入队）
+        json_format (bool): 是否输出JSON行
+        sample_rate (float): INFO及以下级别日志的采样比例（0~1）
+        queue_size (int): 异步队列长度，队列满时丢弃日志
+        log_dir (str): 日志目录
+
     Returns:
         logging.Logger: 配置好的日志记录器
     """
-    
+
     # 创建日志目录
-    log_dir = 'logs'
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    
+
     # 创建日志记录器
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
+    logger.propagate = False
+
     # 避免重复添加处理器
     if logger.handlers:
         return logger
-    
+
     # 创建格式化器
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
     # 创建文件处理器（轮转日志）
     log_file = os.path.join(log_dir, f'{name}.log')
     file_handler = RotatingFileHandler(
-        log_file, 
+        log_file,
         maxBytes=10*1024*1024,  # 10MB
         backupCount=5,
         encoding='utf-8'
     )
     file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
-    
+
     # 创建控制台处理器
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    
-    # 添加处理器到日志记录器
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    if async_mode:
+        # 请求线程只入队，后台线程格式化并写出
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        _queue_handlers.append(queue_handler)
+        listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        handlers = [queue_handler]
+    else:
+        handlers = [file_handler, console_handler]
+
+    # 采样在入队前进行，被丢弃的日志不占用队列
+    for handler in handlers:
+        if sample_rate < 1:
+            handler.addFilter(SamplingFilter(sample_rate))
+        logger.addHandler(handler)
+
     return logger
 
-def log_api_request(logger, method, endpoint, params=None, response_code=None, error=None):
+
+def shutdown_logging():
+    """停止后台写日志线程，写出队列中剩余的日志"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def _restart_listeners():
+    """fork出的子进程中没有父进程的写日志线程，重新启动"""
+    for listener in _listeners:
+        listener._thread = None
+        listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listeners)
+
+
+def dropped_logs():
+    """异步队列满时丢弃的日志条数"""
+    return sum(handler.dropped for handler in _queue_handlers)
+
+
+def log_api_request(logger, method, endpoint, params=None, response_code=None, error=None, duration=None):
     """
     记录API请求日志
-    
+
     Args:
         logger: 日志记录器
         method (str): HTTP方法
         endpoint (str): API端点
-        params (dict): 请求参数
+        params (dict): 请求参数（key、privateKey等字段在写出时脱敏）
         response_code (int): 响应状态码
         error (str): 错误信息
+        duration (float): 处理耗时（秒）
     """
-    
-    log_data = {
+
+    level = logging.ERROR if error else logging.INFO
+    # 级别未启用时不构造日志内容
+    if not logger.isEnabledFor(level):
+        return
+
+    fields = {
         'method': method,
         'endpoint': endpoint,
         'params': params or {},
-        'response_code': response_code,
-        'timestamp': datetime.now().isoformat()
+        'response_code': response_code
     }
-    
+    if duration is not None:
+        fields['duration_ms'] = round(duration * 1000, 2)
+    span = tracing.current_span()
+    if span.recording:
+        fields['trace_id'] = span.context.trace_id
+
     if error:
-        log_data['error'] = error
-        logger.error(f"API请求失败: {log_data}")
+        fields['error'] = error
+        logger.error('API请求失败', extra={'fields': fields})
     else:
-        logger.info(f"API请求: {log_data}")
+        logger.info('API请求', extra={'fields': fields})
+
+
+def log_requests(app, logger):
+    """
+    为Flask应用记录每个请求的访问日志
+
+    Args:
+        app: Flask应用
+        logger: 日志记录器
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _log_start():
+        g._log_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        started = g.pop('_log_started', None)
+        if logger.isEnabledFor(logging.INFO):
+            params = request.args.to_dict()
+            if request.form:
+                params.update(request.form.to_dict())
+            payload = request.get_json(silent=True) if request.is_json else None
+            if isinstance(payload, dict):
+                params.update(payload)
+            log_api_request(logger, request.method, request.path, params, response.status_code,
+                            duration=time.perf_counter() - started if started is not None else None)
+        return response
+
+    @app.teardown_request
+    def _log_exception(error=None):
+        if error is not None:
+            log_api_request(logger, request.method, request.path, request.args.to_dict(), 500, error=repr(error))
+
 
 # 创建默认日志记录器
-default_logger = setup_logger()
\ No newline at end of file
+default_logger = setup_logger(
+    level=logging.getLevelName(Config.LOG_LEVEL),
+    async_mode=Config.LOG_ASYNC,
+    json_format=Config.LOG_JSON,
+    sample_rate=Config.LOG_SAMPLE_RATE,
+    queue_size=Config.LOG_QUEUE_SIZE,
+    log_dir=Config.LOG_DIR
+)
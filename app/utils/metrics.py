@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prometheus指标
+
+进程内的计数器、仪表盘和直方图，按Prometheus文本格式（0.0.4）输出，供 /metrics 接口抓取。
+缓存、连接池等已有统计的组件通过collector在抓取时读取，不重复计数。
+多进程部署时每个进程单独计数，由Prometheus按实例聚合。
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# collector返回的指标族：(名称, 类型, 说明, [(标签, 值), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value is None:
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name}需要标签{self.labelnames}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f'{self.name}{_format_labels(self._labels(key))} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的仪表盘"""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各分桶计数..., 总数, 总和]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += 1
+            state[-1] += value
+
+    def time(self, **labels) -> '_Timer':
+        """with histogram.time(...): 记录代码块耗时"""
+        return _Timer(self, labels)
+
+    def _render_sample(self, key, value) -> List[str]:
+        labels = self._labels(key)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels(dict(labels, le=_format_value(bound)))} {cumulative}')
+        lines.append(f'{self.name}_bucket{_format_labels(dict(labels, le="+Inf"))} {value[-2]}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {value[-2]}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Family]]] = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'指标{name}已以不同的类型或标签注册')
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[Family]]):
+        """
+        注册抓取时调用的collector，同名collector会被替换
+
+        collector返回 (名称, 类型, 说明, [(标签, 值), ...]) 列表
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self) -> str:
+        """输出Prometheus文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                lines.append(f'# collector error: {_escape(e)}')
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# 进程内默认注册表
+registry = MetricsRegistry()
+
+
+def stats_family(name: str, metric_type: str, documentation: str, value: Optional[float],
+                 labels: Optional[Dict[str, str]] = None) -> Family:
+    """单个样本的指标族"""
+    return name, metric_type, documentation, [(labels or {}, value)]
+
+
+def instrument_flask(app, registry: MetricsRegistry = registry):
+    """
+    记录Flask路由的请求数、耗时和在途请求数
+
+    路由标签使用URL规则（如 /v1/getBalance），未匹配的路径统一记为 unmatched，避免标签数量无限增长。
+    ASGI入口复用Flask的请求钩子，同样会被记录。
+    """
+    from flask import g, request
+
+    requests_total = registry.counter('tron_http_requests_total', 'HTTP请求数', ('route', 'method', 'status'))
+    latency = registry.histogram('tron_http_request_duration_seconds', 'HTTP请求处理耗时（秒）', ('route', 'method'))
+    in_flight = registry.gauge('tron_http_requests_in_flight', '正在处理的HTTP请求数')
+    exceptions = registry.counter('tron_http_exceptions_total', '路由未处理的异常数', ('route', 'type'))
+
+    def route_label() -> str:
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_started = time.perf_counter()
+        in_flight.inc()
+
+    @app.after_request
+    def _metrics_record(response):
+        started = g.get('_metrics_started')
+        if started is not None:
+            route = route_label()
+            latency.observe(time.perf_counter() - started, route=route, method=request.method)
+            requests_total.inc(route=route, method=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(error=None):
+        if g.pop('_metrics_started', None) is not None:
+            in_flight.dec()
+        if error is not None:
+            exceptions.inc(route=route_label(), type=type(error).__name__)
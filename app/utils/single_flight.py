@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+请求合并（single-flight）
+
+相同键的并发调用只执行一次，其余调用等待并共享同一个结果。用于新区块产生后大量客户端
+同时查询最新区块、热门地址时，把多个相同的上游请求合并为一个。
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """进行中的调用"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stats:
+    """合并统计"""
+
+    def __init__(self):
+        self.calls = 0  # 实际执行的调用数
+        self.coalesced = 0  # 被合并（共享结果）的调用数
+
+    def snapshot(self, in_flight: int) -> Dict[str, Any]:
+        total = self.calls + self.coalesced
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'in_flight': in_flight,
+            'coalesce_ratio': round(self.coalesced / total, 4) if total else 0.0
+        }
+
+
+class SingleFlight:
+    """线程版请求合并"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = _Stats()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行调用，相同键已有调用在进行时等待其结果
+
+        Returns:
+            tuple: (结果, 是否为共享结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._stats.snapshot(len(self._calls))
+
+
+class AsyncSingleFlight:
+    """协程版请求合并，只能在同一个事件循环中使用"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._stats = _Stats()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        执行调用，相同键已有调用在进行时等待其结果
+
+        共享的调用在独立任务中执行，某个等待方被取消不会影响其他等待方。
+
+        Returns:
+            tuple: (结果, 是否为共享结果)
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self._stats.coalesced += 1
+        else:
+            self._stats.calls += 1
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _, key=key, task=task: self._forget(key, task))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # 所有等待方都已取消时避免"exception was never retrieved"警告
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._stats.snapshot(len(self._calls))
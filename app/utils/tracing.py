@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+链路追踪
+
+兼容OpenTelemetry数据模型的轻量实现：span记录trace_id/span_id/父span、属性和状态，
+当前span保存在contextvars中，跨线程池时需用bind()带上上下文；请求头中的W3C traceparent
+作为父上下文，发往上游的请求同样携带traceparent。
+结束的span交给可替换的导出器（内存、JSON行文件或自定义类），未启用时所有调用都是空操作。
+"""
+
+import contextvars
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+# W3C traceparent: 版本-trace_id-span_id-标志
+_TRACEPARENT = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_INVALID_TRACE_ID = '0' * 32
+_INVALID_SPAN_ID = '0' * 16
+
+_current_span = contextvars.ContextVar('tron_current_span', default=None)
+
+
+class SpanContext:
+    """跨进程传递的span标识"""
+
+    __slots__ = ('trace_id', 'span_id', 'sampled')
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """解析traceparent请求头，格式不合法时返回None"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None or match.group(1) == 'ff':
+        return None
+    trace_id, span_id = match.group(2), match.group(3)
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(match.group(4), 16) & 1))
+
+
+class Span:
+    """一次操作的耗时记录"""
+
+    def __init__(self, tracer: 'Tracer', name: str, context: SpanContext, parent_id: Optional[str],
+                 kind: str, attributes: Optional[Dict[str, Any]]):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = 'UNSET'
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._token = None
+
+    @property
+    def recording(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def set_status(self, status: str, message: Optional[str] = None):
+        """status为 OK 或 ERROR"""
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, error: BaseException):
+        self.set_status('ERROR', f'{type(error).__name__}: {error}')
+        self.attributes['exception.type'] = type(error).__name__
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.recording:
+            self.tracer._export(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'trace_id': self.context.trace_id,
+            'span_id': self.context.span_id,
+            'parent_span_id': self.parent_id,
+            'kind': self.kind,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            'attributes': self.attributes,
+            'status': {'code': self.status, 'message': self.status_message}
+        }
+
+    def __enter__(self) -> 'Span':
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        _current_span.reset(self._token)
+        self.end()
+
+
+class _NoopSpan:
+    """未启用追踪时返回的空span"""
+
+    recording = False
+    context = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def set_status(self, status: str, message: Optional[str] = None):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemoryExporter:
+    """保存在内存中（最多max_spans条），用于测试和调试"""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans = deque(maxlen=max_spans)
+
+    def export(self, spans: List[Span]):
+        self._spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        return list(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+
+    def shutdown(self):
+        pass
+
+
+class FileExporter:
+    """每个span写一行JSON"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def export(self, spans: List[Span]):
+        lines = ''.join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n' for span in spans)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+
+class ConsoleExporter:
+    """输出到标准错误，本地排查用"""
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            sys.stderr.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n')
+
+    def shutdown(self):
+        pass
+
+
+def create_exporter(name: str, path: Optional[str] = None):
+    """
+    按名称创建导出器
+
+    Args:
+        name (str): memory、file、console，或 "模块:类名" 形式的自定义导出器（需实现export(spans)）
+        path (str): file导出器的文件路径
+    """
+    if name == 'memory':
+        return InMemoryExporter()
+    if name == 'file':
+        return FileExporter(path or 'logs/traces.jsonl')
+    if name == 'console':
+        return ConsoleExporter()
+    if ':' in name:
+        module, attr = name.split(':', 1)
+        return getattr(importlib.import_module(module), attr)()
+    raise ValueError(f'不支持的追踪导出器: {name}')
+
+
+class Tracer:
+    """创建span并交给导出器"""
+
+    def __init__(self, exporter=None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: str = 'internal',
+                   parent: Optional[SpanContext] = None):
+        """
+        创建span（不设为当前span），需调用end()结束
+
+        Args:
+            parent: 父上下文，默认使用当前span；远程调用方的上下文由extract()得到
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        if parent is not None:
+            context = SpanContext(parent.trace_id, _random_id(8), parent.sampled)
+            parent_id = parent.span_id
+        else:
+            sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+            context = SpanContext(_random_id(16), _random_id(8), sampled)
+            parent_id = None
+        return Span(self, name, context, parent_id, kind, attributes)
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: str = 'internal',
+             parent: Optional[SpanContext] = None):
+        """with tracer.span(...) as span: 创建span并在代码块内设为当前span"""
+        return self.start_span(name, attributes, kind, parent)
+
+    def _export(self, span: Span):
+        exporter = self.exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export([span])
+        except Exception as e:
+            sys.stderr.write(f'追踪数据导出失败: {e}\n')
+
+
+def _random_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+# 进程内默认追踪器，configure()之前不记录任何span
+tracer = Tracer()
+
+
+def configure(exporter=None, sample_rate: float = 1.0) -> Tracer:
+    """设置默认追踪器的导出器（None表示关闭）和根span采样比例"""
+    previous = tracer.exporter
+    tracer.exporter = exporter
+    tracer.sample_rate = sample_rate
+    if previous is not None and previous is not exporter:
+        previous.shutdown()
+    return tracer
+
+
+def current_span():
+    """当前span，没有时返回空span"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def extract(headers) -> Optional[SpanContext]:
+    """从请求头读取调用方的trace上下文"""
+    return parse_traceparent(headers.get('traceparent'))
+
+
+def inject(headers: Dict[str, str], span=None):
+    """把span（默认当前span）的上下文写入traceparent请求头"""
+    span = span or _current_span.get()
+    if span is not None and span.context is not None:
+        headers['traceparent'] = span.context.to_traceparent()
+
+
+def bind(fn: Callable) -> Callable:
+    """让提交到线程池的函数继承当前trace上下文（每次提交单独调用）"""
+    if tracer.exporter is None or _current_span.get() is None:
+        return fn
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def instrument_flask(app, tracer: Tracer = tracer):
+    """
+    为每个Flask路由创建服务端span，请求头中的traceparent作为父上下文
+
+    span名为 "方法 URL规则"，响应头X-Trace-Id返回trace_id便于排查。
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _trace_start():
+        if not tracer.enabled:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        span = tracer.start_span(f'{request.method} {route}', {
+            'http.method': request.method,
+            'http.route': route,
+            'http.target': request.full_path.rstrip('?')
+        }, kind='server', parent=extract(request.headers))
+        g._trace_span = span
+        g._trace_token = _current_span.set(span)
+
+    @app.after_request
+    def _trace_response(response):
+        span = g.get('_trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                span.set_status('ERROR')
+            response.headers['X-Trace-Id'] = span.context.trace_id
+        return response
+
+    @app.teardown_request
+    def _trace_finish(error=None):
+        span = g.pop('_trace_span', None)
+        if span is None:
+            return
+        if error is not None:
+            span.record_exception(error)
+        token = g.pop('_trace_token', None)
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # 请求钩子在不同上下文中执行（如ASGI入口），只结束span
+                pass
+        span.end()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+工作进程统计
+
+多进程部署时记录每个工作进程的在途请求数、请求数和线程利用率（忙碌线程数按时间积分 / 线程数），
+定期写入共享目录中的 {pid}.json，任一进程处理 /v1/status 或 /metrics 时读取全部工作进程的状态。
+另提供基于文件锁的单实例任务选主，保证只有一个工作进程运行本地区块索引等后台任务。
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows下没有fcntl，单实例任务直接在当前进程运行
+    FCNTL_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class WorkerStats:
+    """当前进程的请求处理统计"""
+
+    def __init__(self, threads: int = 1):
+        """
+        Args:
+            threads (int): 每个工作进程的请求处理线程数，用于计算利用率
+        """
+        self.threads = max(1, threads)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """fork后在工作进程中重新计数"""
+        with self._lock:
+            now = time.monotonic()
+            self.pid = os.getpid()
+            self.started = time.time()
+            self.in_flight = 0
+            self.requests = 0
+            self.busy_seconds = 0.0
+            self._changed_at = now
+            self._window_at = now
+            self._window_busy = 0.0
+            self.utilization = 0.0
+
+    def _advance(self, now: float):
+        self.busy_seconds += self.in_flight * (now - self._changed_at)
+        self._changed_at = now
+
+    def begin(self):
+        with self._lock:
+            self._advance(time.monotonic())
+            self.in_flight += 1
+
+    def end(self):
+        with self._lock:
+            self._advance(time.monotonic())
+            self.in_flight -= 1
+            self.requests += 1
+
+    def snapshot(self) -> Dict:
+        """
+        返回统计快照
+
+        utilization为上次快照以来忙碌线程数的时间平均值除以线程数，1表示所有线程一直在处理请求。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+            elapsed = now - self._window_at
+            if elapsed > 0:
+                self.utilization = (self.busy_seconds - self._window_busy) / (elapsed * self.threads)
+                self._window_at = now
+                self._window_busy = self.busy_seconds
+            return {
+                'pid': self.pid,
+                'started': int(self.started),
+                'threads': self.threads,
+                'in_flight': self.in_flight,
+                'requests': self.requests,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'utilization': round(min(1.0, self.utilization), 4),
+                'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+                'updated': int(time.time())
+            }
+
+
+class StatsPublisher:
+    """定期把当前进程的统计写入共享目录"""
+
+    def __init__(self, stats: WorkerStats, directory: str, interval: float = 5):
+        self.stats = stats
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='tron-worker-stats', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self.publish()
+            if self._stop.wait(self.interval):
+                break
+
+    def publish(self):
+        # 先写临时文件再改名，读取方不会读到写了一半的文件
+        temp = f'{self.path}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.stats.snapshot(), f)
+        os.replace(temp, self.path)
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        remove_worker_stats(self.directory, os.getpid())
+
+
+def remove_worker_stats(directory: str, pid: int):
+    """删除已退出工作进程的统计文件"""
+    try:
+        os.remove(os.path.join(directory, f'{pid}.json'))
+    except OSError:
+        pass
+
+
+def collect_worker_stats(directory: Optional[str], max_age: float = 30) -> List[Dict]:
+    """读取全部工作进程的统计，忽略已退出或超过max_age秒未更新的进程"""
+    if not directory or not os.path.isdir(directory):
+        return []
+    now = time.time()
+    workers = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - data.get('updated', 0) > max_age or not _pid_alive(data.get('pid')):
+            continue
+        workers.append(data)
+    return sorted(workers, key=lambda item: item['pid'])
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LeaderLock:
+    """
+    基于文件锁的单实例任务选主
+
+    多个工作进程中只有持有锁的进程运行任务；持有者退出后锁自动释放，
+    其他进程的后台线程随即获得锁并接手（平滑重启时新进程等待旧进程退出后接手）。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._thread = None
+
+    def run_when_elected(self, task: Callable[[], None]):
+        """在后台线程中等待获得锁，获得后执行task"""
+        if not FCNTL_AVAILABLE:
+            task()
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a')
+
+        def wait_and_run():
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            task()
+
+        self._thread = threading.Thread(target=wait_and_run, name='tron-leader', daemon=True)
+        self._thread.start()
+
+
+def instrument_flask(app, stats: WorkerStats):
+    """记录每个请求的开始和结束"""
+    from flask import g
+
+    @app.before_request
+    def _worker_begin():
+        g._worker_counted = True
+        stats.begin()
+
+    @app.teardown_request
+    def _worker_end(error=None):
+        if g.pop('_worker_counted', None):
+            stats.end()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+端到端压测
+
+用create_app()创建的应用在本地启动多线程WSGI服务，上游指向模拟节点，
+多个并发客户端按权重请求常用查询接口，统计吞吐量、延迟分布、错误数和每个请求触发的上游调用数。
+也可用 --target 压测已启动的服务（如gunicorn部署的实例），此时不统计上游调用。
+
+    python -m benchmarks.load --duration 10 --concurrency 16 --latency 0.05
+"""
+
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from benchmarks import report
+from benchmarks.mock_node import MockTronNode
+from config.config import Config
+
+ADDRESS = 'TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu'
+
+
+def default_scenario(node: Optional[MockTronNode]) -> List[Tuple[int, str]]:
+    """默认请求组合：(权重, 路径)"""
+    tx_id = '0' * 64
+    block = 60000000
+    if node is not None:
+        tx_id = (node.fixtures.get('/wallet/gettransactionbyid') or {}).get('txID', tx_id)
+        block = node.head_block() - 100
+    return [
+        (30, f'/v1/getTrxBalance?address={ADDRESS}'),
+        (25, f'/v1/getTrc20Balance?address={ADDRESS}'),
+        (15, f'/v1/getTrc10Info?address={ADDRESS}&tokenId=1002992'),
+        (10, '/v1/getBlockHeight'),
+        (10, f'/v1/getTransaction?txID={tx_id}'),
+        (10, f'/v1/getBlockByNumber?blockID={block}')
+    ]
+
+
+@contextmanager
+def config_overrides(**values):
+    """临时修改Config，create_app()读取的配置指向模拟节点"""
+    previous = {key: getattr(Config, key) for key in values if hasattr(Config, key)}
+    for key, value in values.items():
+        setattr(Config, key, value)
+    try:
+        yield
+    finally:
+        for key in values:
+            if key in previous:
+                setattr(Config, key, previous[key])
+            else:
+                delattr(Config, key)
+
+
+class _AppServer:
+    """在后台线程中运行create_app()创建的应用"""
+
+    def __init__(self, node_url: str, cache: bool = True):
+        from werkzeug.serving import make_server
+
+        overrides = dict(
+            TRON_NODE_URLS=[node_url],
+            SIMULATED_FALLBACK=False,  # 上游失败时返回错误而不是随机余额，错误计入结果
+            CACHE_ENABLED=cache,
+            PAYOUT_QUEUE_ENABLED=False,
+            INDEXER_ENABLED=False,
+            LOG_REQUESTS=False,
+            UPSTREAM_HEALTH_INTERVAL=0
+        )
+        with config_overrides(**overrides):
+            import main
+            self.app = main.create_app()
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # 不输出每个请求的访问日志
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self._thread = threading.Thread(target=self.server.serve_forever, name='bench-app', daemon=True)
+
+    def start(self) -> '_AppServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def drive(base_url: str, scenario: Sequence[Tuple[int, str]], duration: float, concurrency: int,
+          warmup: float = 1.0) -> Dict:
+    """
+    并发请求base_url，返回统计结果
+
+    Args:
+        base_url (str): 服务地址
+        scenario (list): (权重, 路径) 列表
+        duration (float): 压测时长（秒），不含预热
+        concurrency (int): 并发客户端数
+        warmup (float): 预热时长（秒），期间的请求不计入结果
+    """
+    weights = [weight for weight, _ in scenario]
+    paths = [path for _, path in scenario]
+    lock = threading.Lock()
+    latencies: List[float] = []
+    route_latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        session = requests.Session()
+        local = []
+        while True:
+            path = rng.choices(paths, weights)[0]
+            began = time.perf_counter()
+            if began >= deadline:
+                break
+            try:
+                response = session.get(base_url + path, timeout=30)
+                status = response.status_code
+                # 接口统一返回 {code, msg, data}，code为0表示业务失败
+                failed = status >= 400 or response.json().get('code') != 1
+                error = f'http_{status}' if status >= 400 else ('code_0' if failed else None)
+            except (requests.RequestException, ValueError) as e:
+                status, error = 0, type(e).__name__
+            elapsed = time.perf_counter() - began
+            if began >= measure_from:
+                local.append((path.split('?', 1)[0], elapsed, status, error))
+        with lock:
+            for route, elapsed, status, error in local:
+                latencies.append(elapsed)
+                route_latencies[route].append(elapsed)
+                statuses[status] += 1
+                if error:
+                    errors[error] += 1
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = len(latencies)
+    return {
+        'duration_s': duration,
+        'concurrency': concurrency,
+        'requests': total,
+        'rps': round(total / duration, 1),
+        'latency_ms': report.percentiles(latencies, scale=1000),
+        'errors': sum(errors.values()),
+        'error_types': dict(errors),
+        'status': {str(status): count for status, count in statuses.items()},
+        'routes': {route: dict(report.percentiles(values, scale=1000), requests=len(values))
+                   for route, values in sorted(route_latencies.items())}
+    }
+
+
+def run(duration: float = 10.0, concurrency: int = 16, latency: float = 0.0, jitter: float = 0.0,
+        error_rate: float = 0.0, cache: bool = True, target: Optional[str] = None,
+        node: Optional[MockTronNode] = None) -> Dict:
+    """启动模拟节点和应用并压测，target不为空时直接压测该地址"""
+    if target:
+        result = drive(target.rstrip('/'), default_scenario(None), duration, concurrency)
+        result['target'] = target
+        return result
+
+    own_node = node is None
+    if own_node:
+        node = MockTronNode(latency=latency, jitter=jitter, error_rate=error_rate).start()
+    server = _AppServer(node.url, cache).start()
+    try:
+        scenario = default_scenario(node)
+        node.reset_stats()
+        result = drive(server.url, scenario, duration, concurrency)
+        upstream = node.get_stats()
+        result['upstream'] = {
+            'latency_s': node.latency,
+            'error_rate': node.error_rate,
+            'cache': cache,
+            'calls': upstream,
+            # 包含预热期间的调用，用于对比缓存和请求合并的效果
+            'calls_per_request': round(upstream['total'] / max(result['requests'], 1), 3)
+        }
+        return result
+    finally:
+        server.stop()
+        if own_node:
+            node.stop()
+
+
+def main(argv=None):
+    """命令行运行：python -m benchmarks.load"""
+    parser = argparse.ArgumentParser(description='端到端压测（JSON格式输出）')
+    parser.add_argument('--duration', type=float, default=10.0, help='压测时长（秒）')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--latency', type=float, default=0.0, help='模拟节点的平均延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='模拟节点延迟的随机波动范围（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟节点返回503的比例')
+    parser.add_argument('--no-cache', action='store_true', help='关闭响应缓存')
+    parser.add_argument('--target', default=None, help='压测已启动的服务地址，不启动本地应用')
+    parser.add_argument('-o', '--output', default=None, help='输出文件，默认标准输出')
+    args = parser.parse_args(argv)
+
+    result = run(args.duration, args.concurrency, args.latency, args.jitter, args.error_rate,
+                 not args.no_cache, args.target)
+    report.write({'environment': report.environment(), 'load': result}, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
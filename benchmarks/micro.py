@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+微基准测试
+
+分别测量上游请求（缓存命中/未命中）、地址生成、ABI编解码和响应序列化的单次耗时，
+上游请求发往本地模拟节点，不依赖网络。
+
+    python -m benchmarks.micro --duration 0.5 -o micro.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import report
+from benchmarks.mock_node import MockTronNode
+from config.config import Config
+
+ADDRESS = 'TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu'
+TO_ADDRESS = 'TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL'
+MNEMONIC = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def measure(name: str, fn: Callable[[], object], duration: float = 0.5, batch_time: float = 0.002) -> Dict:
+    """
+    在duration秒内反复调用fn，返回单次耗时统计（微秒）
+
+    很快的函数按批计时后取平均，避免计时本身的开销影响结果。
+    """
+    fn()  # 预热
+    inner = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= batch_time or inner >= 1 << 20:
+            break
+        inner *= 2
+
+    samples: List[float] = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline or len(samples) < 5:
+        started = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter() - started) / inner)
+
+    stats = report.percentiles(samples, scale=1e6)
+    return {
+        'name': name,
+        'iterations': len(samples) * inner,
+        'mean_us': stats['mean'],
+        'p50_us': stats['p50'],
+        'p99_us': stats['p99'],
+        'ops_per_sec': round(1e6 / stats['mean']) if stats['mean'] else None
+    }
+
+
+def skipped(name: str, reason: str) -> Dict:
+    return {'name': name, 'skipped': reason, 'mean_us': None, 'p50_us': None}
+
+
+def _api_config(url: str, **overrides) -> Dict:
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    # 只配置TRON_NODE_URLS：模拟节点按自建节点处理，不受TronGrid匿名限流影响
+    config.update(TRON_NODE_URLS=[url], SIMULATED_FALLBACK=False)
+    config.update(overrides)
+    return config
+
+
+def bench_make_request(node: MockTronNode, duration: float) -> List[Dict]:
+    """_make_request：缓存命中、请求模拟节点（未命中）、原始字节透传"""
+    from app.api.tron_api import TronAPI
+
+    results = []
+    account = ('/wallet/getaccount', 'POST', {'address': ADDRESS})
+
+    cached_api = TronAPI(_api_config(node.url))
+    cached_api._make_request(*account)
+    results.append(measure('make_request.cache_hit', lambda: cached_api._make_request(*account), duration))
+
+    api = TronAPI(_api_config(node.url, CACHE_ENABLED=False))
+    results.append(measure('make_request.upstream', lambda: api._make_request(*account), duration))
+
+    block = ('/wallet/getblockbynum', 'POST', {'num': node.head_block() - 100})
+    results.append(measure('make_request.upstream_block', lambda: api._make_request(*block), duration))
+    results.append(measure('make_request.upstream_block_raw', lambda: api._make_request(*block, True), duration))
+    return results
+
+
+def bench_addresses(duration: float) -> List[Dict]:
+    """地址生成：随机私钥、助记词推导"""
+    from app.api import address_factory, hd_wallet
+
+    if not address_factory.CRYPTO_AVAILABLE:
+        reason = '缺少coincurve/pycryptodome/base58依赖'
+        return [skipped('address.generate_keypair', reason), skipped('address.derive_mnemonic', reason)]
+    return [
+        measure('address.generate_keypair', address_factory.generate_keypair, duration),
+        measure('address.derive_mnemonic',
+                lambda: hd_wallet.derive_addresses(MNEMONIC, count=1, use_cache=False), duration)
+    ]
+
+
+def bench_abi(duration: float) -> List[Dict]:
+    """ABI编解码"""
+    from app.api import abi
+
+    amount = abi.encode_uint256(123456789)
+    symbol = abi.encode_params(['string'], ['USDT'])
+    return [
+        measure('abi.balance_of_parameter', lambda: abi.balance_of_parameter(ADDRESS), duration),
+        measure('abi.trc20_transfer_data', lambda: abi.trc20_transfer_data(TO_ADDRESS, 10 ** 6), duration),
+        measure('abi.decode_uint256', lambda: abi.decode_uint256(amount), duration),
+        measure('abi.decode_string', lambda: abi.decode_string(symbol), duration)
+    ]
+
+
+def bench_serialization(node: MockTronNode, duration: float, block_txs: int = 200) -> List[Dict]:
+    """响应序列化：标准库json与json_provider（orjson、RawJSON拼接）对比"""
+    from app.utils import json_provider
+
+    template = node.fixtures.get('/wallet/getblockbynum')
+    if not template:
+        return [skipped('serialize.block', '录制响应中没有区块')]
+    previous, node.block_txs = node.block_txs, block_txs
+    try:
+        block = node.respond('/wallet/getblockbynum', {'num': node.head_block() - 100})
+    finally:
+        node.block_txs = previous
+
+    small = {'code': 1, 'msg': 'TRX余额查询成功', 'data': {'address': ADDRESS, 'balance': 1523.467891,
+                                                      'balance_sun': 1523467891, 'unit': 'TRX'}, 'time': 1735689606}
+    envelope = dict(small, data=block)
+    raw = dict(small, data=json_provider.RawJSON(json.dumps(block, separators=(',', ':')).encode()))
+
+    def stdlib(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    return [
+        measure('serialize.envelope_stdlib', lambda: stdlib(small), duration),
+        measure('serialize.envelope', lambda: json_provider.dumps(small), duration),
+        measure(f'serialize.block{block_txs}_stdlib', lambda: stdlib(envelope), duration),
+        measure(f'serialize.block{block_txs}', lambda: json_provider.dumps(envelope), duration),
+        measure(f'serialize.block{block_txs}_raw', lambda: json_provider.dumps(raw), duration)
+    ]
+
+
+def run(duration: float = 0.5, node: Optional[MockTronNode] = None) -> List[Dict]:
+    """运行全部微基准，返回结果列表"""
+    own_node = node is None
+    if own_node:
+        node = MockTronNode().start()
+    try:
+        results = []
+        results.extend(bench_make_request(node, duration))
+        results.extend(bench_addresses(duration))
+        results.extend(bench_abi(duration))
+        results.extend(bench_serialization(node, duration))
+        return results
+    finally:
+        if own_node:
+            node.stop()
+
+
+def main(argv=None):
+    """命令行运行：python -m benchmarks.micro"""
+    parser = argparse.ArgumentParser(description='微基准测试（JSON格式输出）')
+    parser.add_argument('--duration', type=float, default=0.5, help='每项测试的时长（秒）')
+    parser.add_argument('-o', '--output', default=None, help='输出文件，默认标准输出')
+    args = parser.parse_args(argv)
+
+    report.write({'environment': report.environment(), 'micro': run(args.duration)}, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟TRON全节点
+
+回放录制的TronGrid响应（fixtures/trongrid.json），可配置延迟、错误率和限流，
+用于离线压测和基准测试。区块接口按请求的区块号改写录制区块，最新区块号随时间每3秒增长一个，
+与真实节点一样让缓存策略区分最新区块和已固化区块。
+
+    python -m benchmarks.mock_node --port 18090 --latency 0.05 --error-rate 0.01
+    python -m benchmarks.mock_node --record https://api.trongrid.io   # 代理真实节点并录制响应
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlparse
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'trongrid.json')
+
+# 需要改写区块号的接口
+BLOCK_ENDPOINTS = ('/wallet/getnowblock', '/wallet/getblock', '/wallet/getblockbynum', '/wallet/getblockbyid')
+BLOCK_INTERVAL = 3.0
+
+
+class MockTronNode(ThreadingHTTPServer):
+    """回放录制响应的HTTP服务"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, fixtures: str = DEFAULT_FIXTURES,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, block_txs: int = 0, record: Optional[str] = None):
+        """
+        Args:
+            host (str): 监听地址
+            port (int): 监听端口，0表示随机端口
+            fixtures (str): 录制响应文件
+            latency (float): 每个请求的平均延迟（秒）
+            jitter (float): 延迟的随机波动范围（秒）
+            error_rate (float): 返回503的比例
+            rate_limit_rate (float): 返回429的比例
+            block_txs (int): 区块交易数，大于录制数量时重复录制的交易，用于测试大区块
+            record (str): 录制模式下转发请求的真实节点地址
+        """
+        super().__init__((host, port), _Handler)
+        self.fixtures_path = fixtures
+        self.fixtures = self._load(fixtures)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.block_txs = block_txs
+        self.record = record.rstrip('/') if record else None
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._head = self._recorded_head()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    @staticmethod
+    def _load(path: str) -> Dict:
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _recorded_head(self) -> int:
+        block = self.fixtures.get('/wallet/getnowblock') or {}
+        return block.get('block_header', {}).get('raw_data', {}).get('number', 60000000)
+
+    def head_block(self) -> int:
+        """模拟的最新区块号"""
+        return self._head + int((time.time() - self._started) / BLOCK_INTERVAL)
+
+    def start(self) -> 'MockTronNode':
+        """在后台线程中启动"""
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-tron-node', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['total'] = sum(count for key, count in stats.items() if key.startswith('/'))
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def respond(self, path: str, body: Dict) -> Any:
+        """查找录制的响应，没有录制时返回空对象（与节点查不到数据时一致）"""
+        entry = self.fixtures.get(path)
+        if isinstance(entry, dict) and '_match' in entry:
+            entry = entry['_responses'].get(str(body.get(entry['_match'])), entry.get('_default', {}))
+        if entry is None:
+            return {}
+        if path in BLOCK_ENDPOINTS:
+            return self._block(entry, body)
+        return entry
+
+    def _block(self, template: Dict, body: Dict) -> Dict:
+        head = self.head_block()
+        if 'num' in body:
+            number = int(body['num'])
+        elif body.get('id_or_num') is not None and str(body['id_or_num']).isdigit():
+            number = int(body['id_or_num'])
+        else:
+            number = head
+        if number > head:
+            return {}
+
+        block = dict(template)
+        header = copy.deepcopy(template['block_header'])
+        header['raw_data']['number'] = number
+        header['raw_data']['timestamp'] = header['raw_data'].get('timestamp', 0) + (number - self._head) * 3000
+        block['block_header'] = header
+        block['blockID'] = f'{number:016x}' + template['blockID'][16:]
+
+        if body.get('detail') is False or body.get('detail') == 'false':
+            block.pop('transactions', None)
+        elif self.block_txs and template.get('transactions'):
+            recorded = template['transactions']
+            block['transactions'] = [recorded[i % len(recorded)] for i in range(self.block_txs)]
+        return block
+
+    def store(self, path: str, body: Dict, response: Any):
+        """录制模式：保存真实节点的响应"""
+        with self._lock:
+            if path == '/wallet/triggerconstantcontract' or path == '/wallet/triggersmartcontract':
+                entry = self.fixtures.setdefault(path, {'_match': 'function_selector', '_responses': {}})
+                entry['_responses'][str(body.get('function_selector'))] = response
+            else:
+                self.fixtures[path] = response
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.fixtures_path) or '.', exist_ok=True)
+            with open(self.fixtures_path, 'w', encoding='utf-8') as f:
+                json.dump(self.fixtures, f, ensure_ascii=False, indent=2)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # 响应头和正文分两次写出，不关闭Nagle会在keep-alive连接上多出约40ms
+    server: MockTronNode
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: bytes, headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if raw:
+            try:
+                return json.loads(raw)
+            except ValueError:
+                return {}
+        return dict(parse_qsl(urlparse(self.path).query))
+
+    def do_POST(self):
+        server = self.server
+        path = urlparse(self.path).path
+        body = self._body()
+        server.count(path)
+        if server.record:
+            self._proxy(path, body)
+            return
+
+        delay = server.latency + random.uniform(-server.jitter, server.jitter) if server.jitter else server.latency
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < server.rate_limit_rate:
+            server.count('injected_429')
+            self._send(429, b'{"Error":"request rate exceeded"}', {'Retry-After': '1'})
+            return
+        if roll < server.rate_limit_rate + server.error_rate:
+            server.count('injected_503')
+            self._send(503, b'{"Error":"service unavailable"}')
+            return
+
+        self._send(200, json.dumps(server.respond(path, body), separators=(',', ':')).encode())
+
+    do_GET = do_POST
+
+    def _proxy(self, path: str, body: Dict):
+        import requests
+
+        response = requests.post(f'{self.server.record}{path}', json=body, timeout=30)
+        if response.status_code == 200:
+            self.server.store(path, body, response.json())
+        self._send(response.status_code, response.content)
+
+
+def main(argv=None):
+    """命令行启动：python -m benchmarks.mock_node"""
+    parser = argparse.ArgumentParser(description='回放录制响应的模拟TRON全节点')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=18090, help='监听端口')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='录制响应文件')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的平均延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟的随机波动范围（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回503的比例')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='返回429的比例')
+    parser.add_argument('--block-txs', type=int, default=0, help='区块交易数（重复录制的交易）')
+    parser.add_argument('--record', default=None, help='录制模式：转发到该节点并保存响应')
+    args = parser.parse_args(argv)
+
+    node = MockTronNode(args.host, args.port, args.fixtures, args.latency, args.jitter, args.error_rate,
+                        args.rate_limit_rate, args.block_txs, args.record)
+    print(f'模拟节点已启动: {node.url}', file=sys.stderr)
+    try:
+        node.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.record:
+            node.save()
+            print(f'已保存录制响应: {args.fixtures}', file=sys.stderr)
+        node.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基准测试结果
+
+统一的耗时统计、运行环境信息，以及与基线结果对比找出性能回退。
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Sequence
+
+
+def percentiles(samples: Sequence[float], scale: float = 1.0) -> Dict[str, float]:
+    """计算均值和P50/P90/P99/最大值，scale用于换算单位（如秒转毫秒）"""
+    if not samples:
+        return {'mean': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * scale, 3)
+
+    return {
+        'mean': round(sum(ordered) / len(ordered) * scale, 3),
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+        'max': round(ordered[-1] * scale, 3)
+    }
+
+
+def environment() -> Dict:
+    """运行环境，对比结果时确认是否同一环境"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        import orjson  # noqa: F401
+        orjson_available = True
+    except ImportError:
+        orjson_available = False
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'orjson': orjson_available
+    }
+
+
+def write(results: Dict, path: str = None):
+    """输出JSON结果，path为空时写到标准输出"""
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """
+    与基线结果对比
+
+    微基准比较耗时中位数（比平均值受偶发抖动影响小），压测比较吞吐量和P99延迟，变差超过tolerance（比例）的项记为回退。
+
+    Returns:
+        list: 回退说明，空列表表示没有回退
+    """
+    regressions = []
+    base_micro = {item['name']: item for item in baseline.get('micro', []) if item.get('p50_us') is not None}
+    for item in results.get('micro', []):
+        base = base_micro.get(item['name'])
+        if base is None or item.get('p50_us') is None:
+            continue
+        if item['p50_us'] > base['p50_us'] * (1 + tolerance):
+            regressions.append(f"{item['name']}: 耗时中位数 {base['p50_us']}us -> {item['p50_us']}us")
+
+    load, base_load = results.get('load'), baseline.get('load')
+    if load and base_load:
+        if load['rps'] < base_load['rps'] * (1 - tolerance):
+            regressions.append(f"load: 吞吐量 {base_load['rps']} -> {load['rps']} 请求/秒")
+        p99, base_p99 = load['latency_ms']['p99'], base_load['latency_ms']['p99']
+        if p99 is not None and base_p99 is not None and p99 > base_p99 * (1 + tolerance):
+            regressions.append(f"load: P99延迟 {base_p99}ms -> {p99}ms")
+    return regressions
+
+
+def load_json(path: str) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def fail(message: str) -> int:
+    print(message, file=sys.stderr)
+    return 1
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+运行全部基准测试
+
+依次运行微基准和端到端压测，结果输出为JSON；指定 --baseline 时与基线结果对比，
+有回退时以非0状态码退出，便于在CI中发现性能回退。
+
+    python -m benchmarks.run -o baseline.json
+    python -m benchmarks.run --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import sys
+
+from benchmarks import load, micro, report
+from benchmarks.mock_node import MockTronNode
+
+
+def main(argv=None):
+    """命令行运行：python -m benchmarks.run"""
+    parser = argparse.ArgumentParser(description='运行微基准和端到端压测（JSON格式输出）')
+    parser.add_argument('--micro-duration', type=float, default=0.5, help='每项微基准的时长（秒）')
+    parser.add_argument('--load-duration', type=float, default=10.0, help='压测时长（秒）')
+    parser.add_argument('--concurrency', type=int, default=16, help='压测并发客户端数')
+    parser.add_argument('--latency', type=float, default=0.0, help='压测时模拟节点的平均延迟（秒）')
+    parser.add_argument('--skip-load', action='store_true', help='只运行微基准')
+    parser.add_argument('--baseline', default=None, help='基线结果文件，与之对比')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的性能变差比例')
+    parser.add_argument('-o', '--output', default=None, help='输出文件，默认标准输出')
+    args = parser.parse_args(argv)
+
+    results = {'environment': report.environment()}
+    node = MockTronNode().start()
+    try:
+        results['micro'] = micro.run(args.micro_duration, node)
+    finally:
+        node.stop()
+    if not args.skip_load:
+        results['load'] = load.run(args.load_duration, args.concurrency, latency=args.latency)
+
+    if args.baseline:
+        regressions = report.compare(results, report.load_json(args.baseline), args.tolerance)
+        results['regressions'] = regressions
+    report.write(results, args.output)
+
+    if args.baseline and results['regressions']:
+        return report.fail('性能回退：\n' + '\n'.join(f'  {item}' for item in results['regressions']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,10 +17,89 @@ class Config:
     # TRON网络配置
     TRON_GRID_API_URL = 'https://api.trongrid.io'
     TRON_GRID_API_KEY = os.environ.get('TRON_GRID_API_KEY') or ''  # 可选，用于提高请求限制
+    TRON_GRID_API_KEYS = [key.strip() for key in (os.environ.get('TRON_GRID_API_KEYS') or '').split(',') if key.strip()]  # 多个API Key（逗号分隔），为空时使用TRON_GRID_API_KEY
+    TRON_GRID_KEY_RATE = float(os.environ.get('TRON_GRID_KEY_RATE') or 15)  # 每个Key每秒请求数上限，0表示不限
+    TRON_GRID_KEY_BURST = float(os.environ.get('TRON_GRID_KEY_BURST') or 0) or None  # 每个Key的突发请求数，默认等于每秒请求数
+    TRON_GRID_KEY_STRATEGY = os.environ.get('TRON_GRID_KEY_STRATEGY') or 'least_used'  # Key轮换策略：least_used / round_robin
+    TRON_GRID_MAX_QUEUE_WAIT = float(os.environ.get('TRON_GRID_MAX_QUEUE_WAIT') or 2)  # 配额不足时本地排队的最长时间（秒），超过直接拒绝
+    TRON_GRID_ANON_RATE = float(os.environ.get('TRON_GRID_ANON_RATE') or 0)  # 未配置Key时的每秒请求数上限，0表示不限
+    TRON_NODE_URLS = [url.strip() for url in (os.environ.get('TRON_NODE_URLS') or '').split(',') if url.strip()]  # 全节点地址列表（逗号分隔），为空时使用TRON_GRID_API_URL
+
+    # 上游节点路由配置（配置多个节点时生效）
+    UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT') or 3)  # 建立连接超时（秒），读取超时为API_TIMEOUT
+    UPSTREAM_FAILURE_THRESHOLD = 5  # 连续失败多少次后熔断节点
+    UPSTREAM_OPEN_SECONDS = 30  # 熔断持续时间（秒），之后放行一个试探请求
+    UPSTREAM_MAX_LAG = 20  # 区块高度落后超过该数量的节点暂不使用
+    UPSTREAM_HEALTH_INTERVAL = float(os.environ.get('UPSTREAM_HEALTH_INTERVAL') or 10)  # 主动健康检查间隔（秒），0表示关闭
+    UPSTREAM_PROBE_TIMEOUT = 5  # 健康检查请求超时（秒）
+    UPSTREAM_MAX_ATTEMPTS = 2  # 只读请求最多尝试的节点数
+    UPSTREAM_HEDGE_ENABLED = (os.environ.get('UPSTREAM_HEDGE_ENABLED') or '1').lower() in ('1', 'true', 'yes')  # 只读请求是否发送对冲请求
+    UPSTREAM_HEDGE_MIN_DELAY = 0.05  # 对冲等待下限（秒），实际等待近期P95延迟
+    UPSTREAM_HEDGE_MAX_DELAY = 2  # 对冲等待上限（秒）
 
     # TRC20 USDT合约配置
     USDT_CONTRACT_ADDRESS = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'  # USDT TRC20合约地址
     USDT_DECIMALS = 6  # USDT精度
+    TOKEN_DB_PATH = os.environ.get('TOKEN_DB_PATH') or 'data/tokens.db'  # TRC20代币元数据缓存（SQLite）
+
+    # 批量查询配置
+    BATCH_MAX_ADDRESSES = int(os.environ.get('BATCH_MAX_ADDRESSES') or 1000)  # 单次批量查询最多地址数
+    BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY') or 16)  # 批量查询并发上限
+
+    # 组合余额查询配置（/v1/getPortfolio）
+    MULTICALL_CONTRACT = os.environ.get('MULTICALL_CONTRACT') or ''  # Multicall合约地址（需支持tryAggregate和getEthBalance），为空时并发逐个查询
+    MULTICALL_BATCH_SIZE = int(os.environ.get('MULTICALL_BATCH_SIZE') or 100)  # 每次Multicall调用包含的余额数
+    PORTFOLIO_MAX_ADDRESSES = 100  # 单次最多查询的地址数
+    PORTFOLIO_MAX_TOKENS = 20  # 单次最多查询的代币数
+
+    # 组合查询并发配置
+    FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS') or 32)  # 并发子请求线程数
+    FANOUT_LEG_TIMEOUT = float(os.environ.get('FANOUT_LEG_TIMEOUT') or 10)  # 子请求等待上限（秒），超时返回部分数据
+
+    # 本地区块索引配置
+    INDEXER_ENABLED = (os.environ.get('INDEXER_ENABLED') or '').lower() in ('1', 'true', 'yes')  # 是否启用本地索引
+    INDEXER_DB_PATH = os.environ.get('INDEXER_DB_PATH') or 'data/chain_index.db'  # SQLite数据库路径
+    INDEXER_START_BLOCK = int(os.environ.get('INDEXER_START_BLOCK') or 0)  # 起始区块，0表示从当前高度开始
+    INDEXER_CONFIRMATIONS = 19  # 只索引已固化的区块
+    INDEXER_POLL_INTERVAL = 3  # 追上最新高度后的轮询间隔（秒）
+    INDEXER_BACKFILL_WORKERS = int(os.environ.get('INDEXER_BACKFILL_WORKERS') or 8)  # 回填并行请求数
+    INDEXER_BATCH_SIZE = 100  # 每批写入的区块数
+
+    # 事件推送配置（/v1/stream）
+    STREAM_POLL_INTERVAL = float(os.environ.get('STREAM_POLL_INTERVAL') or 1)  # 新区块轮询间隔（秒）
+    STREAM_QUEUE_SIZE = 1000  # 每个订阅者的事件队列长度，消费过慢时断开
+    STREAM_REPLAY_BLOCKS = 20  # 断线重连时可补发的最近区块数
+    STREAM_MAX_GAP = 20  # 一次最多补齐的区块数
+    STREAM_KEEPALIVE = 15  # 心跳间隔（秒）
+    STREAM_MAX_ADDRESSES = 100  # 单个订阅最多关注的地址数
+
+    # 批量生成地址配置（/v1/createAddresses）
+    BULK_ADDRESS_MAX_COUNT = int(os.environ.get('BULK_ADDRESS_MAX_COUNT') or 100000)  # 单次请求最多生成的地址数
+    BULK_ADDRESS_WORKERS = int(os.environ.get('BULK_ADDRESS_WORKERS') or 0)  # 工作进程数，0表示CPU核数
+    BULK_ADDRESS_CHUNK_SIZE = 1000  # 每个工作进程每批生成的地址数
+
+    # HD钱包配置（/v1/deriveAddresses）
+    HD_DERIVE_MAX_COUNT = int(os.environ.get('HD_DERIVE_MAX_COUNT') or 1000)  # 单次请求最多推导的地址数
+
+    # 转账配置
+    TX_EXPIRATION = 60  # 交易有效期（秒）
+    TX_REF_BLOCK_TTL = 60  # 引用区块复用时长（秒）
+    TRC20_FEE_LIMIT = int(os.environ.get('TRC20_FEE_LIMIT') or 100_000_000)  # TRC20转账最大手续费（sun）
+    SEND_BATCH_MAX = 500  # 单次批量转账最多笔数
+    SIGN_WORKERS = 4  # 并行签名线程数
+    BROADCAST_CONCURRENCY = 20  # 并发广播请求数
+
+    # 转账队列配置（启用后所有转账接口经由队列处理）
+    PAYOUT_QUEUE_ENABLED = (os.environ.get('PAYOUT_QUEUE_ENABLED') or '').lower() in ('1', 'true', 'yes')  # 是否启用转账队列（默认关闭）
+    PAYOUT_DB_PATH = os.environ.get('PAYOUT_DB_PATH') or 'data/payouts.db'  # SQLite数据库路径
+    PAYOUT_BATCH_SIZE = 50  # 每个发送地址每轮最多广播的笔数
+    PAYOUT_POLL_INTERVAL = 1  # 调度轮询间隔（秒）
+    PAYOUT_WAIT_TIMEOUT = 10  # 单笔转账接口等待上链结果的最长时间（秒）
+    PAYOUT_CONFIRM_INTERVAL = 3  # 查询交易上链回执的间隔（秒）
+    PAYOUT_EXPIRY_GRACE = 60  # 交易过期后再等待多久才检查是否未上链（秒），不小于 UPSTREAM_MAX_LAG × 3秒
+    PAYOUT_BANDWIDTH_PER_TX = 350  # 每笔交易预估带宽
+    PAYOUT_ENERGY_PER_TRC20 = 65000  # 每笔TRC20转账预估能量
+    PAYOUT_ALLOW_BURN = (os.environ.get('PAYOUT_ALLOW_BURN') or '').lower() in ('1', 'true', 'yes')  # 资源不足时是否燃烧TRX
 
     # 默认测试配置
     DEFAULT_TEST_ADDRESS = 'TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu'
@@ -29,6 +108,53 @@ class Config:
     # API响应配置
     API_VERSION = '3.0'
     API_TIMEOUT = 30  # 请求超时时间（秒）
+    SIMULATED_FALLBACK = (os.environ.get('SIMULATED_FALLBACK') or '1').lower() in ('1', 'true', 'yes')  # 余额查询失败时返回随机模拟余额（演示用），关闭后返回错误
+
+    # HTTP连接池配置（上游请求复用keep-alive连接）
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS') or 10)  # 缓存的主机连接池数量
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE') or 50)  # 每个主机最大保持连接数
+    HTTP_POOL_BLOCK = False  # 连接池耗尽时是否阻塞等待
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES') or 2)  # 连接错误/5xx重试次数
+    HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF') or 0.3)  # 重试退避系数（秒）
+    HTTP_RETRY_STATUS = (500, 502, 503, 504)  # 需要重试的HTTP状态码
+
+    # 只读查询响应缓存配置
+    CACHE_ENABLED = True
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 10000)  # 最大缓存条目数
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES') or 64 * 1024 * 1024)  # 最大缓存字节数
+    CACHE_SOLIDIFIED_DEPTH = 19  # 超过该确认数的区块/交易回执永久缓存
+    CACHE_TTL_OVERRIDES = {}  # 按接口覆盖缓存时长（秒），0表示不缓存，如 {'/wallet/getaccount': 1}
+    SINGLE_FLIGHT_ENABLED = (os.environ.get('SINGLE_FLIGHT_ENABLED') or '1').lower() in ('1', 'true', 'yes')  # 相同的并发只读请求合并为一次上游调用
+    JSON_RAW_PASSTHROUGH = (os.environ.get('JSON_RAW_PASSTHROUGH') or '1').lower() in ('1', 'true', 'yes')  # 交易、完整区块直接拼接上游响应字节，不解析再编码
+
+    # 监控指标配置
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or '1').lower() in ('1', 'true', 'yes')  # 是否记录请求指标并开放 /metrics 接口
+
+    # 日志配置
+    LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'INFO').upper()  # 日志级别
+    LOG_DIR = os.environ.get('LOG_DIR') or 'logs'  # 日志目录
+    LOG_ASYNC = (os.environ.get('LOG_ASYNC') or '1').lower() in ('1', 'true', 'yes')  # 请求线程只入队，由后台线程写日志
+    LOG_JSON = (os.environ.get('LOG_JSON') or '1').lower() in ('1', 'true', 'yes')  # 每条日志输出一行JSON
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE') or 1.0)  # INFO及以下级别日志的采样比例，WARNING及以上全部保留
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE') or 10000)  # 异步日志队列长度，队列满时丢弃日志
+    LOG_REQUESTS = (os.environ.get('LOG_REQUESTS') or '1').lower() in ('1', 'true', 'yes')  # 是否记录每个请求的访问日志
+
+    # 生产部署配置（gunicorn -c gunicorn.conf.py wsgi:app）
+    SERVER_BIND = os.environ.get('SERVER_BIND') or '0.0.0.0:8765'  # 监听地址
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS') or os.cpu_count() or 1)  # 工作进程数
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS') or 16)  # 每个工作进程的请求处理线程数（请求大多在等待上游响应）
+    SERVER_PRELOAD = (os.environ.get('SERVER_PRELOAD') or '1').lower() in ('1', 'true', 'yes')  # 在主进程中创建应用后再fork工作进程
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT') or 60)  # 工作进程无响应多少秒后被重启
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT') or 30)  # 平滑重启/停止时等待进行中请求的秒数
+    SERVER_KEEPALIVE = int(os.environ.get('SERVER_KEEPALIVE') or 5)  # 客户端keep-alive连接保持秒数
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS') or 0)  # 工作进程处理多少请求后重启，0表示不重启
+    WORKER_STATS_DIR = os.environ.get('WORKER_STATS_DIR') or 'data/workers'  # 各工作进程统计文件目录
+    WORKER_STATS_INTERVAL = float(os.environ.get('WORKER_STATS_INTERVAL') or 5)  # 工作进程统计写入间隔（秒）
+
+    # 链路追踪配置
+    TRACING_EXPORTER = os.environ.get('TRACING_EXPORTER') or ''  # 追踪导出器：file、console、memory 或 "模块:类名"，为空时不记录
+    TRACING_FILE = os.environ.get('TRACING_FILE') or 'logs/traces.jsonl'  # file导出器的输出文件（每个span一行JSON）
+    TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE') or 1.0)  # 根span采样比例，带traceparent的请求沿用调用方的采样决定
 
 class DevelopmentConfig(Config):
     """开发环境配置"""
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+gunicorn配置
+
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+参数来自 config/config.py 的 SERVER_* 配置（可用同名环境变量覆盖）。
+使用gthread工作模式：每个工作进程内多个线程处理请求，请求大多在等待上游响应，线程数可以远大于CPU核数。
+
+信号：
+- TERM：平滑停止，工作进程不再接收新连接，等待进行中的请求和上游请求完成（最长 SERVER_GRACEFUL_TIMEOUT 秒）
+- HUP：重新读取配置并逐个替换工作进程；预加载模式下不会重新加载代码
+- USR2 + WINCH + TERM：升级代码，先启动新的主进程，再停止旧主进程的工作进程，最后停止旧主进程
+"""
+
+import gc
+import glob
+import os
+import signal
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = 'gthread'
+preload_app = Config.SERVER_PRELOAD
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+max_requests = Config.SERVER_MAX_REQUESTS
+# 错开各工作进程的重启时间，避免同时重启
+max_requests_jitter = Config.SERVER_MAX_REQUESTS // 10
+
+
+def on_starting(server):
+    # 清理上次运行留下的工作进程统计文件
+    for path in glob.glob(os.path.join(Config.WORKER_STATS_DIR, '*.json')):
+        os.remove(path)
+
+
+def when_ready(server):
+    # 预加载的对象移出垃圾回收跟踪，避免工作进程中的垃圾回收写这些对象导致共享的内存页被复制
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.utils.workers import LeaderLock, StatsPublisher
+    from main import start_background_tasks
+    from wsgi import app
+
+    # 重建线程池、上游连接和数据库连接，统计从0开始
+    app.extensions['tron_api'].after_fork()
+    stats = app.extensions['worker_stats']
+    stats.reset()
+
+    # 区块索引只需要一个进程运行：持有文件锁的工作进程运行，退出后由其他进程接手
+    indexer = True
+    if 'chain_indexer' in app.extensions:
+        lock = LeaderLock(Config.INDEXER_DB_PATH + '.lock')
+        app.extensions['indexer_lock'] = lock
+        indexer = lock.run_when_elected
+    start_background_tasks(app, indexer=indexer)
+
+    publisher = StatsPublisher(stats, Config.WORKER_STATS_DIR, Config.WORKER_STATS_INTERVAL)
+    app.extensions['worker_stats_publisher'] = publisher
+    publisher.start()
+
+
+def post_worker_init(worker):
+    from main import drain
+    from wsgi import app
+
+    # 收到TERM时先通知后台线程停止并结束事件推送连接，再交给gunicorn等待进行中的请求
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        drain(app)
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    from main import stop_background_tasks
+    from wsgi import app
+
+    stop_background_tasks(app, timeout=Config.SERVER_GRACEFUL_TIMEOUT)
+
+
+def child_exit(server, worker):
+    # 工作进程异常退出时可能没有删除自己的统计文件
+    from app.utils.workers import remove_worker_stats
+
+    remove_worker_stats(Config.WORKER_STATS_DIR, worker.pid)
@@ -17,7 +17,7 @@ TRON区块链API接口服务 - Python版本
 温馨提示：接受各种代码定制
 """
 
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context
 try:
     from flask_cors import CORS
     CORS_AVAILABLE = True
@@ -30,7 +30,15 @@ from datetime import datetime
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from app.api.block_store import BlockStore
+from app.api.address_factory import CRYPTO_AVAILABLE, iter_address_batches
+from app.api.indexer import ChainIndexer
+from app.api.payout_queue import PayoutScheduler, PayoutStore
+from app.api.stream import BlockFollower, EventHub, format_sse
 from app.api.tron_api import TronAPI
+from app.utils import metrics, tracing, workers
+from app.utils.json_provider import FastJSONProvider
+from app.utils.logger import default_logger, dropped_logs, log_requests, shutdown_logging
 from config.config import Config
 
 def get_docs_data():
@@ -59,6 +67,34 @@ def get_docs_data():
                     'description': '通过助记词生成TRON地址，包含助记词、私钥、公钥',
                     'params': None
                 },
+                {
+                    'title': '批量生成TRON地址',
+                    'icon': '🏭',
+                    'method': 'GET',
+                    'url': f'{domain}/v1/createAddresses',
+                    'testUrl': f'{domain}/v1/createAddresses?count=10',
+                    'description': '多进程批量生成地址，以NDJSON格式（每行一个JSON）流式返回',
+                    'params': [
+                        {'name': 'count', 'type': 'int', 'required': '是', 'desc': '生成数量'},
+                        {'name': 'mnemonic', 'type': 'int', 'required': '否', 'desc': '是否同时生成助记词，默认0'}
+                    ]
+                },
+                {
+                    'title': 'HD钱包推导地址',
+                    'icon': '🌳',
+                    'method': 'POST',
+                    'url': f'{domain}/v1/deriveAddresses',
+                    'testUrl': f'{domain}/v1/deriveAddresses?xpub=your_account_xpub&start=0&count=10',
+                    'description': "按BIP-44路径 m/44'/195'/account'/0/index 从一个助记词或账户xpub推导多个地址",
+                    'params': [
+                        {'name': 'mnemonic', 'type': 'string', 'required': '否', 'desc': '助记词（与xpub二选一，返回私钥）'},
+                        {'name': 'xpub', 'type': 'string', 'required': '否', 'desc': '账户级扩展公钥（只返回地址）'},
+                        {'name': 'account', 'type': 'int', 'required': '否', 'desc': '账户序号，默认0'},
+                        {'name': 'start', 'type': 'int', 'required': '否', 'desc': '起始地址序号，默认0'},
+                        {'name': 'count', 'type': 'int', 'required': '否', 'desc': '推导数量，默认20'},
+                        {'name': 'passphrase', 'type': 'string', 'required': '否', 'desc': 'BIP-39密码'}
+                    ]
+                },
                 {
                     'title': '根据私钥获取地址',
                     'icon': '🔐',
@@ -92,9 +128,10 @@ def get_docs_data():
                     'method': 'GET',
                     'url': f'{domain}/v1/getTrc20Balance',
                     'testUrl': f'{domain}/v1/getTrc20Balance?address=TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu',
-                    'description': '查询指定地址的TRC20代币余额（如USDT）',
+                    'description': '查询指定地址的TRC20代币余额，默认USDT，代币精度和名称自动获取并缓存',
                     'params': [
-                        {'name': 'address', 'type': 'string', 'required': '是', 'desc': 'TRON地址'}
+                        {'name': 'address', 'type': 'string', 'required': '是', 'desc': 'TRON地址'},
+                        {'name': 'contract', 'type': 'string', 'required': '否', 'desc': 'TRC20合约地址，默认USDT'}
                     ]
                 },
                 {
@@ -108,6 +145,30 @@ def get_docs_data():
                         {'name': 'address', 'type': 'string', 'required': '是', 'desc': 'TRON地址'},
                         {'name': 'tokenId', 'type': 'string', 'required': '否', 'desc': 'TRC10代币ID，默认1002992'}
                     ]
+                },
+                {
+                    'title': '批量查询余额',
+                    'icon': '📦',
+                    'method': 'POST',
+                    'url': f'{domain}/v1/batch/balances',
+                    'testUrl': f'{domain}/v1/batch/balances',
+                    'description': '一次请求并发查询多个地址的TRX、TRC20、TRC10余额，单个地址失败不影响整批结果',
+                    'params': [
+                        {'name': 'addresses', 'type': 'array', 'required': '是', 'desc': 'TRON地址列表（JSON请求体）'},
+                        {'name': 'assets', 'type': 'array', 'required': '否', 'desc': '资产列表，如 ["trx", {"type": "trc20", "contract": "..."}, {"type": "trc10", "tokenId": "1002992"}]，默认TRX和USDT'}
+                    ]
+                },
+                {
+                    'title': '组合余额查询',
+                    'icon': '🧮',
+                    'method': 'GET',
+                    'url': f'{domain}/v1/getPortfolio',
+                    'testUrl': f'{domain}/v1/getPortfolio?address=TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu',
+                    'description': '一次返回地址的TRX余额和多个TRC20代币余额，配置Multicall合约时合并为一次合约调用',
+                    'params': [
+                        {'name': 'address', 'type': 'string', 'required': '是', 'desc': 'TRON地址，多个用逗号分隔（POST请求体可用addresses数组）'},
+                        {'name': 'tokens', 'type': 'string', 'required': '否', 'desc': 'TRC20合约地址，多个用逗号分隔，默认USDT'}
+                    ]
                 }
             ]
         },
@@ -125,7 +186,8 @@ def get_docs_data():
                         {'name': 'to', 'type': 'string', 'required': '是', 'desc': '接收地址'},
                         {'name': 'amount', 'type': 'string', 'required': '是', 'desc': '转账金额(单位: TRX)'},
                         {'name': 'key', 'type': 'string', 'required': '是', 'desc': '发送方私钥'},
-                        {'name': 'message', 'type': 'string', 'required': '否', 'desc': '转账备注'}
+                        {'name': 'message', 'type': 'string', 'required': '否', 'desc': '转账备注'},
+                        {'name': 'idempotencyKey', 'type': 'string', 'required': '否', 'desc': '幂等键（也可用Idempotency-Key请求头），重试时传相同的值不会重复转账'}
                     ]
                 },
                 {
@@ -138,7 +200,8 @@ def get_docs_data():
                     'params': [
                         {'name': 'to', 'type': 'string', 'required': '是', 'desc': '接收地址'},
                         {'name': 'amount', 'type': 'string', 'required': '是', 'desc': '转账金额'},
-                        {'name': 'key', 'type': 'string', 'required': '是', 'desc': '发送方私钥'}
+                        {'name': 'key', 'type': 'string', 'required': '是', 'desc': '发送方私钥'},
+                        {'name': 'idempotencyKey', 'type': 'string', 'required': '否', 'desc': '幂等键，重试时传相同的值不会重复转账'}
                     ]
                 },
                 {
@@ -152,7 +215,44 @@ def get_docs_data():
                         {'name': 'to', 'type': 'string', 'required': '是', 'desc': '接收地址'},
                         {'name': 'amount', 'type': 'string', 'required': '是', 'desc': '转账金额'},
                         {'name': 'key', 'type': 'string', 'required': '是', 'desc': '发送方私钥'},
-                        {'name': 'tokenId', 'type': 'string', 'required': '否', 'desc': 'TRC10代币ID，默认1002992'}
+                        {'name': 'tokenId', 'type': 'string', 'required': '否', 'desc': 'TRC10代币ID，默认1002992'},
+                        {'name': 'idempotencyKey', 'type': 'string', 'required': '否', 'desc': '幂等键，重试时传相同的值不会重复转账'}
+                    ]
+                },
+                {
+                    'title': '批量转账',
+                    'icon': '📦',
+                    'method': 'POST',
+                    'url': f'{domain}/v1/batch/send',
+                    'testUrl': f'{domain}/v1/batch/send',
+                    'description': '多笔转账经由转账队列出账（未启用队列时本地签名后并发广播），逐笔返回交易ID和结果（JSON请求体）',
+                    'params': [
+                        {'name': 'transfers', 'type': 'array', 'required': '是', 'desc': '转账列表，元素含type(trx/trc20/trc10)、to、amount，可选key、message、contract、decimals、tokenId、idempotencyKey'},
+                        {'name': 'key', 'type': 'string', 'required': '否', 'desc': '默认发送方私钥'}
+                    ]
+                },
+                {
+                    'title': '提交转账队列',
+                    'icon': '🧾',
+                    'method': 'POST',
+                    'url': f'{domain}/v1/payouts',
+                    'testUrl': f'{domain}/v1/payouts',
+                    'description': '转账持久化排队，后台按发送地址和可用能量/带宽分批广播，幂等键防止重复支付（JSON请求体）',
+                    'params': [
+                        {'name': 'payouts', 'type': 'array', 'required': '是', 'desc': '转账列表，格式同批量转账，可带idempotencyKey'},
+                        {'name': 'key', 'type': 'string', 'required': '是', 'desc': '发送方私钥（仅保存在内存）'}
+                    ]
+                },
+                {
+                    'title': '查询队列转账',
+                    'icon': '🔎',
+                    'method': 'GET',
+                    'url': f'{domain}/v1/getPayout',
+                    'testUrl': f'{domain}/v1/getPayout?idempotencyKey=your_key',
+                    'description': '按转账ID或幂等键查询队列中转账的状态和交易ID',
+                    'params': [
+                        {'name': 'id', 'type': 'int', 'required': '否', 'desc': '转账ID'},
+                        {'name': 'idempotencyKey', 'type': 'string', 'required': '否', 'desc': '幂等键'}
                     ]
                 }
             ]
@@ -181,6 +281,21 @@ def get_docs_data():
                     'params': [
                         {'name': 'txID', 'type': 'string', 'required': '是', 'desc': '交易ID'}
                     ]
+                },
+                {
+                    'title': '查询地址USDT转账记录',
+                    'icon': '🧾',
+                    'method': 'GET',
+                    'url': f'{domain}/v1/getTrc20Transfers',
+                    'testUrl': f'{domain}/v1/getTrc20Transfers?address=TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu',
+                    'description': '基于本地索引查询地址的USDT转入/转出记录，支持游标分页（需启用INDEXER_ENABLED）',
+                    'params': [
+                        {'name': 'address', 'type': 'string', 'required': '是', 'desc': 'TRON地址'},
+                        {'name': 'sinceBlock', 'type': 'int', 'required': '否', 'desc': '起始区块号，默认0'},
+                        {'name': 'direction', 'type': 'string', 'required': '否', 'desc': 'in转入 / out转出，默认全部'},
+                        {'name': 'limit', 'type': 'int', 'required': '否', 'desc': '每页条数，默认50，最大500'},
+                        {'name': 'cursor', 'type': 'string', 'required': '否', 'desc': '分页游标，取上一页返回的next_cursor'}
+                    ]
                 }
             ]
         },
@@ -194,7 +309,23 @@ def get_docs_data():
                     'url': f'{domain}/v1/getBlockHeight',
                     'testUrl': f'{domain}/v1/getBlockHeight',
                     'description': '获取当前TRON区块链的最新区块高度',
-                    'params': None
+                    'params': [
+                        {'name': 'detail', 'type': 'string', 'required': '否', 'desc': 'block_info内容：header（默认，仅区块头）/txids/full'},
+                        {'name': 'fields', 'type': 'string', 'required': '否', 'desc': '返回字段，逗号分隔的点分路径，如 block_height'}
+                    ]
+                },
+                {
+                    'title': '订阅新区块和转账事件',
+                    'icon': '📡',
+                    'method': 'GET',
+                    'url': f'{domain}/v1/stream',
+                    'testUrl': f'{domain}/v1/stream?addresses=TTAUj1qkSVK2LuZBResGu2xXb1ZAguGsnu',
+                    'description': 'Server-Sent Events推送新区块和关注地址的转账，替代轮询区块高度和余额',
+                    'params': [
+                        {'name': 'blocks', 'type': 'int', 'required': '否', 'desc': '是否推送新区块事件，默认1'},
+                        {'name': 'addresses', 'type': 'string', 'required': '否', 'desc': '关注的地址，逗号分隔'},
+                        {'name': 'lastEventId', 'type': 'string', 'required': '否', 'desc': '断线重连时已收到的最后事件ID（也可用Last-Event-ID请求头）'}
+                    ]
                 },
                 {
                     'title': '根据区块号查询区块',
@@ -204,7 +335,9 @@ def get_docs_data():
                     'testUrl': f'{domain}/v1/getBlockByNumber?blockID=latest',
                     'description': '根据区块号或区块哈希查询区块信息',
                     'params': [
-                        {'name': 'blockID', 'type': 'string', 'required': '是', 'desc': '区块号或区块哈希，可以使用"latest"获取最新区块'}
+                        {'name': 'blockID', 'type': 'string', 'required': '是', 'desc': '区块号或区块哈希，可以使用"latest"获取最新区块'},
+                        {'name': 'detail', 'type': 'string', 'required': '否', 'desc': 'header（仅区块头）/txids（区块头和交易ID）/full（默认，完整区块）'},
+                        {'name': 'fields', 'type': 'string', 'required': '否', 'desc': '返回字段，逗号分隔的点分路径，如 blockID,block_header.raw_data.timestamp'}
                     ]
                 }
             ]
@@ -246,8 +379,14 @@ def print_ascii_art():
     print("                                                  ")
     print()
 
-def create_app():
-    """创建Flask应用实例"""
+def create_app(start_background: bool = True):
+    """
+    创建Flask应用实例
+
+    Args:
+        start_background (bool): 是否立即启动后台线程（节点健康检查、区块索引、转账队列）。
+            多进程部署时在主进程中创建应用，fork出工作进程后再由各工作进程调用 start_background_tasks()
+    """
     app = Flask(__name__,
                 template_folder='templates',
                 static_folder='static')
@@ -255,15 +394,97 @@ def create_app():
     # 加载配置
     app.config.from_object(Config)
 
-    # 配置JSON输出中文字符不进行ASCII编码
-    app.config['JSON_AS_ASCII'] = False
+    # JSON序列化：优先使用orjson，中文字符不进行ASCII编码，支持原样拼接上游响应
+    app.json = FastJSONProvider(app)
 
     # 启用跨域支持
     if CORS_AVAILABLE:
         CORS(app)
 
     # 初始化TRON API
-    tron_api = TronAPI()
+    tron_api = TronAPI(app.config)
+    app.extensions['tron_api'] = tron_api
+
+    # 启用本地区块索引
+    if app.config.get('INDEXER_ENABLED'):
+        store = BlockStore(app.config['INDEXER_DB_PATH'], tracked_contracts=[tron_api.usdt_contract])
+        tron_api.block_store = store
+        indexer = ChainIndexer(
+            tron_api, store,
+            start_block=app.config['INDEXER_START_BLOCK'],
+            confirmations=app.config['INDEXER_CONFIRMATIONS'],
+            poll_interval=app.config['INDEXER_POLL_INTERVAL'],
+            workers=app.config['INDEXER_BACKFILL_WORKERS'],
+            batch_size=app.config['INDEXER_BATCH_SIZE']
+        )
+        app.extensions['chain_indexer'] = indexer
+
+    # 转账队列：带幂等键的转账持久化后由后台线程按发送地址分批广播
+    if app.config.get('PAYOUT_QUEUE_ENABLED'):
+        payout_queue = PayoutScheduler(
+            tron_api, PayoutStore(app.config['PAYOUT_DB_PATH']),
+            batch_size=app.config['PAYOUT_BATCH_SIZE'],
+            poll_interval=app.config['PAYOUT_POLL_INTERVAL'],
+            bandwidth_per_tx=app.config['PAYOUT_BANDWIDTH_PER_TX'],
+            energy_per_trc20=app.config['PAYOUT_ENERGY_PER_TRC20'],
+            allow_burn=app.config['PAYOUT_ALLOW_BURN'],
+            confirm_interval=app.config['PAYOUT_CONFIRM_INTERVAL'],
+            expiry_grace=app.config['PAYOUT_EXPIRY_GRACE']
+        )
+        tron_api.payout_queue = payout_queue
+        app.extensions['payout_queue'] = payout_queue
+
+    # 新区块/转账事件推送，所有订阅者共用一个上游轮询
+    event_hub = EventHub(app.config['STREAM_QUEUE_SIZE'], app.config['STREAM_REPLAY_BLOCKS'])
+    block_follower = BlockFollower(tron_api, event_hub, app.config['STREAM_POLL_INTERVAL'],
+                                   app.config['STREAM_MAX_GAP'])
+    app.extensions['event_hub'] = event_hub
+    app.extensions['block_follower'] = block_follower
+
+    # 链路追踪：路由、上游请求、缓存查询和JSON编码各自记录span，traceparent请求头作为父上下文
+    if app.config.get('TRACING_EXPORTER'):
+        tracing.configure(tracing.create_exporter(app.config['TRACING_EXPORTER'], app.config.get('TRACING_FILE')),
+                          app.config.get('TRACING_SAMPLE_RATE', 1.0))
+    tracing.instrument_flask(app)
+
+    # 请求指标：路由/上游耗时直方图、错误数、在途请求数，由 /metrics 输出
+    if app.config.get('METRICS_ENABLED'):
+        metrics.instrument_flask(app)
+        metrics.registry.register_collector('tron_api', tron_api.collect_metrics)
+        if 'payout_queue' in app.extensions:
+            metrics.registry.register_collector('payout_queue', app.extensions['payout_queue'].collect_metrics)
+        metrics.registry.register_collector('stream', lambda: [metrics.stats_family(
+            'tron_stream_subscribers', 'gauge', '事件推送订阅者数', event_hub.get_stats()['subscribers'])])
+        metrics.registry.register_collector('logging', lambda: [metrics.stats_family(
+            'tron_log_dropped_total', 'counter', '日志队列满时丢弃的日志数', dropped_logs())])
+
+    # 工作进程统计：在途请求数和线程利用率，多进程部署时各进程定期写入 WORKER_STATS_DIR
+    worker_stats = workers.WorkerStats(app.config.get('SERVER_THREADS', 1))
+    app.extensions['worker_stats'] = worker_stats
+    workers.instrument_flask(app, worker_stats)
+
+    def worker_snapshots():
+        return workers.collect_worker_stats(app.config.get('WORKER_STATS_DIR')) or [worker_stats.snapshot()]
+
+    if app.config.get('METRICS_ENABLED'):
+        def collect_worker_metrics():
+            snapshots = worker_snapshots()
+            return [
+                ('tron_worker_utilization', 'gauge', '工作进程请求处理线程利用率',
+                 [({'pid': str(item['pid'])}, item['utilization']) for item in snapshots]),
+                ('tron_worker_in_flight', 'gauge', '工作进程正在处理的请求数',
+                 [({'pid': str(item['pid'])}, item['in_flight']) for item in snapshots]),
+                ('tron_worker_requests_total', 'counter', '工作进程已处理的请求数',
+                 [({'pid': str(item['pid'])}, item['requests']) for item in snapshots])
+            ]
+        metrics.registry.register_collector('workers', collect_worker_metrics)
+
+    # 访问日志：请求线程只入队，格式化、脱敏和写文件由后台线程完成
+    if app.config.get('LOG_REQUESTS'):
+        log_requests(app, default_logger)
+
+    if start_background:
+        start_background_tasks(app)
 
     # ==================== 主页路由 ====================
 
@@ -291,11 +512,28 @@ def create_app():
                 'version': '3.0',
                 'python_version': sys.version,
                 'timestamp': int(datetime.now().timestamp()),
-                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'http_pool': tron_api.get_transport_stats(),
+                'upstream': tron_api.get_upstream_stats(),
+                'api_keys': tron_api.get_api_key_stats(),
+                'cache': tron_api.get_cache_stats(),
+                'single_flight': tron_api.get_single_flight_stats(),
+                'tokens': tron_api.token_registry.get_stats(),
+                'indexer': app.extensions['chain_indexer'].get_stats() if 'chain_indexer' in app.extensions else None,
+                'stream': event_hub.get_stats(),
+                'payout_queue': app.extensions['payout_queue'].get_stats() if 'payout_queue' in app.extensions else None,
+                'workers': worker_snapshots()
             },
             'time': int(datetime.now().timestamp())
         })
 
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        """Prometheus指标"""
+        if not app.config.get('METRICS_ENABLED'):
+            return tron_api._error_response('指标未启用'), 404
+        return Response(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
     @app.route('/v1/getApiList', methods=['GET', 'POST'])
     def get_api_list():
         """获取API接口列表"""
@@ -303,29 +541,39 @@ def create_app():
             '地址生成': {
                 'createAddress': '生成TRON地址',
                 'generateAddressWithMnemonic': '通过助记词生成地址',
+                'createAddresses': '批量生成地址',
+                'deriveAddresses': 'HD钱包推导地址',
                 'getAddressByKey': '根据私钥获取地址'
             },
             '余额查询': {
                 'getTrxBalance': '查询TRX余额',
                 'getTrc20Balance': '查询TRC20代币余额',
-                'getTrc10Info': '查询TRC10代币信息'
+                'getTrc10Info': '查询TRC10代币信息',
+                'batch/balances': '批量查询余额',
+                'getPortfolio': '组合余额查询'
             },
             '转账功能': {
                 'sendTrx': 'TRX转账',
                 'sendTrc20': 'TRC20代币转账',
-                'sendTrc10': 'TRC10代币转账'
+                'sendTrc10': 'TRC10代币转账',
+                'batch/send': '批量转账',
+                'payouts': '提交转账队列',
+                'getPayout': '查询队列转账'
             },
             '交易查询': {
                 'getTransaction': '查询交易详情',
-                'getTrc20TransactionReceipt': '查询TRC20交易回执'
+                'getTrc20TransactionReceipt': '查询TRC20交易回执',
+                'getTrc20Transfers': '查询地址USDT转账记录'
             },
             '区块链信息': {
                 'getBlockHeight': '获取区块高度',
-                'getBlockByNumber': '根据区块号查询区块'
+                'getBlockByNumber': '根据区块号查询区块',
+                'stream': '订阅新区块和转账事件'
             },
             '工具接口': {
                 'status': 'API状态检查',
-                'getApiList': '获取接口列表'
+                'getApiList': '获取接口列表',
+                'metrics': 'Prometheus指标（/metrics）'
             }
         }
 
@@ -348,6 +596,33 @@ def create_app():
         """通过助记词生成TRON地址"""
         return tron_api.generate_address_with_mnemonic()
 
+    @app.route('/v1/createAddresses', methods=['GET', 'POST'])
+    def create_addresses():
+        """批量生成TRON地址，以NDJSON格式逐行返回"""
+        count = request.args.get('count') or request.form.get('count')
+        with_mnemonic = (request.args.get('mnemonic') or request.form.get('mnemonic') or '0') not in ('0', 'false')
+        max_count = app.config['BULK_ADDRESS_MAX_COUNT']
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            return tron_api._error_response('生成数量格式错误')
+        if count < 1 or count > max_count:
+            return tron_api._error_response(f'生成数量需在1到{max_count}之间')
+        if not CRYPTO_AVAILABLE:
+            return tron_api._error_response('缺少coincurve/pycryptodome/base58依赖，无法批量生成地址')
+
+        batches = iter_address_batches(count, with_mnemonic, app.config['BULK_ADDRESS_WORKERS'],
+                                       app.config['BULK_ADDRESS_CHUNK_SIZE'])
+        return Response(stream_with_context(batches), mimetype='application/x-ndjson')
+
+    @app.route('/v1/deriveAddresses', methods=['GET', 'POST'])
+    def derive_addresses():
+        """从助记词或账户xpub按BIP-44推导地址"""
+        def param(name):
+            return request.args.get(name) or request.form.get(name)
+        return tron_api.derive_addresses(param('mnemonic'), param('xpub'), param('account'),
+                                         param('start'), param('count'), param('passphrase'))
+
     @app.route('/v1/getAddressByKey', methods=['GET', 'POST'])
     def get_address_by_key():
         """根据私钥获取地址信息"""
@@ -364,9 +639,10 @@ def create_app():
 
     @app.route('/v1/getTrc20Balance', methods=['GET', 'POST'])
     def get_trc20_balance():
-        """查询TRC20代币余额（如USDT）"""
+        """查询TRC20代币余额（默认USDT）"""
         address = request.args.get('address') or request.form.get('address')
-        return tron_api.get_trc20_balance(address)
+        contract = request.args.get('contract') or request.form.get('contract')
+        return tron_api.get_trc20_balance(address, contract)
 
     @app.route('/v1/getTrc10Info', methods=['GET', 'POST'])
     def get_trc10_info():
@@ -375,8 +651,38 @@ def create_app():
         token_id = request.args.get('tokenId') or request.form.get('tokenId')
         return tron_api.get_trc10_info(address, token_id)
 
+    @app.route('/v1/batch/balances', methods=['POST'])
+    def get_batch_balances():
+        """批量查询余额"""
+        payload = request.get_json(silent=True) or {}
+        addresses = payload.get('addresses')
+        if addresses is None and request.form.get('addresses'):
+            addresses = [a.strip() for a in request.form.get('addresses').split(',') if a.strip()]
+        return tron_api.get_batch_balances(addresses, payload.get('assets'))
+
+    def list_param(name, payload):
+        """列表参数：JSON数组，或逗号分隔的查询参数"""
+        if isinstance(payload.get(name), list):
+            return payload[name]
+        value = request.args.get(name) or request.form.get(name)
+        if value:
+            return [item.strip() for item in value.split(',') if item.strip()]
+        return None
+
+    @app.route('/v1/getPortfolio', methods=['GET', 'POST'])
+    def get_portfolio():
+        """组合余额查询"""
+        payload = request.get_json(silent=True) or {}
+        addresses = list_param('addresses', payload) or list_param('address', payload)
+        return tron_api.get_portfolio(addresses, list_param('tokens', payload))
+
     # ==================== 转账相关接口 ====================
 
+    def idempotency_key():
+        """幂等键：Idempotency-Key请求头或idempotencyKey参数"""
+        return (request.headers.get('Idempotency-Key') or request.args.get('idempotencyKey')
+                or request.form.get('idempotencyKey'))
+
     @app.route('/v1/sendTrx', methods=['GET', 'POST'])
     def send_trx():
         """TRX转账"""
@@ -384,24 +690,42 @@ def create_app():
         amount = request.args.get('amount') or request.form.get('amount')
         key = request.args.get('key') or request.form.get('key')
         message = request.args.get('message') or request.form.get('message')
-        return tron_api.send_trx(to, amount, key, message)
+        return tron_api.send_trx(to, amount, key, message, idempotency_key())
 
     @app.route('/v1/sendTrc20', methods=['GET', 'POST'])
     def send_trc20():
         """TRC20代币转账（如USDT）"""
         to = request.args.get('to') or request.form.get('to')
-        amount = request.args.get('amount') or request.form.get('amount', '1.000001')
+        amount = request.args.get('amount') or request.form.get('amount')
         key = request.args.get('key') or request.form.get('key')
-        return tron_api.send_trc20(to, amount, key)
+        return tron_api.send_trc20(to, amount, key, idempotency_key())
 
     @app.route('/v1/sendTrc10', methods=['GET', 'POST'])
     def send_trc10():
         """TRC10代币转账"""
         to = request.args.get('to') or request.form.get('to')
-        amount = request.args.get('amount') or request.form.get('amount', '1')
+        amount = request.args.get('amount') or request.form.get('amount')
         key = request.args.get('key') or request.form.get('key')
         token_id = request.args.get('tokenId') or request.form.get('tokenId', '1002992')
-        return tron_api.send_trc10(to, amount, key, token_id)
+        return tron_api.send_trc10(to, amount, key, token_id, idempotency_key())
+
+    @app.route('/v1/batch/send', methods=['POST'])
+    def send_batch():
+        """批量转账"""
+        payload = request.get_json(silent=True) or {}
+        return tron_api.send_batch(payload.get('transfers'), payload.get('key'))
+
+    @app.route('/v1/payouts', methods=['POST'])
+    def submit_payouts():
+        """批量提交转账到队列"""
+        payload = request.get_json(silent=True) or {}
+        return tron_api.submit_payouts(payload.get('payouts'), payload.get('key'))
+
+    @app.route('/v1/getPayout', methods=['GET', 'POST'])
+    def get_payout():
+        """查询队列中的转账"""
+        payout_id = request.args.get('id') or request.form.get('id')
+        return tron_api.get_payout(payout_id, idempotency_key())
 
     # ==================== 交易查询相关接口 ====================
 
@@ -417,21 +741,153 @@ def create_app():
         tx_id = request.args.get('txID') or request.form.get('txID')
         return tron_api.get_trc20_transaction_receipt(tx_id)
 
+    @app.route('/v1/getTrc20Transfers', methods=['GET', 'POST'])
+    def get_trc20_transfers():
+        """查询地址的USDT转账记录"""
+        address = request.args.get('address') or request.form.get('address')
+        since_block = request.args.get('sinceBlock') or request.form.get('sinceBlock')
+        cursor = request.args.get('cursor') or request.form.get('cursor')
+        limit = request.args.get('limit') or request.form.get('limit')
+        direction = request.args.get('direction') or request.form.get('direction')
+        return tron_api.get_trc20_transfers(address, since_block, cursor, limit, direction)
+
     # ==================== 区块链信息查询接口 ====================
 
     @app.route('/v1/getBlockHeight', methods=['GET', 'POST'])
     def get_block_height():
         """获取当前区块高度"""
-        return tron_api.get_block_height()
+        detail = request.args.get('detail') or request.form.get('detail')
+        fields = request.args.get('fields') or request.form.get('fields')
+        return tron_api.get_block_height(detail, fields)
 
     @app.route('/v1/getBlockByNumber', methods=['GET', 'POST'])
     def get_block_by_number():
         """根据区块号查询区块信息"""
         block_id = request.args.get('blockID') or request.form.get('blockID')
-        return tron_api.get_block_by_number(block_id)
+        detail = request.args.get('detail') or request.form.get('detail')
+        fields = request.args.get('fields') or request.form.get('fields')
+        return tron_api.get_block_by_number(block_id, detail, fields)
+
+    # ==================== 事件推送接口 ====================
+
+    @app.route('/v1/stream', methods=['GET'])
+    def stream_events():
+        """订阅新区块和地址转账事件（Server-Sent Events）"""
+        blocks = (request.args.get('blocks') or '1') not in ('0', 'false')
+        addresses = [a.strip() for a in (request.args.get('addresses') or '').split(',') if a.strip()]
+        if not blocks and not addresses:
+            return tron_api._error_response('至少订阅新区块或一个地址')
+        if len(addresses) > app.config['STREAM_MAX_ADDRESSES']:
+            return tron_api._error_response(f"单个订阅最多关注{app.config['STREAM_MAX_ADDRESSES']}个地址")
+
+        # 断线重连时浏览器会带上Last-Event-ID，补发之后的事件
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+        last_block = None
+        if last_event_id:
+            try:
+                last_block = int(last_event_id.split(':', 1)[0])
+            except ValueError:
+                return tron_api._error_response('lastEventId格式错误')
+
+        try:
+            subscription = event_hub.subscribe(blocks, addresses, last_block)
+        except Exception as e:
+            return tron_api._error_response(f'订阅失败：{str(e)}')
+        block_follower.ensure_started()
+        keepalive = app.config['STREAM_KEEPALIVE']
+
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                while not subscription.closed:
+                    event = subscription.get(timeout=keepalive)
+                    yield format_sse(event) if event else ': keep-alive\n\n'
+            finally:
+                subscription.close()
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
 
     return app
 
+def start_background_tasks(app, indexer=True):
+    """
+    启动后台线程
+
+    Args:
+        indexer: True立即启动区块索引；False不启动；也可以传入函数，由其决定何时启动
+            （多进程部署时通过文件锁只让一个工作进程运行索引）
+    """
+    tron_api = app.extensions['tron_api']
+
+    # 配置多个上游节点时，后台定期探测节点健康状态和区块高度
+    if len(tron_api.router.endpoints) > 1 and app.config.get('UPSTREAM_HEALTH_INTERVAL'):
+        tron_api.router.start_health_checks(tron_api._probe_upstream, app.config['UPSTREAM_HEALTH_INTERVAL'])
+
+    # 转账队列的存储使用SQLite事务领取任务，多个进程同时运行不会重复广播
+    if 'payout_queue' in app.extensions:
+        app.extensions['payout_queue'].start()
+
+    if 'chain_indexer' in app.extensions and indexer:
+        if callable(indexer):
+            indexer(app.extensions['chain_indexer'].start)
+        else:
+            app.extensions['chain_indexer'].start()
+
+def warm_up(app):
+    """
+    预先加载首次请求才会用到的模块和数据
+
+    多进程部署时在主进程中调用，fork出的工作进程通过写时复制共享，
+    不需要各自加载，首个请求也不会因加载而变慢。
+    """
+    from app.api import hd_wallet  # noqa: F401
+    from app.api.address_factory import get_mnemonic
+    get_mnemonic()
+    try:
+        from app.api import asgi  # noqa: F401
+    except ImportError:
+        pass
+
+def drain(app):
+    """
+    开始平滑退出：不阻塞地通知后台线程停止
+
+    事件推送连接会一直保持，先关闭订阅让它们随即结束，
+    进行中的普通请求由服务器在 graceful_timeout 内处理完。
+    """
+    app.extensions['event_hub'].close_all()
+    for name in ('payout_queue', 'chain_indexer', 'block_follower'):
+        if name in app.extensions:
+            app.extensions[name].stop(timeout=0)
+    app.extensions['tron_api'].router.stop(timeout=0)
+
+def stop_background_tasks(app, timeout: float = 5):
+    """停止后台线程，等待进行中的上游请求完成后关闭连接池，最后写完队列中的日志"""
+    app.extensions['event_hub'].close_all()
+    for name in ('payout_queue', 'chain_indexer', 'block_follower'):
+        if name in app.extensions:
+            app.extensions[name].stop(timeout)
+    tron_api = app.extensions['tron_api']
+    tron_api.router.stop(timeout)
+    tron_api.shutdown(wait=True)
+    if 'worker_stats_publisher' in app.extensions:
+        app.extensions['worker_stats_publisher'].stop(timeout)
+    shutdown_logging()
+
+def create_asgi_app():
+    """
+    创建ASGI应用实例
+
+    链上查询接口由异步客户端处理，单进程即可保持大量进行中的上游请求，
+    其余路由复用create_app()创建的Flask应用。
+    启动示例：uvicorn --factory main:create_asgi_app --port 8765
+    """
+    from app.api.asgi import ASGIApp
+    return ASGIApp(create_app())
+
 if __name__ == '__main__':
     # 打印ASCII艺术字体
     print_ascii_art()
@@ -465,5 +921,7 @@ if __name__ == '__main__':
         browser_thread.daemon = True
         browser_thread.start()
 
-    app = create_app()
+    # debug模式的重载器会再启动一个子进程运行应用，后台线程（转账队列、区块索引、健康检查）只在子进程中启动，
+    # 避免两个进程同时签名同一个队列、重复写入索引
+    app = create_app(start_background=os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
     app.run(host=host, port=port, debug=True)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试公共夹具
+
+上游节点使用 benchmarks/mock_node.py 的本地模拟节点，测试不访问网络。
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 日志写到临时目录（logger模块导入时读取配置）
+os.environ.setdefault('LOG_DIR', tempfile.mkdtemp(prefix='tron-api-logs-'))
+
+import pytest
+
+from benchmarks.mock_node import MockTronNode
+
+
+@pytest.fixture
+def mock_node():
+    """本地模拟节点，测试中可直接修改 mock_node.fixtures 改变响应"""
+    node = MockTronNode().start()
+    yield node
+    node.stop()
+
+
+@pytest.fixture
+def tron_api(mock_node):
+    """只连接模拟节点、不启用缓存的TronAPI"""
+    from app.api.tron_api import TronAPI
+
+    api = TronAPI({'TRON_NODE_URLS': [mock_node.url], 'CACHE_ENABLED': False})
+    yield api
+    api.shutdown()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""ABI编解码：与tronpy的实现交叉校验，并做编码/解码往返"""
+
+import pytest
+from tronpy.abi import trx_abi
+from tronpy.keys import PrivateKey
+
+from app.api import abi
+
+ADDRESS = PrivateKey(bytes.fromhex('11' * 32)).public_key.to_base58check_address()
+OTHER = PrivateKey(bytes.fromhex('22' * 32)).public_key.to_base58check_address()
+
+
+def test_address_round_trip():
+    hex_address = abi.to_hex_address(ADDRESS)
+    assert hex_address == PrivateKey(bytes.fromhex('11' * 32)).public_key.to_hex_address()
+    assert abi.to_base58_address(hex_address) == ADDRESS
+    assert abi.to_base58_address(hex_address[2:]) == ADDRESS
+    assert abi.address_bytes(ADDRESS) == bytes.fromhex(hex_address)
+    assert abi.is_address(ADDRESS)
+    assert not abi.is_address(ADDRESS[:-1] + ('1' if ADDRESS[-1] != '1' else '2'))
+
+
+@pytest.mark.parametrize('value', [0, 1, 10 ** 18, 2 ** 256 - 1])
+def test_uint256_matches_tronpy(value):
+    encoded = abi.encode_uint256(value)
+    assert encoded == trx_abi.encode(['uint256'], [value]).hex()
+    assert abi.decode_uint256(encoded) == value
+
+
+def test_params_match_tronpy_and_round_trip():
+    types = ['address', 'uint256', 'bool', 'string', 'bytes']
+    values = [ADDRESS, 12345, True, '中文 symbol', b'\x00\x01\xff']
+    encoded = abi.encode_params(types, values)
+    assert encoded == trx_abi.encode(types, values).hex()
+    assert abi.decode_params(types, encoded) == values
+    assert abi.decode_params(types, '0x' + encoded) == values
+
+
+def test_decode_params_rejects_truncated_data():
+    encoded = abi.encode_params(['uint256', 'uint256'], [1, 2])
+    with pytest.raises(ValueError):
+        abi.decode_params(['uint256', 'uint256'], encoded[:-2])
+
+
+def test_decode_string_accepts_bytes32():
+    assert abi.decode_string(b'USDT'.ljust(32, b'\x00').hex()) == 'USDT'
+    assert abi.decode_string(abi.encode_params(['string'], ['Tether USD'])) == 'Tether USD'
+
+
+def test_trc20_transfer_data_matches_tronpy():
+    data = abi.trc20_transfer_data(ADDRESS, 5 * 10 ** 6)
+    assert data == bytes.fromhex('a9059cbb') + trx_abi.encode(['address', 'uint256'], [ADDRESS, 5 * 10 ** 6])
+    # hex地址与base58地址编码结果相同
+    assert abi.trc20_transfer_data(abi.to_hex_address(ADDRESS), 5 * 10 ** 6) == data
+    assert abi.TRANSFER_SELECTOR == abi.selector('transfer(address,uint256)') == 'a9059cbb'
+
+
+def test_encode_call():
+    encoded = abi.encode_call('balanceOf(address)', ['address'], [ADDRESS])
+    assert encoded == '70a08231' + trx_abi.encode(['address'], [ADDRESS]).hex()
+    assert abi.balance_of_parameter(ADDRESS) == encoded[8:]
+
+
+def test_multicall_matches_tronpy():
+    calls = [(ADDRESS, '70a08231' + abi.encode_address(OTHER)), (OTHER, '')]
+    encoded = abi.encode_multicall(calls, require_success=True)
+    expected = trx_abi.encode(['bool', '(address,bytes)[]'],
+                              [True, [(target, bytes.fromhex(data)) for target, data in calls]])
+    assert encoded == expected.hex()
+
+    returned = [(True, abi.encode_uint256(7)), (False, '')]
+    response = trx_abi.encode(['(bool,bytes)[]'], [[(ok, bytes.fromhex(data)) for ok, data in returned]])
+    assert abi.decode_multicall(response.hex()) == returned
+
+
+def test_decode_transfer_logs():
+    logs = [
+        {'address': abi.to_hex_address(OTHER)[2:],
+         'topics': [abi.TRANSFER_TOPIC, abi.encode_address(ADDRESS), abi.encode_address(OTHER)],
+         'data': abi.encode_uint256(42)},
+        {'address': abi.to_hex_address(OTHER)[2:], 'topics': ['00' * 32], 'data': ''}
+    ]
+    assert abi.decode_transfer_log(logs[0]) == (
+        abi.to_hex_address(OTHER), abi.to_hex_address(ADDRESS), abi.to_hex_address(OTHER), 42)
+    assert abi.decode_transfer_log(logs[1]) is None
+    assert abi.decode_transfer_logs(logs) == [(0, OTHER, ADDRESS, OTHER, 42)]
+
+
+def test_constant_result():
+    assert abi.constant_result({'constant_result': ['ab'], 'result': {'result': True}}) == 'ab'
+    assert abi.constant_result({}) is None
+    assert abi.constant_result({'constant_result': ['ab']}) is None
+
+
+def test_constant_result_rejects_revert():
+    # java-tron对revert的响应：省略 result.result，constant_result为Error(string)编码的revert原因
+    reason = abi.selector('Error(string)') + abi.encode_params(['string'], ['SafeMath: subtraction overflow'])
+    response = {
+        'result': {'code': 'CONTRACT_EXE_ERROR', 'message': 'REVERT opcode executed'.encode().hex()},
+        'energy_used': 903,
+        'constant_result': [reason],
+        'transaction': {'ret': [{'ret': 'FAILED'}], 'visible': False, 'txID': 'ab' * 32}
+    }
+    assert abi.constant_result(response) is None
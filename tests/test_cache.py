@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""响应缓存：TTL + LRU缓存和按区块固化状态计算TTL的缓存策略"""
+
+import types
+
+import pytest
+
+from app.api.cache_policy import BLOCK_INTERVAL, ChainCachePolicy
+from app.api.tron_api import TronAPI
+from app.utils import cache as cache_module
+from app.utils.cache import FOREVER, LRUTTLCache
+from app.utils.json_provider import RawJSON, dumps
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的单调时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _block(number: int):
+    return {'blockID': f'{number:016x}' + '00' * 24, 'block_header': {'raw_data': {'number': number}}}
+
+
+# ==================== LRUTTLCache ====================
+
+def test_cache_expires_entries(clock):
+    cache = LRUTTLCache()
+    cache.set('a', 1, ttl=3)
+    cache.set('b', 2, ttl=FOREVER)
+    assert cache.get('a') == 1
+    clock[0] += 3
+    assert cache.get('a') is None
+    assert cache.get('a', 'missing') == 'missing'
+    clock[0] += 10 ** 9
+    assert cache.get('b') == 2
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['entries']) == (2, 2, 1, 1)
+
+
+def test_cache_skips_uncacheable_values():
+    cache = LRUTTLCache(max_bytes=100)
+    cache.set('zero', 1, ttl=0)
+    cache.set('negative', 1, ttl=-1)
+    cache.set('too-big', 1, ttl=10, size=101)
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = LRUTTLCache(max_entries=2)
+    cache.set('a', 1, ttl=10)
+    cache.set('b', 2, ttl=10)
+    cache.get('a')  # a变为最近使用
+    cache.set('c', 3, ttl=10)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_cache_limits_bytes():
+    cache = LRUTTLCache(max_bytes=100)
+    cache.set('a', 1, ttl=10, size=60)
+    cache.set('b', 2, ttl=10, size=30)
+    cache.set('a', 3, ttl=10, size=50)  # 覆盖写入时扣除旧条目大小
+    assert cache.get_stats()['bytes'] == 80
+    cache.set('c', 4, ttl=10, size=40)
+    assert cache.get('b') is None and cache.get('a') == 3 and cache.get('c') == 4
+    assert cache.get_stats()['bytes'] == 90
+
+    cache.delete('a')
+    assert cache.get_stats()['bytes'] == 40
+    cache.clear()
+    assert cache.get_stats()['entries'] == 0 and cache.get_stats()['bytes'] == 0
+
+
+# ==================== ChainCachePolicy ====================
+
+def test_policy_short_ttl_for_head_data():
+    policy = ChainCachePolicy()
+    assert policy.ttl_for('/wallet/getnowblock', _block(100)) == BLOCK_INTERVAL
+    assert policy.head == 100
+    assert policy.ttl_for('/wallet/getaccount', {'balance': 1}) == BLOCK_INTERVAL
+    assert policy.ttl_for('/wallet/getassetissuebyid', {'id': '1002000'}) == FOREVER
+
+
+def test_policy_caches_solidified_blocks_forever():
+    policy = ChainCachePolicy(solidified_depth=19)
+    policy.observe_head(100)
+    assert policy.ttl_for('/wallet/getblockbynum', _block(81)) == FOREVER
+    assert policy.ttl_for('/wallet/getblockbynum', _block(82)) == BLOCK_INTERVAL
+    assert policy.ttl_for('/wallet/gettransactioninfobyid', {'id': 'aa', 'blockNumber': 50}) == FOREVER
+    assert policy.ttl_for('/wallet/gettransactioninfobyid', {'id': 'aa', 'blockNumber': 95}) == BLOCK_INTERVAL
+
+    # 最新高度只增不减
+    policy.observe_head(90)
+    assert policy.head == 100
+
+
+def test_policy_without_head_uses_short_ttl():
+    assert ChainCachePolicy().ttl_for('/wallet/getblockbynum', _block(5)) == BLOCK_INTERVAL
+
+
+@pytest.mark.parametrize('response', [{}, {'error': 'timeout'}, {'Error': 'class org.tron...'}, None, []])
+def test_policy_does_not_cache_errors(response):
+    policy = ChainCachePolicy()
+    policy.observe_head(100)
+    assert policy.ttl_for('/wallet/gettransactioninfobyid', response) == 0
+    assert policy.ttl_for('/wallet/getaccount', response) == 0
+
+
+def test_policy_overrides():
+    policy = ChainCachePolicy(overrides={'/wallet/getaccount': 0, '/wallet/getblockbynum': 0,
+                                         '/wallet/getchainparameters': 60})
+    assert not policy.is_cacheable('/wallet/getaccount')
+    assert not policy.is_cacheable('/wallet/getblockbynum')
+    assert policy.is_cacheable('/wallet/getchainparameters')
+    assert policy.is_cacheable('/wallet/getblockbyid')
+    assert not policy.is_cacheable('/wallet/broadcasthex')
+    assert policy.ttl_for('/wallet/getchainparameters', {'chainParameter': []}) == 60
+
+
+# ==================== TronAPI ====================
+
+def test_tron_api_serves_repeated_reads_from_cache(mock_node):
+    api = TronAPI({'TRON_NODE_URLS': [mock_node.url]})
+    try:
+        for _ in range(3):
+            assert api._make_request('/wallet/getassetissuebyid', 'POST', {'value': '1002000'})
+        # 写操作不缓存
+        api._make_request('/wallet/broadcasthex', 'POST', {'transaction': '00'})
+        api._make_request('/wallet/broadcasthex', 'POST', {'transaction': '00'})
+        stats = mock_node.get_stats()
+        assert stats['/wallet/getassetissuebyid'] == 1
+        assert stats['/wallet/broadcasthex'] == 2
+        assert api.get_cache_stats()['hits'] == 2
+    finally:
+        api.shutdown()
+
+
+def test_policy_reads_block_number_from_raw_response():
+    policy = ChainCachePolicy()
+    policy.observe_head(1000)
+    block = dict(_block(900), transactions=[{'txID': f'{i:064x}', 'raw_data': {'number': 999}} for i in range(200)])
+    raw = RawJSON(dumps(block))
+    assert policy.ttl_for('/wallet/getblockbynum', raw, {'num': 900}) == FOREVER
+    assert policy.ttl_for('/wallet/getblockbyid', raw, {'value': _block(990)['blockID']}) == BLOCK_INTERVAL
+    # 没有请求参数时在交易列表之前查找区块号
+    assert policy.ttl_for('/wallet/getblockbynum', raw) == FOREVER
+    assert raw._parsed is None  # 大区块没有被完整解析
+
+    # 较小的响应完整解析，空结果不缓存
+    assert policy.ttl_for('/wallet/getblockbynum', RawJSON(b'{}'), {'num': 900}) == 0
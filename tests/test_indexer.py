@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""本地区块索引：区块/交易/Transfer日志的存储和查询，索引器从模拟节点增量同步已固化区块"""
+
+import pytest
+from tronpy.keys import PrivateKey
+
+from app.api import abi
+from app.api.block_store import BlockStore
+from app.api.indexer import ChainIndexer
+
+USDT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+OTHER_TOKEN = PrivateKey(bytes.fromhex('55' * 32)).public_key.to_base58check_address()
+ALICE = PrivateKey(bytes.fromhex('11' * 32)).public_key.to_base58check_address()
+BOB = PrivateKey(bytes.fromhex('22' * 32)).public_key.to_base58check_address()
+
+
+def _log(contract: str, sender: str, recipient: str, amount: int) -> dict:
+    return {'address': abi.to_hex_address(contract)[2:],
+            'topics': [abi.TRANSFER_TOPIC, abi.encode_address(sender), abi.encode_address(recipient)],
+            'data': abi.encode_uint256(amount)}
+
+
+def _block(number: int, tx_ids=()) -> dict:
+    return {
+        'blockID': f'{number:016x}' + 'ab' * 24,
+        'block_header': {'raw_data': {'number': number, 'timestamp': number * 3000}},
+        'transactions': [{'txID': tx_id, 'raw_data': {'timestamp': number}} for tx_id in tx_ids]
+    }
+
+
+def _info(tx_id: str, number: int, *logs) -> dict:
+    return {'id': tx_id, 'blockNumber': number, 'blockTimeStamp': number * 3000, 'log': list(logs)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BlockStore(str(tmp_path / 'index' / 'chain.db'), tracked_contracts=[USDT])
+    yield store
+    store.close()
+
+
+# ==================== BlockStore ====================
+
+def test_save_and_query_blocks(store):
+    tx_a, tx_b = 'aa' * 32, 'bb' * 32
+    store.save_blocks([
+        {'block': _block(100, [tx_a, tx_b]), 'infos': [_info(tx_a, 100, _log(USDT, ALICE, BOB, 5))]},
+        {'block': _block(101), 'infos': []}
+    ])
+
+    block = store.get_block_by_number(100)
+    assert [tx['txID'] for tx in block['transactions']] == [tx_a, tx_b]
+    assert 'transactions' not in store.get_block_by_number(100, with_transactions=False)
+    assert store.get_block_by_id(_block(101)['blockID']) == {
+        'blockID': _block(101)['blockID'], 'block_header': _block(101)['block_header']}
+    assert store.get_block_by_number(102) is None
+
+    assert store.get_transaction(tx_b) == {'txID': tx_b, 'raw_data': {'timestamp': 100}}
+    assert store.get_transaction_info(tx_a)['id'] == tx_a
+    # 没有回执的交易
+    assert store.get_transaction_info(tx_b) is None
+    assert store.get_transaction('cc' * 32) is None
+
+    assert store.get_stats() == {'path': store.path, 'lowest_block': 100, 'highest_block': 101, 'blocks': 2}
+
+
+def test_address_transfers(store):
+    tx_a, tx_b, tx_c = 'aa' * 32, 'bb' * 32, 'cc' * 32
+    store.save_blocks([
+        {'block': _block(100, [tx_a, tx_b]), 'infos': [
+            _info(tx_a, 100, _log(USDT, ALICE, BOB, 5), _log(OTHER_TOKEN, ALICE, BOB, 7)),
+            _info(tx_b, 100, _log(USDT, BOB, ALICE, 3))
+        ]},
+        {'block': _block(101, [tx_c]), 'infos': [_info(tx_c, 101, _log(USDT, ALICE, ALICE, 1))]}
+    ])
+
+    # 只记录跟踪合约的转账；日志序号在区块内连续编号
+    transfers = store.get_address_transfers(ALICE)
+    assert [(t['block_number'], t['log_index'], t['direction'], t['amount']) for t in transfers] == [
+        (100, 0, 'out', '5'), (100, 2, 'in', '3'), (101, 0, 'self', '1')]
+    assert transfers[0]['counterparty'] == BOB and transfers[0]['contract'] == USDT
+
+    assert [t['amount'] for t in store.get_address_transfers(ALICE, direction='in')] == ['3', '1']
+    assert [t['amount'] for t in store.get_address_transfers(ALICE, direction='out')] == ['5', '1']
+    assert [t['amount'] for t in store.get_address_transfers(ALICE, after=(100, 0), limit=1)] == ['3']
+    assert [t['amount'] for t in store.get_address_transfers(ALICE, since_block=101)] == ['1']
+    # 重复写入同一批区块是幂等的
+    store.save_blocks([{'block': _block(101, [tx_c]), 'infos': [_info(tx_c, 101, _log(USDT, ALICE, ALICE, 1))]}])
+    assert len(store.get_address_transfers(ALICE)) == 3
+
+
+def test_tracked_contracts_change_rebuilds_address_index(tmp_path):
+    path = str(tmp_path / 'chain.db')
+    store = BlockStore(path, tracked_contracts=[USDT])
+    store.save_blocks([{'block': _block(100, ['aa' * 32]), 'infos': [
+        _info('aa' * 32, 100, _log(USDT, ALICE, BOB, 5), _log(OTHER_TOKEN, ALICE, BOB, 7))]}])
+    store.close()
+
+    store = BlockStore(path, tracked_contracts=[OTHER_TOKEN])
+    try:
+        assert [t['amount'] for t in store.get_address_transfers(BOB)] == ['7']
+    finally:
+        store.close()
+
+
+# ==================== ChainIndexer ====================
+
+def test_indexer_syncs_solidified_blocks(tron_api, mock_node, store):
+    template = mock_node.fixtures['/wallet/getblockbynum']
+    tx_ids = [tx['txID'] for tx in template['transactions']]
+    mock_node.fixtures['/wallet/gettransactioninfobyblocknum'] = [
+        _info(tx_ids[0], 0, _log(USDT, ALICE, BOB, 1000000))]
+
+    target = mock_node.head_block() - 19
+    indexer = ChainIndexer(tron_api, store, start_block=target - 9, confirmations=19, workers=2, batch_size=2)
+    assert indexer.sync_once() is False
+    assert indexer.last_indexed == target - 6
+    for _ in range(10):
+        if indexer.sync_once():
+            break
+    assert indexer.last_indexed >= target
+
+    stats = indexer.get_stats()
+    assert stats['lowest_block'] == target - 9 and stats['highest_block'] == indexer.last_indexed
+    assert stats['blocks'] == indexer.last_indexed - target + 10
+    assert stats['running'] is False and stats['last_error'] is None
+
+    block = store.get_block_by_number(target)
+    assert block['block_header']['raw_data']['number'] == target
+    assert len(block['transactions']) == len(tx_ids)
+    assert store.get_address_transfers(BOB, since_block=target)[0]['amount'] == '1000000'
+
+    # 已追上固化高度时不请求区块
+    mock_node.reset_stats()
+    indexer.sync_once()
+    assert mock_node.get_stats().get('/wallet/getblockbynum', 0) <= 1
+
+
+def test_indexer_keeps_progress_when_block_is_missing(tron_api, mock_node, store):
+    mock_node.fixtures['/wallet/getblockbynum'] = None
+    indexer = ChainIndexer(tron_api, store, start_block=100, workers=1, batch_size=2)
+    with pytest.raises(RuntimeError, match='区块100不存在'):
+        indexer.sync_once()
+    assert indexer.last_indexed == 0 and store.get_stats()['blocks'] == 0
+
+
+def test_tron_api_reads_local_index_first(tron_api, mock_node, store):
+    tx_id = 'aa' * 32
+    store.save_blocks([{'block': _block(100, [tx_id]), 'infos': [_info(tx_id, 100)]}])
+    tron_api.block_store = store
+
+    assert tron_api.get_transaction(tx_id)['data']['txID'] == tx_id
+    assert tron_api.get_trc20_transaction_receipt(tx_id)['data']['blockNumber'] == 100
+    assert tron_api.get_block_by_number('100')['code'] == 1
+    assert mock_node.get_stats()['total'] == 0
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""转账队列：幂等键、领取与归还、上链确认和过期重新排队"""
+
+import time
+
+import pytest
+from tronpy.keys import PrivateKey
+
+from app.api import payout_queue
+from app.api.payout_queue import CLAIMED, FAILED, QUEUED, SENDING, SUCCESS, PayoutScheduler, PayoutStore
+
+KEY = PrivateKey(bytes.fromhex('11' * 32)).hex()
+SENDER = PrivateKey(bytes.fromhex('11' * 32)).public_key.to_base58check_address()
+RECIPIENT = PrivateKey(bytes.fromhex('22' * 32)).public_key.to_base58check_address()
+INFO_PATH = '/wallet/gettransactioninfobyid'
+SOLID_INFO_PATH = '/walletsolidity/gettransactioninfobyid'
+SOLID_BLOCK_PATH = '/walletsolidity/getnowblock'
+REVERT_MESSAGE = 'transfer amount exceeds balance'.encode().hex()
+
+
+@pytest.fixture
+def store():
+    store = PayoutStore(':memory:')
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def scheduler(tron_api, store):
+    return PayoutScheduler(tron_api, store, confirm_interval=0, expiry_grace=30)
+
+
+def _record(key: str, amount: str = '1'):
+    return {'idempotency_key': key, 'fingerprint': f'fp-{amount}', 'sender': SENDER, 'type': 'trx',
+            'to': RECIPIENT, 'amount': amount}
+
+
+def _signed(scheduler, mock_node, expiration: float):
+    """提交一笔转账并标记为已签名待确认"""
+    payout = scheduler.submit([{'to': RECIPIENT, 'amount': '1', 'idempotencyKey': 'order-1'}], KEY)[0]
+    rows = scheduler.store.claim(SENDER, 10, scheduler.owner)
+    scheduler.store.mark_signed([(rows[0]['id'], 'aa' * 32, '00', expiration)])
+    mock_node.reset_stats()
+    return payout['id']
+
+
+# ==================== 存储 ====================
+
+def test_enqueue_is_idempotent(store):
+    (row, created), = store.enqueue([_record('order-1')])
+    assert created and row['status'] == QUEUED
+    (again, created), = store.enqueue([_record('order-1', amount='2')])
+    assert not created and again['id'] == row['id'] and again['amount'] == '1'
+    assert store.counts() == {QUEUED: 1}
+
+
+def test_submit_rejects_key_reuse_with_different_parameters(scheduler):
+    first, = scheduler.submit([{'to': RECIPIENT, 'amount': '1', 'idempotencyKey': 'order-1'}], KEY)
+    assert first['success'] and not first['duplicate'] and first['from'] == SENDER
+
+    same, = scheduler.submit([{'to': RECIPIENT, 'amount': '1', 'idempotencyKey': 'order-1'}], KEY)
+    assert same['success'] and same['duplicate'] and same['id'] == first['id']
+
+    conflict, = scheduler.submit([{'to': RECIPIENT, 'amount': '2', 'idempotencyKey': 'order-1'}], KEY)
+    assert not conflict['success'] and conflict['duplicate'] and conflict['id'] == first['id']
+    assert '参数不同' in conflict['error']
+    assert scheduler.store.counts() == {QUEUED: 1}
+
+
+def test_submit_validates_each_payout(scheduler):
+    results = scheduler.submit([{'to': 'bad', 'amount': '1'}, 'x', {'to': RECIPIENT, 'amount': '1'}], KEY)
+    assert [result['success'] for result in results] == [False, False, True]
+    assert len(results[2]['idempotencyKey']) == 32  # 未指定时生成幂等键
+    with pytest.raises(ValueError):
+        scheduler.submit([{'to': RECIPIENT, 'amount': '1'}], 'not-a-key')
+
+
+def test_claim_and_release(store):
+    store.enqueue([_record(f'order-{i}') for i in range(3)])
+    claimed = store.claim(SENDER, 2, 'worker-a')
+    assert [row['idempotency_key'] for row in claimed] == ['order-0', 'order-1']
+    assert [row['idempotency_key'] for row in store.claim(SENDER, 10, 'worker-b')] == ['order-2']
+    assert store.claim(SENDER, 10, 'worker-c') == []
+    assert store.counts() == {CLAIMED: 3}
+
+    # 已签名的转账不会被归还
+    store.mark_signed([(claimed[0]['id'], 'aa' * 32, '00', time.time() + 60)])
+    store.release([row['id'] for row in claimed])
+    assert store.get(claimed[0]['id'])['status'] == SENDING
+    assert store.get(claimed[1]['id'])['status'] == QUEUED
+    assert store.get(claimed[1]['id'])['owner'] is None
+    assert store.pending_senders() == [SENDER]
+
+
+def test_release_stale_claims(store):
+    store.enqueue([_record('order-1')])
+    row, = store.claim(SENDER, 1, 'worker-a')
+    store.release_stale_claims(older_than=60)
+    assert store.get(row['id'])['status'] == CLAIMED
+    store.release_stale_claims(older_than=-1)
+    assert store.get(row['id'])['status'] == QUEUED
+
+
+def test_mark_checks_tx_id(store):
+    store.enqueue([_record('order-1')])
+    row, = store.claim(SENDER, 1, 'worker-a')
+    store.mark_signed([(row['id'], 'aa' * 32, '00', time.time() + 60)])
+    store.mark(row['id'], SUCCESS, tx_id='bb' * 32)
+    assert store.get(row['id'])['status'] == SENDING
+    store.mark(row['id'], SUCCESS, tx_id='aa' * 32)
+    assert store.get(row['id'])['status'] == SUCCESS
+
+
+# ==================== 上链确认 ====================
+
+@pytest.mark.parametrize('info, expected', [
+    ({}, None),
+    ({'id': 'aa'}, None),
+    ({'id': 'aa', 'blockNumber': 5, 'receipt': {'net_usage': 267}}, (SUCCESS, None)),
+    ({'id': 'aa', 'blockNumber': 5, 'receipt': {'result': 'SUCCESS', 'energy_usage_total': 13000}}, (SUCCESS, None)),
+    ({'id': 'aa', 'blockNumber': 5, 'result': 'FAILED', 'resMessage': REVERT_MESSAGE,
+      'receipt': {'result': 'REVERT'}}, (FAILED, '合约执行失败：REVERT（transfer amount exceeds balance）')),
+    ({'id': 'aa', 'blockNumber': 5, 'receipt': {'result': 'OUT_OF_ENERGY'}},
+     (FAILED, '合约执行失败：OUT_OF_ENERGY'))
+])
+def test_receipt_outcome(info, expected):
+    assert payout_queue.receipt_outcome(info) == expected
+
+
+def test_reconcile_confirms_success(scheduler, mock_node):
+    payout_id = _signed(scheduler, mock_node, time.time() + 60)
+    mock_node.fixtures[INFO_PATH] = {'id': 'aa' * 32, 'blockNumber': 5, 'receipt': {'net_usage': 267}}
+    scheduler._reconcile(SENDER)
+    row = scheduler.store.get(payout_id)
+    assert row['status'] == SUCCESS and row['tx_id'] == 'aa' * 32
+    assert scheduler.finished[SUCCESS] == 1
+
+
+def test_reconcile_marks_reverted_transfer_failed(scheduler, mock_node):
+    payout_id = _signed(scheduler, mock_node, time.time() + 60)
+    mock_node.fixtures[INFO_PATH] = {'id': 'aa' * 32, 'blockNumber': 5, 'result': 'FAILED',
+                                     'receipt': {'result': 'OUT_OF_ENERGY'}}
+    scheduler._reconcile(SENDER)
+    row = scheduler.store.get(payout_id)
+    assert row['status'] == FAILED and 'OUT_OF_ENERGY' in row['error']
+
+
+def test_reconcile_rebroadcasts_pending_transaction(scheduler, mock_node):
+    payout_id = _signed(scheduler, mock_node, time.time() + 60)
+    mock_node.fixtures[INFO_PATH] = None
+    scheduler._reconcile(SENDER)
+    assert scheduler.store.get(payout_id)['status'] == SENDING
+    assert mock_node.get_stats().get('/wallet/broadcasthex') == 1
+
+    # 同一交易在confirm_interval内不重复查询
+    scheduler.confirm_interval = 60
+    scheduler._reconcile(SENDER)
+    scheduler._reconcile(SENDER)
+    assert mock_node.get_stats().get(INFO_PATH) == 2
+
+
+def _solidified_at(timestamp: float):
+    return {'blockID': '00' * 32, 'block_header': {'raw_data': {'number': 5, 'timestamp': int(timestamp * 1000)}}}
+
+
+def test_scheduler_grace_covers_upstream_lag(tron_api, store):
+    scheduler = PayoutScheduler(tron_api, store, expiry_grace=0)
+    assert scheduler.expiry_grace == tron_api.router.max_lag * 3
+
+
+def test_reconcile_requeues_expired_transaction(scheduler, mock_node):
+    expiration = time.time() - scheduler.expiry_grace - 1
+    payout_id = _signed(scheduler, mock_node, expiration)
+    mock_node.fixtures[INFO_PATH] = None
+    mock_node.fixtures[SOLID_INFO_PATH] = None
+    mock_node.fixtures[SOLID_BLOCK_PATH] = _solidified_at(time.time())
+    scheduler._reconcile(SENDER)
+    row = scheduler.store.get(payout_id)
+    assert row['status'] == QUEUED
+    assert row['tx_id'] is None and row['tx_hex'] is None and row['expiration'] is None
+    assert row['attempts'] == 1
+    # 过期的交易不再重发
+    assert '/wallet/broadcasthex' not in mock_node.get_stats()
+
+
+def test_reconcile_waits_until_solidified_past_expiration(scheduler, mock_node):
+    # 节点返回空结果，但固化区块还没有越过过期时间：交易仍可能已上链，不能重新签名
+    expiration = time.time() - scheduler.expiry_grace - 1
+    payout_id = _signed(scheduler, mock_node, expiration)
+    mock_node.fixtures[INFO_PATH] = None
+    mock_node.fixtures[SOLID_INFO_PATH] = None
+    mock_node.fixtures[SOLID_BLOCK_PATH] = _solidified_at(expiration)
+    scheduler._reconcile(SENDER)
+    assert scheduler.store.get(payout_id)['status'] == SENDING
+
+    # 查不到固化区块时同样不做判断
+    mock_node.fixtures[SOLID_BLOCK_PATH] = None
+    scheduler._reconcile(SENDER)
+    assert scheduler.store.get(payout_id)['status'] == SENDING
+
+
+def test_reconcile_confirms_expired_transaction_from_solidified_data(scheduler, mock_node):
+    # 落后的节点查不到回执，固化数据中已有
+    payout_id = _signed(scheduler, mock_node, time.time() - scheduler.expiry_grace - 1)
+    mock_node.fixtures[INFO_PATH] = None
+    mock_node.fixtures[SOLID_INFO_PATH] = {'id': 'aa' * 32, 'blockNumber': 5, 'receipt': {'net_usage': 267}}
+    mock_node.fixtures[SOLID_BLOCK_PATH] = _solidified_at(time.time())
+    scheduler._reconcile(SENDER)
+    assert scheduler.store.get(payout_id)['status'] == SUCCESS
+
+
+def test_reconcile_keeps_expired_transaction_within_grace(scheduler, mock_node):
+    payout_id = _signed(scheduler, mock_node, time.time() - 1)
+    mock_node.fixtures[INFO_PATH] = None
+    scheduler._reconcile(SENDER)
+    assert scheduler.store.get(payout_id)['status'] == SENDING
+
+
+# ==================== 出队 ====================
+
+def test_process_once_signs_and_broadcasts(scheduler, mock_node):
+    payout = scheduler.submit([{'to': RECIPIENT, 'amount': '1', 'idempotencyKey': 'order-1'}], KEY)[0]
+    mock_node.fixtures['/wallet/getaccountresource'] = {'freeNetLimit': 600}
+    assert scheduler.process_once()
+    row = scheduler.store.get(payout['id'])
+    # 广播成功只代表节点已接收，等待上链回执
+    assert row['status'] == SENDING and len(row['tx_id']) == 64 and row['attempts'] == 1
+
+    mock_node.fixtures[INFO_PATH] = {'id': row['tx_id'], 'blockNumber': 5, 'receipt': {'net_usage': 267}}
+    scheduler.process_once()
+    assert scheduler.wait(payout['id'], 0)['status'] == SUCCESS
+
+
+def test_process_once_pauses_without_resources(scheduler, mock_node):
+    payout = scheduler.submit([{'to': RECIPIENT, 'amount': '1'}], KEY)[0]
+    mock_node.fixtures['/wallet/getaccountresource'] = {'freeNetLimit': 600, 'freeNetUsed': 500}
+    assert not scheduler.process_once()
+    assert scheduler.store.get(payout['id'])['status'] == QUEUED
+    assert SENDER in scheduler.get_stats()['paused_senders']
+
+
+def test_drain_releases_claims_on_failure(scheduler, mock_node):
+    payouts = scheduler.submit([{'to': RECIPIENT, 'amount': '1'}, {'to': RECIPIENT, 'amount': '2'}], KEY)
+    scheduler.allow_burn = True
+    mock_node.fixtures['/wallet/getnowblock'] = None  # 取不到引用区块
+    with pytest.raises(ValueError):
+        scheduler.process_once()
+    assert [scheduler.store.get(payout['id'])['status'] for payout in payouts] == [QUEUED, QUEUED]
+
+
+def test_submit_rejects_payouts_the_sender_can_never_afford(scheduler, mock_node):
+    mock_node.fixtures['/wallet/getaccountresource'] = {'freeNetLimit': 600, 'EnergyLimit': 1000}
+    trx, trc20 = scheduler.submit([{'to': RECIPIENT, 'amount': '1'},
+                                   {'type': 'trc20', 'to': RECIPIENT, 'amount': '1', 'decimals': 6}], KEY)
+    assert trx['success']
+    assert not trc20['success'] and '能量上限' in trc20['error']
+    assert scheduler.store.counts() == {QUEUED: 1}
+
+    # 未激活的账户没有带宽
+    mock_node.fixtures['/wallet/getaccountresource'] = {}
+    rejected, = scheduler.submit([{'to': RECIPIENT, 'amount': '2'}], KEY)
+    assert not rejected['success'] and '带宽上限' in rejected['error']
+
+    # 允许燃烧TRX时不检查资源
+    scheduler.allow_burn = True
+    accepted, = scheduler.submit([{'type': 'trc20', 'to': RECIPIENT, 'amount': '1', 'decimals': 6}], KEY)
+    assert accepted['success']
+
+
+def test_drain_fails_payouts_beyond_resource_limits(scheduler, mock_node):
+    mock_node.fixtures['/wallet/getaccountresource'] = {'freeNetLimit': 600, 'EnergyLimit': 200000}
+    trc20, trx = scheduler.submit([{'type': 'trc20', 'to': RECIPIENT, 'amount': '1', 'decimals': 6},
+                                   {'to': RECIPIENT, 'amount': '1'}], KEY)
+    # 提交后解除了质押：TRC20转账等待也无法出账，后面的TRX转账照常广播
+    mock_node.fixtures['/wallet/getaccountresource'] = {'freeNetLimit': 600}
+    assert scheduler.process_once()
+    assert scheduler.store.get(trc20['id'])['status'] == FAILED
+    assert scheduler.store.get(trx['id'])['status'] == SENDING
+    assert SENDER not in scheduler.get_stats()['paused_senders']
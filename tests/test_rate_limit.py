@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""API Key池：令牌桶预约、Key轮换策略、429暂停和本地拒绝"""
+
+import types
+
+import pytest
+
+from app.api import rate_limit
+from app.api.rate_limit import ApiKeyPool, parse_retry_after
+from app.api.tron_api import TronAPI
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的单调时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_reserve_waits_after_burst_and_sheds_beyond_max_wait(clock):
+    pool = ApiKeyPool(['key-a'], rate=2, max_wait=1)
+    assert [pool.reserve()[1] for _ in range(2)] == [0, 0]
+    # 令牌用尽后预约未来令牌，由调用方等待
+    slot, wait = pool.reserve()
+    assert slot.key == 'key-a' and wait == pytest.approx(0.5)
+    assert pool.reserve()[1] == pytest.approx(1.0)
+    # 等待超过上限时本地拒绝，不消耗令牌
+    assert pool.reserve() == (None, pytest.approx(1.5))
+    assert pool.shed == 1
+
+    # 1秒补充2个令牌，抵消已预约的令牌
+    clock[0] += 1
+    assert pool.reserve()[1] == pytest.approx(0.5)
+    stats = pool.get_stats()['keys'][0]
+    assert (stats['requests'], stats['waited']) == (5, 3)
+
+
+def test_least_used_spreads_requests_across_keys(clock):
+    pool = ApiKeyPool(['key-a', 'key-b'], rate=10)
+    assert [pool.reserve()[0].key for _ in range(4)] == ['key-a', 'key-b', 'key-a', 'key-b']
+    # 其中一个Key的令牌用尽后全部流量转到另一个Key
+    pool.slots[0].tokens = 0
+    assert [pool.reserve()[0].key for _ in range(3)] == ['key-b'] * 3
+
+
+def test_round_robin_rotates_keys(clock):
+    pool = ApiKeyPool(['key-a', 'key-b', 'key-c'], rate=10, strategy='round_robin')
+    assert [pool.reserve()[0].key for _ in range(4)] == ['key-a', 'key-b', 'key-c', 'key-a']
+    # 轮到的Key需要等待时跳过
+    pool.slots[1].tokens = -5
+    assert [pool.reserve()[0].key for _ in range(2)] == ['key-c', 'key-a']
+
+
+def test_penalize_pauses_key_until_retry_after(clock):
+    pool = ApiKeyPool(['key-a', 'key-b'], rate=10, max_wait=2)
+    slot, _ = pool.reserve()
+    pool.penalize(slot, retry_after=5)
+    assert {pool.reserve()[0].key for _ in range(3)} == {'key-b'}
+    assert pool.get_stats()['keys'][0]['cooling_down'] is True
+    assert pool.get_stats()['keys'][0]['throttled'] == 1
+
+    clock[0] += 5
+    assert pool.get_stats()['keys'][0]['cooling_down'] is False
+
+
+def test_penalize_defaults_and_caps_pause(clock):
+    pool = ApiKeyPool(['key-a'], rate=10, max_wait=100)
+    slot, _ = pool.reserve()
+    pool.penalize(slot)
+    assert pool.reserve()[1] == pytest.approx(1.0)
+    pool.penalize(slot, retry_after=3600)
+    assert pool.reserve()[1] == pytest.approx(60)
+
+
+def test_keys_are_deduplicated_and_masked():
+    pool = ApiKeyPool(['abcd-1234-wxyz', ' abcd-1234-wxyz ', '', 'short'], rate=10)
+    assert [slot.key for slot in pool.slots] == ['abcd-1234-wxyz', 'short']
+    assert [key['key'] for key in pool.get_stats()['keys']] == ['abcd****wxyz', '****']
+    assert pool.headers(pool.slots[0]) == {'TRON-PRO-API-KEY': 'abcd-1234-wxyz'}
+
+
+def test_anonymous_pool_is_unlimited_by_default():
+    pool = ApiKeyPool(['', None])
+    slot, wait = pool.reserve()
+    assert slot.key == '' and wait == 0
+    assert all(pool.reserve()[1] == 0 for _ in range(100))
+    assert pool.headers(slot) == {} and pool.headers(None) == {}
+    assert pool.get_stats()['keys'][0]['key'] == 'anonymous'
+
+
+def test_rejects_unknown_strategy():
+    with pytest.raises(ValueError, match='random'):
+        ApiKeyPool(['key-a'], strategy='random')
+
+
+@pytest.mark.parametrize('value, expected', [('1', 1.0), ('0.5', 0.5), ('', None), (None, None),
+                                             ('Wed, 21 Oct 2015 07:28:00 GMT', None)])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_tron_api_pauses_key_on_429_and_sheds_locally(mock_node):
+    api = TronAPI({'TRON_NODE_URLS': [mock_node.url], 'TRON_GRID_API_URL': mock_node.url,
+                   'TRON_GRID_API_KEYS': ['abcd-1234-wxyz'], 'TRON_GRID_MAX_QUEUE_WAIT': 0.5,
+                   'CACHE_ENABLED': False, 'UPSTREAM_HEDGE_ENABLED': False})
+    try:
+        mock_node.rate_limit_rate = 1.0
+        assert 'error' in api._make_request('/wallet/getnowblock')
+        key = api.get_api_key_stats()['keys'][0]
+        assert key['throttled'] == 1 and key['cooling_down'] is True
+
+        # Retry-After: 1 超过排队上限，在本地拒绝，不再发往上游
+        response = api._make_request('/wallet/getnowblock')
+        assert '限流' in response['error']
+        assert mock_node.get_stats()['/wallet/getnowblock'] == 1
+        assert api.get_api_key_stats()['shed'] == 1
+    finally:
+        api.shutdown()
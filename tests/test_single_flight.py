@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""请求合并：相同键的并发调用只执行一次，结果和异常共享给所有等待方"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def fetch():
+        executions.append(1)
+        release.wait(5)
+        return {'number': 1}
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flight.do, 'getnowblock', fetch) for _ in range(8)]
+        # 等所有调用都进入等待后再让首个调用返回
+        while flight.get_stats()['coalesced'] < 7:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert len(executions) == 1
+    assert all(result == {'number': 1} for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flight.get_stats() == {'calls': 1, 'coalesced': 7, 'in_flight': 0, 'coalesce_ratio': 0.875}
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('a', lambda: 2) == (2, False)
+    assert flight.do('b', lambda: 3) == (3, False)
+    assert flight.get_stats()['calls'] == 3
+
+
+def test_error_is_shared_and_key_is_released():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('upstream down')
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, 'k', failing)
+        started.wait(5)
+        follower = pool.submit(flight.do, 'k', lambda: 'unused')
+        while flight.get_stats()['coalesced'] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match='upstream down'):
+                future.result(5)
+
+    # 失败后不保留结果，下一次调用重新执行
+    assert flight.do('k', lambda: 'ok') == ('ok', False)
+
+
+def test_async_calls_share_one_execution():
+    async def run():
+        flight = AsyncSingleFlight()
+        executions = []
+
+        async def fetch():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*[flight.do('k', fetch) for _ in range(5)])
+        assert len(executions) == 1
+        assert [result for result, _ in results] == [42] * 5
+        assert [shared for _, shared in results] == [False, True, True, True, True]
+        assert flight.get_stats()['in_flight'] == 0
+
+        # 调用结束后重新执行
+        assert await flight.do('k', fetch) == (42, False)
+        assert len(executions) == 2
+
+    asyncio.run(run())
+
+
+def test_async_cancelled_waiter_does_not_cancel_shared_call():
+    async def run():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return 'block'
+
+        first = asyncio.ensure_future(flight.do('k', fetch))
+        second = asyncio.ensure_future(flight.do('k', fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == ('block', True)
+        assert first.cancelled()
+
+    asyncio.run(run())
+
+
+def test_async_error_is_shared():
+    async def run():
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('upstream down')
+
+        results = await asyncio.gather(flight.do('k', failing), flight.do('k', failing), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.get_stats()['calls'] == 1 and flight.get_stats()['in_flight'] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""事件推送：转账解析、EventHub分发和补发、BlockFollower从模拟节点轮询新区块"""
+
+from tronpy.keys import PrivateKey
+
+from app.api import abi
+from app.api.stream import BlockFollower, EventHub, extract_transfers, format_sse
+
+USDT_HEX = abi.to_hex_address('TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t')
+ALICE = PrivateKey(bytes.fromhex('11' * 32)).public_key.to_base58check_address()
+BOB = PrivateKey(bytes.fromhex('22' * 32)).public_key.to_base58check_address()
+CAROL = PrivateKey(bytes.fromhex('33' * 32)).public_key.to_base58check_address()
+
+
+def _tx(tx_id: str, contract_type: str, value: dict, ret: str = 'SUCCESS') -> dict:
+    return {'txID': tx_id, 'ret': [{'contractRet': ret}],
+            'raw_data': {'contract': [{'type': contract_type, 'parameter': {'value': value}}]}}
+
+
+def _trx(tx_id: str, sender: str, recipient: str, amount: int) -> dict:
+    return _tx(tx_id, 'TransferContract', {'owner_address': abi.to_hex_address(sender),
+                                           'to_address': abi.to_hex_address(recipient), 'amount': amount})
+
+
+def _block(number: int, *transactions) -> dict:
+    return {'blockID': f'{number:016x}' + 'ab' * 24,
+            'block_header': {'raw_data': {'number': number, 'timestamp': number * 3000}},
+            'transactions': list(transactions)}
+
+
+def _drain(subscription) -> list:
+    events = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            return events
+        events.append(event)
+
+
+def test_extract_transfers():
+    trc20 = _tx('03', 'TriggerSmartContract', {
+        'owner_address': abi.to_hex_address(ALICE), 'contract_address': USDT_HEX,
+        'data': abi.TRANSFER_SELECTOR + abi.encode_params(['address', 'uint256'], [BOB, 5])})
+    transfer_from = _tx('04', 'TriggerSmartContract', {
+        'owner_address': abi.to_hex_address(CAROL), 'contract_address': USDT_HEX,
+        'data': abi.TRANSFER_FROM_SELECTOR + abi.encode_params(['address', 'address', 'uint256'], [ALICE, BOB, 6])},
+        ret='REVERT')
+    block = _block(1, _trx('01', ALICE, BOB, 7), _tx('02', 'TransferAssetContract', {
+        'owner_address': abi.to_hex_address(ALICE), 'to_address': abi.to_hex_address(BOB),
+        'asset_name': b'1002000'.hex(), 'amount': 8}), trc20, transfer_from,
+        _tx('05', 'TriggerSmartContract', {'data': abi.selector('approve(address,uint256)')}),
+        {'txID': '06', 'raw_data': {}})
+
+    transfers = extract_transfers(block)
+    assert [(t['tx_id'], t['asset'], t['token'], t['amount_raw'], t['status']) for t in transfers] == [
+        ('01', 'TRX', None, 7, 'SUCCESS'), ('02', 'TRC10', '1002000', 8, 'SUCCESS'),
+        ('03', 'TRC20', USDT_HEX.lower(), 5, 'SUCCESS'), ('04', 'TRC20', USDT_HEX.lower(), 6, 'REVERT')]
+    assert {(t['from_hex'], t['to_hex']) for t in transfers} == {
+        (abi.to_hex_address(ALICE).lower(), abi.to_hex_address(BOB).lower())}
+
+
+def test_hub_delivers_blocks_and_watched_transfers():
+    hub = EventHub()
+    blocks = hub.subscribe()
+    alice = hub.subscribe(blocks=False, addresses=[ALICE])
+    carol = hub.subscribe(blocks=False, addresses=[CAROL])
+
+    hub.publish_block(_block(10, _trx('01', ALICE, BOB, 7), _trx('02', ALICE, ALICE, 1)))
+
+    assert [(e['id'], e['event']) for e in _drain(blocks)] == [('10:0', 'block')]
+    events = _drain(alice)
+    assert [(e['id'], e['data']['direction'], e['data']['tx_id']) for e in events] == [
+        ('10:0', 'out', '01'), ('10:1', 'out', '02')]  # 自转账只推送一次
+    assert events[0]['data'] == {'address': ALICE, 'direction': 'out', 'block_number': 10, 'tx_id': '01',
+                                 'status': 'SUCCESS', 'asset': 'TRX', 'token': None, 'from': ALICE, 'to': BOB,
+                                 'amount_raw': 7}
+    assert _drain(carol) == []
+    assert hub.get_stats() == {'subscribers': 3, 'watched_addresses': 2, 'latest_block': 10}
+
+
+def test_hub_replays_recent_blocks():
+    hub = EventHub(replay_blocks=2)
+    for number in (1, 2, 3):
+        hub.publish_block(_block(number))
+    subscription = hub.subscribe(last_block=1)
+    assert [e['data']['number'] for e in _drain(subscription)] == [2, 3]
+    # 超出补发范围的区块不再补发
+    assert [e['data']['number'] for e in _drain(hub.subscribe(last_block=0))] == [2, 3]
+
+
+def test_hub_drops_slow_subscribers():
+    hub = EventHub(queue_size=2)
+    slow = hub.subscribe()
+    for number in (1, 2, 3):
+        hub.publish_block(_block(number))
+    assert slow.closed and hub.get_stats()['subscribers'] == 0
+    assert not hub.wait_for_subscribers(0)
+
+
+def test_hub_close_all_wakes_subscribers():
+    hub = EventHub()
+    subscriptions = [hub.subscribe(), hub.subscribe(blocks=False, addresses=[ALICE])]
+    assert hub.wait_for_subscribers(0)
+    hub.close_all()
+    assert all(s.closed and s.get(timeout=1) is None for s in subscriptions)
+    assert hub.get_stats()['subscribers'] == 0 and not hub.wait_for_subscribers(0)
+
+
+def test_format_sse():
+    event = {'id': '10:0', 'event': 'transfer', 'data': {'token': '中文', 'amount_raw': 1}}
+    assert format_sse(event) == 'id: 10:0\nevent: transfer\ndata: {"token":"中文","amount_raw":1}\n\n'
+
+
+def test_follower_publishes_missed_blocks(tron_api, mock_node):
+    hub = EventHub()
+    subscription = hub.subscribe()
+    follower = BlockFollower(tron_api, hub, max_gap=5)
+
+    # 首次轮询只发布最新区块
+    follower.poll_once()
+    head = follower.last_block
+    assert [e['data']['number'] for e in _drain(subscription)] == [head]
+    assert mock_node.get_stats().get('/wallet/getblockbynum', 0) == 0
+
+    # 落后时逐个补齐中间区块
+    follower.last_block = head - 3
+    follower.poll_once()
+    numbers = [e['data']['number'] for e in _drain(subscription)]
+    assert numbers == list(range(head - 2, follower.last_block + 1))
+
+    # 落后超过max_gap时只补最近的区块
+    follower.last_block = head - 100
+    follower.poll_once()
+    numbers = [e['data']['number'] for e in _drain(subscription)]
+    assert numbers == list(range(follower.last_block - 4, follower.last_block + 1))
+
+
+def test_follower_thread_pushes_to_subscribers(tron_api, mock_node):
+    hub = EventHub()
+    follower = BlockFollower(tron_api, hub, poll_interval=0.05)
+    follower.ensure_started()
+    try:
+        # 模拟节点录制区块中USDT转账的接收方
+        recipient = abi.to_base58_address('418840e6c55b9ada326d211d818c34a994aeced808')
+        subscription = hub.subscribe(blocks=False, addresses=[recipient])
+        event = subscription.get(timeout=5)
+        assert event['event'] == 'transfer' and event['data']['direction'] == 'in'
+        assert event['data']['token'] == 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+        assert follower.last_error is None
+    finally:
+        follower.stop()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""代币元数据注册表：元数据解析、内存/SQLite缓存，余额查询只在首次查询元数据"""
+
+import pytest
+from tronpy.keys import PrivateKey
+
+from app.api import abi
+from app.api.token_registry import TokenRegistry, metadata_calls, parse_metadata
+
+USDT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+TOKEN = PrivateKey(bytes.fromhex('33' * 32)).public_key.to_base58check_address()
+HOLDER = PrivateKey(bytes.fromhex('44' * 32)).public_key.to_base58check_address()
+
+
+def _constant(result: str) -> dict:
+    return {'result': {'result': True}, 'constant_result': [result]}
+
+
+RESPONSES = {
+    'decimals()': _constant(abi.encode_uint256(18)),
+    'symbol()': _constant(abi.encode_params(['string'], ['JST'])),
+    'name()': _constant(abi.encode_params(['string'], ['JUST GOV']))
+}
+
+
+def test_parse_metadata():
+    assert parse_metadata(TOKEN, RESPONSES) == {'contract': TOKEN, 'decimals': 18, 'symbol': 'JST', 'name': 'JUST GOV'}
+    # symbol()/name() 是可选扩展；bytes32编码的symbol同样可以解析
+    responses = dict(RESPONSES, **{'symbol()': _constant(b'MKR'.ljust(32, b'\x00').hex()), 'name()': {}})
+    assert parse_metadata(TOKEN, responses) == {'contract': TOKEN, 'decimals': 18, 'symbol': 'MKR', 'name': None}
+
+
+@pytest.mark.parametrize('decimals, error', [
+    ({'error': '请求超时'}, RuntimeError),
+    ({}, ValueError),
+    (_constant(abi.encode_uint256(78)), ValueError)
+])
+def test_parse_metadata_rejects(decimals, error):
+    with pytest.raises(error):
+        parse_metadata(TOKEN, dict(RESPONSES, **{'decimals()': decimals}))
+
+
+def test_metadata_calls():
+    calls = metadata_calls(TOKEN)
+    assert list(calls) == ['decimals()', 'symbol()', 'name()']
+    endpoint, method, data = calls['symbol()']
+    assert (endpoint, method, data['function_selector'], data['contract_address']) == (
+        '/wallet/triggerconstantcontract', 'POST', 'symbol()', TOKEN)
+
+
+def test_defaults_and_address_forms():
+    registry = TokenRegistry(defaults=[{'contract': USDT, 'symbol': 'USDT', 'name': 'Tether USD', 'decimals': 6}])
+    assert registry.get(USDT)['decimals'] == 6
+    # hex地址与base58地址是同一个键
+    assert registry.get(abi.to_hex_address(USDT))['symbol'] == 'USDT'
+    assert registry.get(TOKEN) is None
+    assert registry.get('not-an-address') is None
+    assert registry.get_stats() == {'cached_tokens': 1, 'fetched': 0, 'persistent': False}
+
+
+def test_metadata_survives_restart(tmp_path):
+    path = str(tmp_path / 'data' / 'tokens.db')
+    registry = TokenRegistry(path)
+    registry.resolve(abi.to_hex_address(TOKEN), RESPONSES)
+    assert registry.get_stats() == {'cached_tokens': 1, 'fetched': 1, 'persistent': True}
+    registry.close()
+
+    registry = TokenRegistry(path)
+    try:
+        assert registry.get(TOKEN) == {'contract': TOKEN, 'symbol': 'JST', 'name': 'JUST GOV', 'decimals': 18}
+        assert registry.get_stats()['fetched'] == 0
+    finally:
+        registry.close()
+
+
+def test_token_flow_queries_node_once(tron_api, mock_node):
+    registry = tron_api.token_registry
+    token = tron_api._run_flow(registry.token_flow(TOKEN))
+    assert token == {'contract': TOKEN, 'symbol': 'USDT', 'name': 'Tether USD', 'decimals': 6}
+    assert mock_node.get_stats()['/wallet/triggerconstantcontract'] == 3
+
+    assert tron_api._run_flow(registry.token_flow(TOKEN)) == token
+    assert mock_node.get_stats()['/wallet/triggerconstantcontract'] == 3
+    assert registry.get_stats()['fetched'] == 1
+
+
+def test_trc20_balance_fetches_metadata_once(tron_api, mock_node):
+    for _ in range(2):
+        result = tron_api.get_trc20_balance(HOLDER, TOKEN)
+        assert result['data']['decimals'] == 6 and result['data']['symbol'] == 'USDT'
+    stats = mock_node.get_stats()
+    assert stats['/wallet/triggerconstantcontract'] == 3
+    assert stats['/wallet/triggersmartcontract'] == 2
+
+
+def test_trc20_balance_rejects_non_token_contract(tron_api, mock_node):
+    mock_node.fixtures['/wallet/triggerconstantcontract'] = None
+    result = tron_api.get_trc20_balance(HOLDER, TOKEN)
+    assert result['code'] == 0 and '不是有效的TRC20代币' in result['msg']
+    assert tron_api.token_registry.get(TOKEN) is None
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""TronAPI：广播结果解析、交易签名参数校验"""
+
+import pytest
+from tronpy.keys import PrivateKey
+
+from app.api import tx_builder
+from app.api.tron_api import TronAPI
+
+KEY = PrivateKey(bytes.fromhex('11' * 32)).hex()
+RECIPIENT = PrivateKey(bytes.fromhex('22' * 32)).public_key.to_base58check_address()
+
+
+@pytest.mark.parametrize('response, expected', [
+    ({'result': True, 'txid': 'ab'}, ('SUCCESS', None)),
+    # 重试导致的重复广播：交易已在交易池中
+    ({'code': 'DUP_TRANSACTION_ERROR', 'message': '647570207472616e73616374696f6e'}, ('SUCCESS', None)),
+    # 网络错误：节点可能已接收，需要按交易ID确认
+    ({'error': 'connection reset'}, ('UNKNOWN', 'connection reset')),
+    ({'code': 'CONTRACT_VALIDATE_ERROR', 'message': '62616c616e6365206973206e6f742073756666696369656e74'},
+     ('FAILED', 'CONTRACT_VALIDATE_ERROR: balance is not sufficient')),
+    ({'code': 'SIGERROR', 'message': 'not hex'}, ('FAILED', 'SIGERROR: not hex')),
+    ({'result': False}, ('FAILED', '广播失败'))
+])
+def test_broadcast_outcome(response, expected):
+    assert TronAPI._broadcast_outcome(response) == expected
+
+
+def test_sign_transfer(tron_api):
+    signer = tx_builder.Signer(KEY)
+    ref_block = tx_builder.ref_block_from({'blockID': '00' * 32})
+    signers = {KEY: signer}
+
+    result = tron_api._sign_transfer(3, {'to': RECIPIENT, 'amount': '1.5', 'key': KEY}, signers, ref_block)
+    assert result['index'] == 3 and result['type'] == 'trx' and result['from'] == signer.address
+    assert len(result['txID']) == 64 and result['status'] == 'SIGNED'
+
+    result = tron_api._sign_transfer(0, {'type': 'trc20', 'to': RECIPIENT, 'amount': '2', 'key': KEY,
+                                         'decimals': 6}, signers, ref_block)
+    assert result['contract'] == tron_api.usdt_contract
+
+
+@pytest.mark.parametrize('transfer, error', [
+    ({'to': RECIPIENT, 'key': KEY}, '参数不完整'),
+    ({'to': 'bad', 'amount': '1', 'key': KEY}, '接收地址格式错误'),
+    ({'to': RECIPIENT, 'amount': '0.0000001', 'key': KEY}, '最多6位小数'),
+    ({'type': 'trc10', 'to': RECIPIENT, 'amount': '1', 'key': KEY}, 'tokenId'),
+    ({'type': 'nft', 'to': RECIPIENT, 'amount': '1', 'key': KEY}, '不支持的转账类型'),
+    ({'to': RECIPIENT, 'amount': '1', 'key': 'other'}, '私钥格式错误')
+])
+def test_sign_transfer_rejects(tron_api, transfer, error):
+    ref_block = tx_builder.ref_block_from({'blockID': '00' * 32})
+    with pytest.raises(ValueError, match=error):
+        tron_api._sign_transfer(0, transfer, {KEY: tx_builder.Signer(KEY)}, ref_block)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地交易构建与签名
+
+把 tx_builder 编码的 Transaction.raw 按protobuf线格式解码为tronpy使用的 raw_data JSON，
+与tronpy TransactionBuilder生成的交易字段逐项比较；签名与tronpy对同一交易ID的签名比较。
+"""
+
+import hashlib
+import time
+
+import pytest
+from tronpy.abi import trx_abi
+from tronpy.keys import PrivateKey, Signature
+from tronpy.tron import Transaction
+
+from app.api import abi, tx_builder
+
+SENDER_KEY = PrivateKey(bytes.fromhex('11' * 32))
+SENDER = SENDER_KEY.public_key.to_base58check_address()
+RECIPIENT = PrivateKey(bytes.fromhex('22' * 32)).public_key.to_base58check_address()
+USDT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+BLOCK = {'blockID': '0000000003e7a8b5' + 'cd' * 8 + 'ef' * 16, 'block_header': {'raw_data': {'number': 65513653}}}
+
+# protobuf字段号 -> (JSON字段名, 类型)，与java-tron的 Tron.proto / balance_contract.proto 一致
+RAW_FIELDS = {1: ('ref_block_bytes', 'hex'), 4: ('ref_block_hash', 'hex'), 8: ('expiration', 'int'),
+              10: ('data', 'hex'), 11: ('contract', 'message'), 14: ('timestamp', 'int'),
+              18: ('fee_limit', 'int')}
+PARAMETER_FIELDS = {
+    'TransferContract': {1: ('owner_address', 'hex'), 2: ('to_address', 'hex'), 3: ('amount', 'int')},
+    'TransferAssetContract': {1: ('asset_name', 'hex'), 2: ('owner_address', 'hex'), 3: ('to_address', 'hex'),
+                              4: ('amount', 'int')},
+    'TriggerSmartContract': {1: ('owner_address', 'hex'), 2: ('contract_address', 'hex'),
+                             3: ('call_value', 'int'), 4: ('data', 'hex')}
+}
+
+
+def _read_varint(data: bytes, position: int):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def _fields(data: bytes):
+    """按线格式拆分字段，只支持交易用到的varint和长度前缀两种类型"""
+    position = 0
+    while position < len(data):
+        key, position = _read_varint(data, position)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, position = _read_varint(data, position)
+        elif wire_type == 2:
+            length, position = _read_varint(data, position)
+            value, position = data[position:position + length], position + length
+        else:
+            raise AssertionError(f'意外的线格式类型：{wire_type}')
+        yield number, value
+
+
+def _message(data: bytes, schema):
+    decoded = {}
+    for number, value in _fields(data):
+        name, kind = schema[number]
+        decoded[name] = value.hex() if kind == 'hex' else value
+    return decoded
+
+
+def decode_raw(raw: bytes):
+    """解码 Transaction.raw 为tronpy格式的 raw_data"""
+    raw_data = _message(raw, RAW_FIELDS)
+    contract = dict(_fields(raw_data['contract']))
+    contract_type = next(name for name, number in tx_builder.CONTRACT_TYPES.items() if number == contract[1])
+    parameter = dict(_fields(contract[2]))
+    type_url = parameter[1].decode()
+    raw_data['contract'] = [{
+        'parameter': {'value': _message(parameter[2], PARAMETER_FIELDS[contract_type]), 'type_url': type_url},
+        'type': contract_type
+    }]
+    return raw_data
+
+
+def tronpy_raw_data(contract_type: str, value: dict, timestamp: int, fee_limit: int = 0, memo: str = None):
+    """tronpy TransactionBuilder 为同一笔转账生成的 raw_data"""
+    raw_data = {
+        'contract': [{'parameter': {'value': value, 'type_url': f'type.googleapis.com/protocol.{contract_type}'},
+                      'type': contract_type}],
+        'timestamp': timestamp,
+        'expiration': timestamp + 60_000,
+        'ref_block_bytes': 'a8b5',
+        'ref_block_hash': 'cd' * 8
+    }
+    if fee_limit:
+        raw_data['fee_limit'] = fee_limit
+    if memo:
+        raw_data['data'] = memo.encode().hex()
+    return raw_data
+
+
+@pytest.fixture
+def signer():
+    return tx_builder.Signer(SENDER_KEY.hex())
+
+
+def _sign_and_check(signer, raw: bytes, expected_raw_data: dict):
+    assert decode_raw(raw) == expected_raw_data
+
+    tx_id, tx_hex = signer.sign(raw)
+    assert tx_id == hashlib.sha256(raw).hexdigest()
+
+    # 广播的hex为 Transaction{raw_data=1, signature=2}
+    transaction = dict(_fields(bytes.fromhex(tx_hex)))
+    assert transaction[1] == raw
+
+    reference = Transaction(expected_raw_data, txid=tx_id, permission=None).sign(SENDER_KEY)
+    assert transaction[2].hex() == reference.to_json()['signature'][0]
+    recovered = Signature(transaction[2]).recover_public_key_from_msg_hash(bytes.fromhex(tx_id))
+    assert recovered.to_base58check_address() == SENDER
+
+
+def test_ref_block_from():
+    ref_block = tx_builder.ref_block_from(BLOCK)
+    assert ref_block['number'] == 65513653
+    assert ref_block['ref_block_bytes'].hex() == 'a8b5'
+    assert ref_block['ref_block_hash'].hex() == 'cd' * 8
+    with pytest.raises(ValueError):
+        tx_builder.ref_block_from({})
+
+
+def test_signer_address(signer):
+    assert signer.address == SENDER
+    assert signer.address_bytes.hex() == SENDER_KEY.public_key.to_hex_address()
+
+
+def test_trx_transfer_matches_tronpy(signer):
+    timestamp = int(time.time() * 1000)
+    contract = tx_builder.transfer_contract(signer.address_bytes, tx_builder.address_bytes(RECIPIENT), 1_500_000)
+    raw = tx_builder.build_raw(contract, tx_builder.ref_block_from(BLOCK), memo='订单 #1', timestamp=timestamp)
+    expected = tronpy_raw_data('TransferContract', {
+        'owner_address': abi.to_hex_address(SENDER),
+        'to_address': abi.to_hex_address(RECIPIENT),
+        'amount': 1_500_000
+    }, timestamp, memo='订单 #1')
+    _sign_and_check(signer, raw, expected)
+
+
+def test_trc10_transfer_matches_tronpy(signer):
+    timestamp = int(time.time() * 1000)
+    contract = tx_builder.transfer_asset_contract(signer.address_bytes, tx_builder.address_bytes(RECIPIENT),
+                                                  25, '1002000')
+    raw = tx_builder.build_raw(contract, tx_builder.ref_block_from(BLOCK), timestamp=timestamp)
+    expected = tronpy_raw_data('TransferAssetContract', {
+        'asset_name': '1002000'.encode().hex(),
+        'owner_address': abi.to_hex_address(SENDER),
+        'to_address': abi.to_hex_address(RECIPIENT),
+        'amount': 25
+    }, timestamp)
+    _sign_and_check(signer, raw, expected)
+
+
+def test_trc20_transfer_matches_tronpy(signer):
+    timestamp = int(time.time() * 1000)
+    contract = tx_builder.trc20_transfer_contract(signer.address_bytes, tx_builder.address_bytes(USDT),
+                                                  RECIPIENT, 2_000_000)
+    raw = tx_builder.build_raw(contract, tx_builder.ref_block_from(BLOCK), fee_limit=100_000_000,
+                               timestamp=timestamp)
+    # tronpy: contract.functions.transfer(to, amount) 的调用数据
+    data = 'a9059cbb' + trx_abi.encode(['address', 'uint256'], [RECIPIENT, 2_000_000]).hex()
+    expected = tronpy_raw_data('TriggerSmartContract', {
+        'owner_address': abi.to_hex_address(SENDER),
+        'contract_address': abi.to_hex_address(USDT),
+        'data': data
+    }, timestamp, fee_limit=100_000_000)
+    _sign_and_check(signer, raw, expected)
+
+
+@pytest.mark.parametrize('amount, decimals, expected', [
+    ('1', 6, 1_000_000), ('0.000001', 6, 1), (2.5, 6, 2_500_000), ('7', 0, 7)
+])
+def test_to_base_units(amount, decimals, expected):
+    assert tx_builder.to_base_units(amount, decimals) == expected
+
+
+@pytest.mark.parametrize('amount, decimals', [('0.0000001', 6), ('0', 6), ('-1', 6), ('abc', 6), ('nan', 6)])
+def test_to_base_units_rejects(amount, decimals):
+    with pytest.raises(ValueError):
+        tx_builder.to_base_units(amount, decimals)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""多节点上游路由：按延迟选择节点、熔断恢复、落后节点剔除、故障转移和对冲请求"""
+
+import types
+
+import pytest
+
+from app.api import upstream
+from app.api.tron_api import TronAPI
+from app.api.upstream import CLOSED, HALF_OPEN, OPEN, UpstreamRouter
+from benchmarks.mock_node import MockTronNode
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的单调时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(upstream, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def slow_node():
+    """第二个模拟节点，各用例按需设置延迟或错误率"""
+    node = MockTronNode().start()
+    yield node
+    node.stop()
+
+
+def _call(router: UpstreamRouter, latency: float = 0.1, ok: bool = True):
+    node = router.select()
+    router.release(node, latency, ok, None if ok else 'boom')
+    return node
+
+
+# ==================== UpstreamRouter ====================
+
+def test_select_prefers_lower_latency(clock):
+    router = UpstreamRouter(['http://a', 'http://b/', 'http://a'])
+    a, b = router.endpoints
+    assert (a.url, b.url) == ('http://a', 'http://b')
+    # 未测量过的节点优先，得分相同时选首选节点
+    assert router.select() is a
+    router.release(a, 0.5, True)
+    assert router.select() is b
+    router.release(b, 0.1, True)
+    assert [_call(router).url for _ in range(3)] == ['http://b'] * 3
+
+    # 在途请求多的节点得分变高
+    b.in_flight = 10
+    assert router.select() is a
+
+
+def test_select_excludes_tried_nodes(clock):
+    router = UpstreamRouter(['http://a', 'http://b'])
+    a = router.select()
+    assert router.select(exclude=[a]).url == 'http://b'
+    assert router.select(exclude=router.endpoints) is None
+
+
+def test_circuit_opens_and_half_opens(clock):
+    router = UpstreamRouter(['http://a', 'http://b'], failure_threshold=3, open_seconds=30)
+    a, b = router.endpoints
+    router.release(b, 1.0, True)
+    for _ in range(3):
+        router.acquire(a)
+        router.release(a, 0.1, False, 'boom')
+    assert a.state == OPEN and a.last_error == 'boom'
+    assert {_call(router).url for _ in range(3)} == {'http://b'}
+
+    # 熔断结束后只放行一个试探请求
+    clock[0] += 30
+    probe = router.select()
+    assert probe is a and a.state == HALF_OPEN
+    assert router.select() is b
+    # 试探失败重新熔断
+    router.release(a, 0.1, False, 'still down')
+    assert a.state == OPEN
+
+    clock[0] += 30
+    assert router.select() is a
+    router.release(a, 0.05, True)
+    assert a.state == CLOSED and a.consecutive_failures == 0
+
+
+def test_cancelled_probe_releases_half_open_slot(clock):
+    router = UpstreamRouter(['http://a'], failure_threshold=1, open_seconds=10)
+    a = _call(router, ok=False)
+    assert a.state == OPEN
+    clock[0] += 10
+    assert router.select() is a and a.probing
+    router.release(a, 0, None)
+    assert a.state == HALF_OPEN and not a.probing and a.failures == 1
+
+
+def test_all_nodes_open_falls_back_to_earliest(clock):
+    router = UpstreamRouter(['http://a', 'http://b'], failure_threshold=1, open_seconds=30)
+    a, b = router.endpoints
+    router.acquire(b)
+    router.release(b, 0.1, False)
+    clock[0] += 1
+    router.acquire(a)
+    router.release(a, 0.1, False)
+    assert router.select() is b
+
+
+def test_check_once_excludes_lagging_nodes(clock):
+    router = UpstreamRouter(['http://a', 'http://b', 'http://c'], max_lag=20)
+    heads = {'http://a': (True, 1000, None), 'http://b': (True, 1030, None), 'http://c': (None, 0, None)}
+    router.check_once(lambda url: heads[url])
+    a, b, c = router.endpoints
+    assert (a.head_block, b.head_block) == (1000, 1030)
+    # 本轮跳过的节点不计入统计
+    assert c.ewma is None and c.failures == 0
+    assert {_call(router).url for _ in range(3)} <= {'http://b', 'http://c'}
+
+    def failing(url):
+        raise RuntimeError('connection refused')
+
+    router.check_once(failing)
+    assert a.failures == b.failures == 1 and a.last_error == 'connection refused'
+
+
+def test_hedge_delay_uses_recent_p95():
+    router = UpstreamRouter(['http://a', 'http://b'], hedge_min_delay=0.05, hedge_max_delay=2)
+    assert router.hedge_delay() == 2
+    for i in range(100):
+        _call(router, latency=(i + 1) / 100)
+    assert router.hedge_delay() == pytest.approx(0.96)
+
+    router = UpstreamRouter(['http://a', 'http://b'], hedge_min_delay=0.05, hedge_max_delay=2)
+    for _ in range(20):
+        _call(router, latency=0.001)
+    assert router.hedge_delay() == 0.05
+
+
+def test_broadcast_is_never_hedged_or_failed_over():
+    router = UpstreamRouter(['http://a', 'http://b'])
+    assert router.can_hedge('/wallet/getaccount') and router.can_failover('/wallet/getaccount')
+    assert not router.can_hedge('/wallet/broadcasthex')
+    assert not router.can_failover('/wallet/broadcasttransaction')
+    assert not UpstreamRouter(['http://a']).can_failover('/wallet/getaccount')
+    with pytest.raises(ValueError):
+        UpstreamRouter(['', ' '])
+
+
+# ==================== TronAPI ====================
+
+def _api(*nodes, **config) -> TronAPI:
+    return TronAPI(dict({'TRON_NODE_URLS': [node.url for node in nodes], 'CACHE_ENABLED': False,
+                         'SINGLE_FLIGHT_ENABLED': False, 'HTTP_MAX_RETRIES': 0}, **config))
+
+
+def test_tron_api_fails_over_to_healthy_node(mock_node, slow_node):
+    slow_node.error_rate = 1.0
+    api = _api(slow_node, mock_node, UPSTREAM_HEDGE_ENABLED=False)
+    try:
+        response = api._make_request('/wallet/getnowblock')
+        assert 'block_header' in response
+        assert slow_node.get_stats()['injected_503'] == 1
+        assert api.router.failovers == 1
+
+        # 广播交易不换节点重试，避免重复发送
+        mock_node.reset_stats()
+        api.router.endpoints[1].ewma = 10
+        assert 'error' in api._make_request('/wallet/broadcasthex', 'POST', {'transaction': '00'})
+        assert mock_node.get_stats().get('/wallet/broadcasthex', 0) == 0
+    finally:
+        api.shutdown()
+
+
+def test_tron_api_hedges_slow_reads(mock_node, slow_node):
+    slow_node.latency = 1.0
+    api = _api(slow_node, mock_node, UPSTREAM_HEDGE_MIN_DELAY=0.05, UPSTREAM_HEDGE_MAX_DELAY=0.1)
+    try:
+        response = api._make_request('/wallet/getnowblock')
+        assert 'block_header' in response
+        assert (api.router.hedged, api.router.hedge_wins) == (1, 1)
+        assert mock_node.get_stats()['/wallet/getnowblock'] == 1
+    finally:
+        api.shutdown()
+
+
+def test_tron_api_probe_reads_head_block(mock_node, slow_node):
+    slow_node.error_rate = 1.0
+    api = _api(mock_node, slow_node)
+    try:
+        before = mock_node.head_block()
+        api.router.check_once(api._probe_upstream)
+        healthy, failing = api.router.endpoints
+        assert before <= healthy.head_block <= mock_node.head_block() and healthy.state == CLOSED
+        assert failing.head_block == 0 and failing.failures == 1
+    finally:
+        api.shutdown()
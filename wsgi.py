@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+WSGI入口（生产部署）
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+应用在导入时创建但不启动后台线程：预加载模式下主进程创建TronAPI、tronpy客户端并加载词表等数据，
+fork出的工作进程通过写时复制共享，后台线程由 gunicorn.conf.py 在各工作进程fork后启动。
+"""
+
+from main import create_app, warm_up
+
+app = create_app(start_background=False)
+warm_up(app)